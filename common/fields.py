@@ -0,0 +1,28 @@
+from django.db import models
+
+from .utils import get_voting_date
+
+
+class VotingDateField(models.DateField):
+    """
+    Voting day of model datetime field, set when model is created (also by bulk_create), so votes are filtered and
+    aggregated by indexed date instead of truncating datetimes in database.
+    Datetime field must be declared before this field, so its value is already set.
+    """
+
+    def __init__(self, *args, datetime_field='created_datetime', **kwargs):
+        self.datetime_field = datetime_field
+        kwargs.setdefault('editable', False)
+        super(VotingDateField, self).__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super(VotingDateField, self).deconstruct()
+        kwargs['datetime_field'] = self.datetime_field
+
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        if add and getattr(model_instance, self.attname) is None:
+            setattr(model_instance, self.attname, get_voting_date(getattr(model_instance, self.datetime_field)))
+
+        return super(VotingDateField, self).pre_save(model_instance, add)
@@ -0,0 +1,11 @@
+from django_filters import rest_framework
+
+
+class FilterSetBackend(rest_framework.DjangoFilterBackend):
+    """Filter backend keeping filterset on view, so view reads filter values validated and cleaned by filterset form"""
+
+    def get_filterset(self, request, queryset, view):
+        filterset = super(FilterSetBackend, self).get_filterset(request, queryset, view)
+        view.filterset = filterset
+
+        return filterset
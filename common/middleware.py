@@ -0,0 +1,160 @@
+import threading
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+
+class Histogram:
+    """Counts of values in buckets with given upper bounds, last bucket is unbounded"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        index = next((index for index, bound in enumerate(self.bounds) if value <= bound), len(self.bounds))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def get_percentile(self, percent):
+        """Returns upper bound of bucket containing percentile, or maximum value for last bucket"""
+        rank = percent / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+
+        return self.max
+
+    def to_dict(self):
+        buckets = {f'<={bound}': count for bound, count in zip(self.bounds, self.counts)}
+        buckets[f'>{self.bounds[-1]}'] = self.counts[-1]
+
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.get_percentile(50),
+            'p90': self.get_percentile(90),
+            'p99': self.get_percentile(99),
+            'buckets': buckets,
+        }
+
+
+class RequestMetrics:
+    """Query count and durations in milliseconds of single request. Used as database execute wrapper"""
+
+    def __init__(self):
+        self.queries_count = 0
+        self.db_duration = 0.0
+        self.view_duration = None
+        self.serialization_duration = 0.0
+        self.total_duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_duration += (time.perf_counter() - start) * 1000
+            self.queries_count += 1
+
+    def get_server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_duration:.2f};desc="{self.queries_count} queries"',
+            f'view;dur={self.view_duration or 0.0:.2f}',
+            f'serialization;dur={self.serialization_duration:.2f}',
+            f'total;dur={self.total_duration:.2f}',
+        ])
+
+
+class RequestStats:
+    """Histograms of request metrics by URL name, kept in memory of process"""
+    duration_bounds = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+    queries_bounds = (1, 2, 5, 10, 20, 50, 100)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.url_names = {}
+
+    def add(self, url_name, metrics):
+        with self.lock:
+            if url_name not in self.url_names:
+                self.url_names[url_name] = {
+                    'total_ms': Histogram(self.duration_bounds),
+                    'view_ms': Histogram(self.duration_bounds),
+                    'db_ms': Histogram(self.duration_bounds),
+                    'serialization_ms': Histogram(self.duration_bounds),
+                    'queries': Histogram(self.queries_bounds),
+                }
+            histograms = self.url_names[url_name]
+            histograms['total_ms'].add(metrics.total_duration)
+            histograms['view_ms'].add(metrics.view_duration or 0.0)
+            histograms['db_ms'].add(metrics.db_duration)
+            histograms['serialization_ms'].add(metrics.serialization_duration)
+            histograms['queries'].add(metrics.queries_count)
+
+    def reset(self):
+        with self.lock:
+            self.url_names = {}
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                url_name: {name: histogram.to_dict() for name, histogram in histograms.items()}
+                for url_name, histograms in sorted(self.url_names.items())
+            }
+
+
+request_stats = RequestStats()
+
+
+class RequestMetricsMiddleware:
+    """
+    Records query count, database time, view time and response rendering (serialization) time of each request,
+    returns them in Server-Timing header and adds them to histograms of request URL name.
+    Queries of streamed response content are run after response is returned, so they aren't counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.metrics = RequestMetrics()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(request.metrics))
+            response = self.get_response(request)
+        end = time.perf_counter()
+
+        request.metrics.total_duration = (end - start) * 1000
+        if request.metrics.view_duration is None and hasattr(request, 'metrics_view_start'):
+            request.metrics.view_duration = (end - request.metrics_view_start) * 1000
+        response['Server-Timing'] = request.metrics.get_server_timing()
+        if request.resolver_match is not None:
+            request_stats.add(request.resolver_match.view_name, request.metrics)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        """Template responses (e.g. DRF responses) are rendered after view returns, rendering is timed separately"""
+        render_start = time.perf_counter()
+        request.metrics.view_duration = (render_start - request.metrics_view_start) * 1000
+
+        def set_serialization_duration(rendered_response):
+            request.metrics.serialization_duration = (time.perf_counter() - render_start) * 1000
+
+        response.add_post_render_callback(set_serialization_duration)
+
+        return response
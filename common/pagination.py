@@ -0,0 +1,118 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination by values of all view ordering fields of the last object in page.
+    Next page is filtered by ordering fields values instead of OFFSET and objects count isn't queried,
+    so every page is read equally fast. View queryset must be ordered by view ordering, last ordering field unique.
+    Lists of objects already sorted by view ordering are paginated the same way, their model is view queryset model.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = view.ordering
+        model = queryset.model if isinstance(queryset, QuerySet) else view.queryset.model
+        position = self.decode_cursor(request, model)
+        if position is not None and isinstance(queryset, QuerySet):
+            queryset = queryset.filter(self.get_position_filter(position))
+        elif position is not None:
+            queryset = [obj for obj in queryset if self.is_following_position(obj, position)]
+
+        objects = list(queryset[:self.page_size + 1])
+        self.has_next = len(objects) > self.page_size
+        self.page = objects[:self.page_size]
+
+        return self.page
+
+    def get_position_filter(self, position):
+        """Returns filter of objects following position in ordering"""
+        position_filter = Q()
+        equal_fields_filter = Q()
+        for field, value in zip(self.ordering, position):
+            field_name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            position_filter |= equal_fields_filter & Q(**{f'{field_name}__{lookup}': value})
+            equal_fields_filter &= Q(**{field_name: value})
+
+        return position_filter
+
+    def is_following_position(self, obj, position):
+        """Checks if object follows position in ordering, used for lists already sorted by view ordering"""
+        for field, value in zip(self.ordering, position):
+            obj_value = getattr(obj, field.lstrip('-'))
+            if obj_value != value:
+                return obj_value < value if field.startswith('-') else obj_value > value
+
+        return False
+
+    def decode_cursor(self, request, model):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+
+        try:
+            position = json.loads(urlsafe_b64decode(cursor.encode()))
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return self.decode_position(position, model)
+
+    def decode_position(self, position, model):
+        """Values of model fields are converted from JSON to field types (e.g. dates), annotations are kept"""
+        values = []
+        for field, value in zip(self.ordering, position):
+            field_name = field.lstrip('-')
+            try:
+                model_field = model._meta.pk if field_name == 'pk' else model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                values.append(value)
+                continue
+            try:
+                values.append(model_field.to_python(value))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+
+        return values
+
+    def encode_cursor(self, obj):
+        position = [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+        return urlsafe_b64encode(json.dumps(position, cls=DjangoJSONEncoder).encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,48 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+read_database = ContextVar('read_database', default=None)
+
+
+class ReadReplicaRouter:
+    """
+    Routes reads to database chosen for current request (read replica of views with ReadReplicaMixin),
+    other reads and all writes go to default (primary) database.
+    Context variable is copied to sync_to_async threads, so async views are routed as well.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Replica has the same objects as primary, so objects read from both can be related"""
+        return True
+
+
+def get_read_replica_database():
+    """Returns READ_REPLICA_DATABASE alias, or None when replica reads are disabled"""
+    return getattr(settings, 'READ_REPLICA_DATABASE', None)
+
+
+def get_primary_stickiness_key(user):
+    return f'common:read_replica:primary:{user.pk}'
+
+
+def use_read_replica(user):
+    """Routes reads of current request to read replica, unless user wrote recently (read-your-own-writes)"""
+    database = get_read_replica_database()
+    if database and user.is_authenticated and cache.get(get_primary_stickiness_key(user)):
+        database = None
+    read_database.set(database)
+
+
+def use_primary():
+    read_database.set(None)
+
+
+def stick_to_primary(user):
+    """User reads from primary database for READ_REPLICA_STICKINESS seconds, so replication lag doesn't hide writes"""
+    if get_read_replica_database() and user.is_authenticated:
+        cache.set(get_primary_stickiness_key(user), True, timeout=getattr(settings, 'READ_REPLICA_STICKINESS', 5))
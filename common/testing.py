@@ -0,0 +1,59 @@
+from contextlib import contextmanager
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin asserting SQL query count of tested code stays within budget and doesn't grow with rows count,
+    so N+1 queries are caught by tests instead of production.
+    """
+    row_counts = (10, 100, 1000)
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using=DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as queries:
+            yield queries
+
+        self.assertLessEqual(len(queries), budget, '{} queries executed, budget is {}:\n{}'.format(
+            len(queries), budget, '\n'.join(query['sql'] for query in queries.captured_queries)
+        ))
+
+    def assertConstantQueries(self, populate, request, budget=None, row_counts=None, using=DEFAULT_DB_ALIAS):
+        """
+        Calls populate(rows_count) and counts queries of request() for each rows count, in transaction rolled back
+        afterwards. Query counts must be equal for all rows counts and within budget.
+        """
+        queries_counts = {}
+        for rows_count in row_counts or self.row_counts:
+            with transaction.atomic(using=using):
+                populate(rows_count)
+                cache.clear()
+                with CaptureQueriesContext(connections[using]) as queries:
+                    request()
+                queries_counts[rows_count] = len(queries)
+                transaction.set_rollback(True, using=using)
+
+        self.assertEqual(
+            len(set(queries_counts.values())), 1, f'Query count depends on rows count: {queries_counts}'
+        )
+        if budget is not None:
+            self.assertLessEqual(max(queries_counts.values()), budget, f'Query budget {budget} exceeded')
+
+        return queries_counts
+
+
+def query_budget(budget, using=DEFAULT_DB_ALIAS):
+    """Decorator of QueryBudgetMixin test method asserting whole test runs within query budget"""
+    def decorator(test_method):
+        @wraps(test_method)
+        def wrapper(self, *args, **kwargs):
+            with self.assertMaxQueries(budget, using=using):
+                return test_method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,80 @@
+from django.test import SimpleTestCase, TestCase, modify_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from common.middleware import Histogram, request_stats
+from users.models import User
+
+class HistogramShould(SimpleTestCase):
+    def test_count_values_in_buckets_by_upper_bound(self):
+        histogram = Histogram((1, 10))
+        for value in (0.5, 1, 5, 20):
+            histogram.add(value)
+
+        self.assertEqual(histogram.to_dict()['buckets'], {'<=1': 2, '<=10': 1, '>10': 1})
+
+    def test_return_bucket_upper_bound_as_percentile_and_maximum_for_last_bucket(self):
+        histogram = Histogram((1, 10))
+        for value in (0.5, 5, 5, 20):
+            histogram.add(value)
+
+        self.assertEqual((histogram.get_percentile(50), histogram.get_percentile(99)), (10, 20))
+
+
+class RequestMetricsMiddlewareDisabledShould(TestCase):
+    def test_not_add_server_timing_header_when_middleware_is_not_enabled(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='u'))
+
+        self.assertNotIn('Server-Timing', self.client.get(reverse('restaurant_list')))
+
+
+@modify_settings(MIDDLEWARE={'append': 'common.middleware.RequestMetricsMiddleware'})
+class RequestMetricsMiddlewareShould(TestCase):
+    def setUp(self):
+        request_stats.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='u')
+        self.staff_user = User.objects.create_user(username='staff', is_staff=True)
+
+    def get_restaurant_list(self):
+        self.client.force_authenticate(self.user)
+
+        return self.client.get(reverse('restaurant_list'))
+
+    def test_add_server_timing_header_with_query_count_and_durations(self):
+        response = self.get_restaurant_list()
+        timings = [timing.split(';')[0] for timing in response['Server-Timing'].split(', ')]
+
+        self.assertEqual(timings, ['db', 'view', 'serialization', 'total'])
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+
+    def test_add_request_metrics_to_histograms_of_url_name(self):
+        self.get_restaurant_list()
+        self.get_restaurant_list()
+        stats = request_stats.to_dict()
+
+        self.assertEqual(stats['restaurant_list']['total_ms']['count'], 2)
+        self.assertGreater(stats['restaurant_list']['queries']['mean'], 0)
+        self.assertGreater(stats['restaurant_list']['serialization_ms']['mean'], 0)
+
+    def test_return_histograms_by_url_name_to_staff_user(self):
+        self.get_restaurant_list()
+        self.client.force_authenticate(self.staff_user)
+        response = self.client.get(reverse('request_stats'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['restaurant_list']['total_ms']['count'], 1)
+
+    def test_return_forbidden_when_stats_user_is_not_staff(self):
+        self.client.force_authenticate(self.user)
+
+        self.assertEqual(self.client.get(reverse('request_stats')).status_code, 403)
+
+    def test_reset_histograms_when_stats_are_deleted(self):
+        self.get_restaurant_list()
+        self.client.force_authenticate(self.staff_user)
+
+        self.assertEqual(self.client.delete(reverse('request_stats')).status_code, 204)
+        self.assertNotIn('restaurant_list', request_stats.to_dict())
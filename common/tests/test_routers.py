@@ -0,0 +1,70 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import router
+from django.test import SimpleTestCase, override_settings
+
+from common.routers import read_database, stick_to_primary, use_primary, use_read_replica
+from restaurants.models import Restaurant
+from users.models import User
+
+
+class ReadReplicaRouterShould(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User(pk=1, username='u')
+        self.addCleanup(use_primary)
+
+    def test_route_reads_to_default_database_when_read_replica_not_configured(self):
+        use_read_replica(self.user)
+
+        self.assertEqual(router.db_for_read(Restaurant), 'default')
+
+    @override_settings(READ_REPLICA_DATABASE='replica')
+    def test_route_reads_to_read_replica_until_primary_is_used_again(self):
+        use_read_replica(self.user)
+        replica_database = router.db_for_read(Restaurant)
+        use_primary()
+
+        self.assertEqual((replica_database, router.db_for_read(Restaurant)), ('replica', 'default'))
+
+    @override_settings(READ_REPLICA_DATABASE='replica')
+    def test_route_writes_to_default_database_when_read_replica_used(self):
+        use_read_replica(self.user)
+
+        self.assertEqual(router.db_for_write(Restaurant), 'default')
+
+    @override_settings(READ_REPLICA_DATABASE='replica')
+    def test_route_user_reads_to_default_database_when_user_wrote_recently(self):
+        stick_to_primary(self.user)
+        use_read_replica(self.user)
+
+        self.assertEqual(router.db_for_read(Restaurant), 'default')
+        self.assertEqual(read_database.get(), None)
+
+    @override_settings(READ_REPLICA_DATABASE='replica')
+    def test_route_other_user_reads_to_read_replica_when_user_wrote_recently(self):
+        stick_to_primary(self.user)
+        use_read_replica(User(pk=2, username='u2'))
+
+        self.assertEqual(router.db_for_read(Restaurant), 'replica')
+
+    @override_settings(READ_REPLICA_DATABASE='replica', READ_REPLICA_STICKINESS=30)
+    def test_stick_user_to_primary_for_read_replica_stickiness_seconds(self):
+        with mock.patch('common.routers.cache') as mocked_cache:
+            stick_to_primary(self.user)
+
+        mocked_cache.set.assert_called_once_with(f'common:read_replica:primary:{self.user.pk}', True, timeout=30)
+
+    @override_settings(READ_REPLICA_DATABASE='replica')
+    def test_route_anonymous_user_reads_to_read_replica(self):
+        stick_to_primary(AnonymousUser())
+        use_read_replica(AnonymousUser())
+
+        self.assertEqual(router.db_for_read(Restaurant), 'replica')
+
+    def test_not_stick_user_to_primary_when_read_replica_not_configured(self):
+        stick_to_primary(self.user)
+
+        self.assertIsNone(cache.get(f'common:read_replica:primary:{self.user.pk}'))
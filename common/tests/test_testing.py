@@ -0,0 +1,44 @@
+from django.test import TestCase
+
+from common.testing import QueryBudgetMixin, query_budget
+from users.models import User
+
+
+class QueryBudgetMixinShould(QueryBudgetMixin, TestCase):
+    row_counts = (1, 3)
+
+    @staticmethod
+    def populate(rows_count):
+        User.objects.bulk_create([User(username=f'u{i}') for i in range(rows_count)])
+
+    def test_return_query_counts_by_rows_count_when_query_count_is_constant(self):
+        queries_counts = self.assertConstantQueries(self.populate, lambda: list(User.objects.all()), budget=1)
+
+        self.assertEqual(queries_counts, {1: 1, 3: 1})
+
+    def test_fail_when_query_count_grows_with_rows_count(self):
+        def request():
+            for user in User.objects.all():
+                User.objects.filter(pk=user.pk).exists()
+
+        with self.assertRaisesMessage(AssertionError, 'Query count depends on rows count: {1: 2, 3: 4}'):
+            self.assertConstantQueries(self.populate, request)
+
+    def test_fail_when_query_budget_is_exceeded(self):
+        with self.assertRaisesMessage(AssertionError, 'Query budget 0 exceeded'):
+            self.assertConstantQueries(self.populate, lambda: list(User.objects.all()), budget=0)
+
+    def test_roll_back_populated_rows(self):
+        self.assertConstantQueries(self.populate, lambda: None)
+
+        self.assertFalse(User.objects.exists())
+
+    def test_fail_when_max_queries_are_exceeded(self):
+        with self.assertRaisesMessage(AssertionError, '2 queries executed, budget is 1'):
+            with self.assertMaxQueries(1):
+                User.objects.exists()
+                User.objects.exists()
+
+    @query_budget(1)
+    def test_run_decorated_test_within_query_budget(self):
+        User.objects.exists()
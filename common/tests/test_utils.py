@@ -0,0 +1,82 @@
+from datetime import date, datetime, time
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import SimpleTestCase, override_settings
+from django.utils.timezone import make_aware
+
+from common.utils import get_day_datetime_range, get_percentile, get_voting_date, is_database_lock_error
+
+
+class GetDayDatetimeRangeShould(SimpleTestCase):
+    def test_return_given_day_start_and_next_day_start(self):
+        self.assertEqual(
+            get_day_datetime_range(date(2020, 1, 1)),
+            (make_aware(datetime(2020, 1, 1)), make_aware(datetime(2020, 1, 2)))
+        )
+
+    @override_settings(TIME_ZONE='Europe/Vilnius')
+    def test_return_day_boundaries_in_current_time_zone(self):
+        day_start, day_end = get_day_datetime_range(date(2020, 1, 1))
+
+        self.assertEqual((day_start.utcoffset().total_seconds(), (day_end - day_start).days), (7200, 1))
+
+    @override_settings(VOTING_DAY_TIME_ZONE='Europe/Minsk', VOTING_DAY_START=time(4))
+    def test_return_voting_day_boundaries_when_voting_day_settings_given(self):
+        self.assertEqual(
+            get_day_datetime_range(date(2020, 1, 1)),
+            (make_aware(datetime(2020, 1, 1, 1)), make_aware(datetime(2020, 1, 2, 1)))
+        )
+
+
+class GetVotingDateShould(SimpleTestCase):
+    def test_return_date_in_current_time_zone_when_voting_day_settings_not_given(self):
+        self.assertEqual(get_voting_date(make_aware(datetime(2020, 1, 1, 23, 59))), date(2020, 1, 1))
+
+    @override_settings(VOTING_DAY_TIME_ZONE='Europe/Minsk', VOTING_DAY_START=time(4))
+    def test_return_previous_date_when_datetime_is_before_voting_day_start(self):
+        self.assertEqual(
+            (
+                get_voting_date(make_aware(datetime(2020, 1, 1, 0, 59))),
+                get_voting_date(make_aware(datetime(2020, 1, 1, 1))),
+            ),
+            (date(2019, 12, 31), date(2020, 1, 1))
+        )
+
+    @override_settings(VOTING_DAY_TIME_ZONE='Europe/Minsk')
+    def test_return_date_of_current_datetime_when_datetime_not_given(self):
+        with mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, 1, 22))):
+            self.assertEqual(get_voting_date(), date(2020, 1, 2))
+
+
+class GetPercentileShould(SimpleTestCase):
+    def test_return_nearest_rank_value_of_sorted_values(self):
+        values = list(range(1, 11))
+
+        self.assertEqual((get_percentile(values, 50), get_percentile(values, 90), get_percentile(values, 99)), (5, 9, 10))
+
+    def test_return_single_value_for_every_percentile(self):
+        self.assertEqual((get_percentile([3], 1), get_percentile([3], 100)), (3, 3))
+
+
+class IsDatabaseLockErrorShould(SimpleTestCase):
+    @staticmethod
+    def get_error(message, pgcode=None):
+        """Returns Django database error wrapping driver error, like Django database wrapper raises it"""
+        driver_error = Exception(message)
+        driver_error.pgcode = pgcode
+        error = OperationalError(message)
+        error.__cause__ = driver_error
+
+        return error
+
+    def test_return_true_when_sqlite_table_or_database_is_locked(self):
+        self.assertTrue(is_database_lock_error(self.get_error('database table is locked: restaurants_restaurant')))
+        self.assertTrue(is_database_lock_error(self.get_error('database is locked')))
+
+    def test_return_true_when_postgresql_transaction_deadlocked_or_failed_serialization(self):
+        self.assertTrue(is_database_lock_error(self.get_error('deadlock detected', pgcode='40P01')))
+        self.assertTrue(is_database_lock_error(self.get_error('could not serialize access', pgcode='40001')))
+
+    def test_return_false_when_error_is_not_lock_conflict(self):
+        self.assertFalse(is_database_lock_error(self.get_error('no such table: restaurants_restaurant')))
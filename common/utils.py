@@ -0,0 +1,52 @@
+import math
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.conf import settings
+from django.utils import timezone
+
+
+def get_voting_day_time_zone():
+    """Returns VOTING_DAY_TIME_ZONE, or current time zone when it's not set"""
+    time_zone = getattr(settings, 'VOTING_DAY_TIME_ZONE', None)
+
+    return pytz.timezone(time_zone) if time_zone else timezone.get_current_timezone()
+
+
+def get_voting_day_start():
+    """Returns VOTING_DAY_START time of day when voting day begins, midnight by default"""
+    return getattr(settings, 'VOTING_DAY_START', None) or time.min
+
+
+def get_voting_date(value=None):
+    """Returns voting day of aware datetime, current voting day by default"""
+    value = timezone.localtime(value, get_voting_day_time_zone())
+    day_start = get_voting_day_start()
+
+    return (value - timedelta(hours=day_start.hour, minutes=day_start.minute, seconds=day_start.second)).date()
+
+
+def get_day_datetime_range(date):
+    """
+    Returns half-open [start, end) datetime range of given voting day.
+    Filtering by range instead of __date lookup lets database use indexes on datetime column.
+    """
+    time_zone = get_voting_day_time_zone()
+    day_start = get_voting_day_start()
+    start = timezone.make_aware(datetime.combine(date, day_start), time_zone)
+    end = timezone.make_aware(datetime.combine(date + timedelta(days=1), day_start), time_zone)
+
+    return start, end
+
+
+def get_percentile(values, percent):
+    """Returns nearest-rank percentile of sorted values"""
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def is_database_lock_error(error):
+    """
+    Checks if database error is transient lock conflict (SQLite locked database or table, PostgreSQL deadlock or
+    serialization failure), after which rolled back transaction can be run again
+    """
+    return 'locked' in str(error) or getattr(error.__cause__, 'pgcode', None) in ('40001', '40P01')
@@ -0,0 +1,101 @@
+import inspect
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser, SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .middleware import request_stats
+from .routers import stick_to_primary, use_primary, use_read_replica
+
+
+class RequestStatsView(APIView):
+    """
+    View of request metrics histograms by URL name, recorded by RequestMetricsMiddleware in current process.
+    Histograms are reset with DELETE.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(request_stats.to_dict())
+
+    def delete(self, request, *args, **kwargs):
+        request_stats.reset()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AsyncAPIViewMixin:
+    """
+    Makes DRF view async Django view, which is awaited by ASGI handler without occupying thread for whole request.
+    View stays CSRF exempt, as view attributes are copied from DRF view.
+    Django 3.2 ORM is synchronous, so authentication and permission checks run with sync_to_async, as should
+    database work of async handlers (get, post, ...). Sync handlers are run with sync_to_async as well.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super(AsyncAPIViewMixin, cls).as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        update_wrapper(async_view, view)
+
+        return async_view
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = self.http_method_not_allowed
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            if not inspect.iscoroutinefunction(handler):
+                handler = sync_to_async(handler)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+
+        return self.response
+
+
+class ReadReplicaMixin:
+    """
+    View reading from READ_REPLICA_DATABASE, unless request user wrote recently (see StickToPrimaryMixin).
+    Replica is chosen after authentication and reset when response is finalized or exception is raised,
+    so following requests of the same thread read from primary.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super(ReadReplicaMixin, self).initial(request, *args, **kwargs)
+        use_read_replica(request.user)
+
+    def raise_uncaught_exception(self, exc):
+        use_primary()
+        super(ReadReplicaMixin, self).raise_uncaught_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        use_primary()
+
+        return super(ReadReplicaMixin, self).finalize_response(request, response, *args, **kwargs)
+
+
+class StickToPrimaryMixin:
+    """View writing to primary database, after which request user reads from primary for READ_REPLICA_STICKINESS"""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            stick_to_primary(request.user)
+
+        return super(StickToPrimaryMixin, self).finalize_response(request, response, *args, **kwargs)
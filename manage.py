@@ -6,7 +6,8 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'restaurant_voting.settings.local')
+    settings_module = 'test' if sys.argv[1:2] == ['test'] else 'local'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', f'restaurant_voting.settings.{settings_module}')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
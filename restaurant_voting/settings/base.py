@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+from datetime import time
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -84,6 +85,66 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# Shared cache backend (Memcached, Redis) should be configured in production, so closed day votes cache and
+# read replica stickiness are shared between processes
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+# Optional current day restaurant leaderboard, so restaurant list doesn't rank all restaurants on every request.
+# Import path of callable returning redis-py compatible client, e.g. 'restaurants.leaderboards.InMemorySortedSetClient'
+# for single process. None disables leaderboard
+
+RESTAURANTS_LEADERBOARD_CLIENT = None
+
+# Weights of user first, second, ... votes for restaurant during a day, the last one applies to all further votes.
+# Next vote weight is kept in user day vote slot, so changed schedule applies to slots updated afterwards.
+# Weights must fit vote weight field validators (0.25 to 1), which is checked at startup
+
+RESTAURANTS_VOTE_WEIGHTS = [1, 0.5, 0.25]
+
+# Restaurant history reads votes of closed days aggregated by day from cache, aggregating only today's votes and
+# period boundaries live. Closed days are cached without expiration, so cache should be big enough
+
+RESTAURANTS_HISTORY_CLOSED_DAY_CACHE = False
+
+# Restaurant history and winners history are aggregated by NumPy from votes kept in process memory as columns,
+# loaded on first read and appended with new votes afterwards. Requires numpy package and memory for all votes
+
+RESTAURANTS_HISTORY_COLUMNAR_ENGINE = False
+
+# Alias of read replica database in DATABASES, which restaurant list, history and winners history are read from.
+# Users read from primary database for READ_REPLICA_STICKINESS seconds after their writes (votes, restaurant changes),
+# so replication lag doesn't hide them. None reads everything from default database
+
+READ_REPLICA_DATABASE = None
+
+READ_REPLICA_STICKINESS = 5
+
+DATABASE_ROUTERS = ['common.routers.ReadReplicaRouter']
+
+# Votes older than given days are rolled up per restaurant, user and day and moved to archive table by
+# compact_restaurant_votes command (e.g. run daily), so votes table keeps only recent votes
+
+RESTAURANTS_VOTE_ARCHIVE_DAYS = 90
+
+# Restaurant list and vote URLs are served by async views, so requests don't occupy threads under ASGI server
+# (e.g. uvicorn restaurant_voting.asgi:application). Database queries still run in threads with sync_to_async
+
+RESTAURANTS_ASYNC_VIEWS = False
+
+# Seconds between restaurant rating updates pushed by /restaurant/live/ stream. Changes of each restaurant during
+# interval are coalesced into single update
+
+RESTAURANTS_LIVE_INTERVAL = 1
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.0/topics/i18n/
 
@@ -95,6 +156,14 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Voting day (votes date, user daily vote count, daily tallies) begins at VOTING_DAY_START time in VOTING_DAY_TIME_ZONE,
+# e.g. 'Europe/Minsk' and time(4) for office voting day from 4 AM. None time zone means TIME_ZONE.
+# Vote date is saved with each vote, so changing these settings applies to votes given afterwards
+
+VOTING_DAY_TIME_ZONE = None
+
+VOTING_DAY_START = time(0)
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.0/howto/static-files/
@@ -110,7 +179,7 @@ AUTH_USER_MODEL = 'users.User'
 
 # djangorestframework settings
 REST_FRAMEWORK = {
-    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_FILTER_BACKENDS': ['common.filters.FilterSetBackend'],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50
 }
@@ -0,0 +1,23 @@
+"""
+Test settings, used by `python manage.py test`, so tests don't depend on developer local.py.
+'replica' alias is test mirror of default database, so read replica routing is tested without second database.
+"""
+from .base import *
+
+SECRET_KEY = 'test-secret-key'
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['testserver']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
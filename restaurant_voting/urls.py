@@ -16,7 +16,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from common.views import RequestStatsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('restaurant/', include('restaurants.urls')),
+    path('stats/requests/', RequestStatsView.as_view(), name='request_stats'),
 ]
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Restaurant, RestaurantUserVote
+from .models import ArchivedRestaurantUserVote, Restaurant, RestaurantDailyTally, RestaurantUserDailyVoteRollup, \
+    RestaurantUserVote
 
 
 class RestaurantUserVoteAdmin(admin.ModelAdmin):
@@ -10,5 +11,30 @@ class RestaurantUserVoteAdmin(admin.ModelAdmin):
         return super(RestaurantUserVoteAdmin, self).get_queryset(request).select_related('user', 'restaurant')
 
 
+class RestaurantDailyTallyAdmin(admin.ModelAdmin):
+    list_display = ['date', 'restaurant', 'rating', 'distinct_voted_users', 'votes_count']
+
+    def get_queryset(self, request):
+        return super(RestaurantDailyTallyAdmin, self).get_queryset(request).select_related('restaurant')
+
+
+class RestaurantUserDailyVoteRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'user', 'restaurant', 'rating', 'votes_count']
+
+    def get_queryset(self, request):
+        queryset = super(RestaurantUserDailyVoteRollupAdmin, self).get_queryset(request)
+        return queryset.select_related('user', 'restaurant')
+
+
+class ArchivedRestaurantUserVoteAdmin(admin.ModelAdmin):
+    list_display = ['user', 'restaurant', 'vote_weight', 'vote_date', 'voted_datetime']
+
+    def get_queryset(self, request):
+        return super(ArchivedRestaurantUserVoteAdmin, self).get_queryset(request).select_related('user', 'restaurant')
+
+
 admin.site.register(RestaurantUserVote, RestaurantUserVoteAdmin)
+admin.site.register(RestaurantDailyTally, RestaurantDailyTallyAdmin)
 admin.site.register(Restaurant)
+admin.site.register(RestaurantUserDailyVoteRollup, RestaurantUserDailyVoteRollupAdmin)
+admin.site.register(ArchivedRestaurantUserVote, ArchivedRestaurantUserVoteAdmin)
@@ -0,0 +1,207 @@
+import threading
+from datetime import date, timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import router
+from django.utils import timezone
+
+from .caches import ClosedDayVotesCache
+from .models import RestaurantUserDailyVoteRollup, RestaurantUserVote
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class VoteColumns:
+    """
+    Restaurant user votes and rollups kept in process memory as NumPy columns (restaurant id, user id, day ordinal,
+    weight), so history aggregations are computed by vectorized group-by instead of SQL.
+    Columns are loaded once and new votes are appended on every read. Votes created shortly before previous read
+    are read again, as their transactions may have committed later. Columns are loaded again when closed day votes
+    cache version changes (votes deletion) or after reload().
+    """
+    commit_lag = timedelta(seconds=5)
+    initial_capacity = 1024
+    chunk_size = 10000
+
+    def __init__(self):
+        if numpy is None:
+            raise ImproperlyConfigured('RESTAURANTS_HISTORY_COLUMNAR_ENGINE requires NumPy, install numpy package')
+        self.lock = threading.Lock()
+        self.version = None
+        self.columns = None
+        self.size = 0
+        self.appended_since = None
+        self.recent_vote_ids = set()
+
+    def get_columns(self):
+        """Returns (restaurant_ids, user_ids, days, weights) arrays of all votes, not changed by later appends"""
+        with self.lock:
+            version = ClosedDayVotesCache.get_version()
+            if version != self.version:
+                self.load()
+                self.version = version
+            else:
+                self.append_votes()
+
+            return tuple(column[:self.size] for column in self.columns)
+
+    def reload(self):
+        with self.lock:
+            self.version = None
+
+    def allocate(self, capacity):
+        """Allocates columns of given capacity keeping current rows, so appends don't copy columns every time"""
+        columns = (
+            numpy.zeros(capacity, dtype=numpy.int64),
+            numpy.zeros(capacity, dtype=numpy.int64),
+            numpy.zeros(capacity, dtype=numpy.int32),
+            numpy.zeros(capacity, dtype=numpy.float64),
+        )
+        if self.columns is not None:
+            for column, current_column in zip(columns, self.columns):
+                column[:self.size] = current_column[:self.size]
+        self.columns = columns
+
+    def add_rows(self, rows):
+        """Adds (restaurant_id, user_id, date, weight) rows, growing columns twice when they are full"""
+        rows = list(rows)
+        if self.size + len(rows) > len(self.columns[0]):
+            self.allocate(max(2 * len(self.columns[0]), self.size + len(rows)))
+
+        restaurant_ids, user_ids, days, weights = self.columns
+        end = self.size + len(rows)
+        restaurant_ids[self.size:end] = [restaurant_id for restaurant_id, _, _, _ in rows]
+        user_ids[self.size:end] = [user_id for _, user_id, _, _ in rows]
+        days[self.size:end] = [vote_date.toordinal() for _, _, vote_date, _ in rows]
+        weights[self.size:end] = [weight for _, _, _, weight in rows]
+        self.size = end
+
+    def load(self):
+        """Columns are kept updated afterwards, so they are loaded from primary database without replication lag"""
+        using = router.db_for_write(RestaurantUserVote)
+        self.appended_since = timezone.now()
+        self.columns = None
+        self.size = 0
+        self.allocate(self.initial_capacity)
+
+        rows = []
+        self.recent_vote_ids = set()
+        for vote_id, created_datetime, *row in RestaurantUserVote.objects.using(using).values_list(
+            'pk', 'created_datetime', 'restaurant_id', 'user_id', 'vote_date', 'vote_weight',
+        ).order_by().iterator(chunk_size=self.chunk_size):
+            if created_datetime >= self.appended_since - self.commit_lag:
+                self.recent_vote_ids.add(vote_id)
+            rows.append(row)
+            if len(rows) >= self.chunk_size:
+                self.add_rows(rows)
+                rows = []
+        self.add_rows(rows)
+        # Compacted days are loaded from rollups, single row of each user day is enough for rating and distinct users
+        self.add_rows(RestaurantUserDailyVoteRollup.objects.using(using).values_list(
+            'restaurant_id', 'user_id', 'date', 'rating',
+        ).order_by().iterator(chunk_size=self.chunk_size))
+
+    def append_votes(self):
+        """Appends votes created since previous read, skipping votes already read during commit lag"""
+        since = self.appended_since - self.commit_lag
+        self.appended_since = timezone.now()
+        votes = RestaurantUserVote.objects.using(router.db_for_write(RestaurantUserVote)).filter(
+            created_datetime__gte=since,
+        ).values_list('pk', 'restaurant_id', 'user_id', 'vote_date', 'vote_weight').order_by()
+
+        recent_vote_ids = set()
+        rows = []
+        for vote_id, *row in votes:
+            recent_vote_ids.add(vote_id)
+            if vote_id not in self.recent_vote_ids:
+                rows.append(row)
+        self.recent_vote_ids = recent_vote_ids
+        self.add_rows(rows)
+
+    def get_restaurant_totals(self, date_after=None, date_before=None):
+        """
+        Returns (ratings, distinct_voted_users) arrays indexed by restaurant id of votes from date_after to date_before
+        (exclusive). Distinct users are counted by sorting votes by restaurant and user and counting their changes.
+        """
+        restaurant_ids, user_ids, days, weights = self.get_columns()
+        period = numpy.ones(len(days), dtype=bool)
+        if date_after:
+            period &= days >= date_after.toordinal()
+        if date_before:
+            period &= days < date_before.toordinal()
+        restaurant_ids, user_ids, weights = restaurant_ids[period], user_ids[period], weights[period]
+
+        ratings = numpy.bincount(restaurant_ids, weights=weights)
+        order = numpy.lexsort((user_ids, restaurant_ids))
+        restaurant_ids, user_ids = restaurant_ids[order], user_ids[order]
+        is_new_voter = numpy.ones(len(order), dtype=bool)
+        is_new_voter[1:] = (restaurant_ids[1:] != restaurant_ids[:-1]) | (user_ids[1:] != user_ids[:-1])
+
+        return ratings, numpy.bincount(restaurant_ids[is_new_voter], minlength=len(ratings))
+
+    def get_day_winners(self, restaurant_ids_by_title, date_after=None, date_before=None, restaurant_ids=None):
+        """
+        Returns (date, restaurant_id, rating, distinct_voted_users) of winner restaurant of each day from date_after
+        to date_before (inclusive), ordered by date. Winner has the biggest rating, most distinct voted users and
+        the first title, given by restaurant ids ordered by title.
+        """
+        vote_restaurant_ids, user_ids, days, weights = self.get_columns()
+        selected = numpy.ones(len(days), dtype=bool)
+        if date_after:
+            selected &= days >= date_after.toordinal()
+        if date_before:
+            selected &= days <= date_before.toordinal()
+        if restaurant_ids:
+            selected &= numpy.isin(vote_restaurant_ids, list(restaurant_ids))
+        vote_restaurant_ids, user_ids, days, weights = (
+            vote_restaurant_ids[selected], user_ids[selected], days[selected], weights[selected]
+        )
+        if not len(days):
+            return []
+
+        order = numpy.lexsort((user_ids, vote_restaurant_ids, days))
+        vote_restaurant_ids, user_ids, days, weights = (
+            vote_restaurant_ids[order], user_ids[order], days[order], weights[order]
+        )
+        is_new_tally = numpy.ones(len(days), dtype=bool)
+        is_new_tally[1:] = (days[1:] != days[:-1]) | (vote_restaurant_ids[1:] != vote_restaurant_ids[:-1])
+        is_new_voter = is_new_tally.copy()
+        is_new_voter[1:] |= user_ids[1:] != user_ids[:-1]
+        tally_starts = numpy.flatnonzero(is_new_tally)
+        tally_days, tally_restaurant_ids = days[tally_starts], vote_restaurant_ids[tally_starts]
+        tally_ratings = numpy.add.reduceat(weights, tally_starts)
+        tally_voters = numpy.add.reduceat(is_new_voter.astype(numpy.int64), tally_starts)
+
+        restaurant_ids_by_title = list(restaurant_ids_by_title)
+        title_ranks = numpy.full(max(max(restaurant_ids_by_title, default=0), tally_restaurant_ids.max()) + 1, -1)
+        title_ranks[restaurant_ids_by_title] = numpy.arange(len(restaurant_ids_by_title))
+        order = numpy.lexsort((title_ranks[tally_restaurant_ids], -tally_voters, -tally_ratings, tally_days))
+        is_winner = numpy.ones(len(order), dtype=bool)
+        is_winner[1:] = tally_days[order][1:] != tally_days[order][:-1]
+        winners = order[is_winner]
+
+        return [
+            (date.fromordinal(int(day)), int(restaurant_id), float(rating), int(voters))
+            for day, restaurant_id, rating, voters in zip(
+                tally_days[winners], tally_restaurant_ids[winners], tally_ratings[winners], tally_voters[winners]
+            )
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_process_vote_columns():
+    return VoteColumns()
+
+
+def get_vote_columns():
+    """Returns process vote columns when RESTAURANTS_HISTORY_COLUMNAR_ENGINE is enabled, otherwise None"""
+    if not getattr(settings, 'RESTAURANTS_HISTORY_COLUMNAR_ENGINE', False):
+        return None
+
+    return get_process_vote_columns()
+
@@ -0,0 +1,83 @@
+import time
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+from itertools import chain
+
+from django.core.cache import cache
+from django.db import router
+from django.db.models import Sum
+
+
+class ClosedDayVotesCache:
+    """
+    Restaurant votes of closed days aggregated by restaurant into rating and distinct voter ids, kept in cache
+    without expiration, since votes of closed days don't change. Voter ids are kept as integer arrays, so voters of
+    several days are merged into distinct voters of period. Cache keys contain version, which is incremented when
+    closed day votes are changed.
+    """
+    version_key = 'restaurants:closed_day_votes:version'
+    cache_key = 'restaurants:closed_day_voters:{version}:{date}'
+
+    def __init__(self, votes_queryset, rollups_queryset=None):
+        self.votes_queryset = votes_queryset
+        self.rollups_queryset = rollups_queryset
+
+    @classmethod
+    def get_version(cls):
+        """Returns cache keys version. Evicted version is replaced by new one, so stale days are never read"""
+        cache.add(cls.version_key, time.time_ns(), timeout=None)
+
+        return cache.get(cls.version_key)
+
+    @classmethod
+    def invalidate(cls):
+        try:
+            cache.incr(cls.version_key)
+        except ValueError:
+            pass
+
+    def get_days(self, first_date, last_date):
+        """
+        Returns {date: {restaurant_id: (rating, voter_ids)}} of closed days from first_date to last_date.
+        Not cached days are aggregated in single query.
+        """
+        version = self.get_version()
+        dates = [first_date + timedelta(days=days) for days in range((last_date - first_date).days + 1)]
+        keys = {self.cache_key.format(version=version, date=date.isoformat()): date for date in dates}
+        days = {keys[key]: day for key, day in cache.get_many(keys).items()}
+
+        missing_dates = [date for date in dates if date not in days]
+        if missing_dates:
+            # Days are cached without expiration, so they are aggregated from primary database without replication lag
+            missing_days = self.aggregate_days(
+                missing_dates[0], missing_dates[-1], using=router.db_for_write(self.votes_queryset.model)
+            )
+            missing_days = {date: missing_days.get(date, {}) for date in missing_dates}
+            cache.set_many({
+                self.cache_key.format(version=version, date=date.isoformat()): day for date, day in missing_days.items()
+            }, timeout=None)
+            days.update(missing_days)
+
+        return days
+
+    def aggregate_days(self, first_date, last_date, using=None):
+        """Aggregates votes and rollups of compacted votes by day and restaurant into rating and sorted voter ids"""
+        votes = self.votes_queryset.using(using).filter(vote_date__gte=first_date, vote_date__lte=last_date)
+        votes = votes.values_list('vote_date', 'restaurant_id', 'user_id').annotate(rating=Sum('vote_weight'))
+        rows = [votes.order_by()]
+        if self.rollups_queryset is not None:
+            rollups = self.rollups_queryset.using(using).filter(date__gte=first_date, date__lte=last_date)
+            rows.append(rollups.values_list('date', 'restaurant_id', 'user_id', 'rating').order_by())
+
+        ratings = defaultdict(float)
+        voters = defaultdict(set)
+        for date, restaurant_id, user_id, user_rating in chain.from_iterable(row.iterator() for row in rows):
+            ratings[date, restaurant_id] += user_rating
+            voters[date, restaurant_id].add(user_id)
+
+        days = {}
+        for (date, restaurant_id), rating in ratings.items():
+            days.setdefault(date, {})[restaurant_id] = (rating, array('q', sorted(voters[date, restaurant_id])))
+
+        return days
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Error, register
+from django.core.validators import MaxValueValidator, MinValueValidator
+
+from .models import RestaurantUserVote
+
+
+@register()
+def check_vote_weights(app_configs, **kwargs):
+    """Vote weights setting must fit vote weight field validators, so given votes stay valid in forms and admin"""
+    vote_weights = getattr(settings, 'RESTAURANTS_VOTE_WEIGHTS', None)
+    if not vote_weights:
+        return []
+
+    validators = RestaurantUserVote._meta.get_field('vote_weight').validators
+    min_weight = max(validator.limit_value for validator in validators if isinstance(validator, MinValueValidator))
+    max_weight = min(validator.limit_value for validator in validators if isinstance(validator, MaxValueValidator))
+    invalid_weights = [
+        weight for weight in vote_weights
+        if not isinstance(weight, (int, float)) or not min_weight <= weight <= max_weight
+    ]
+    if invalid_weights:
+        return [Error(
+            f'RESTAURANTS_VOTE_WEIGHTS must be numbers from {min_weight} to {max_weight}.',
+            hint=f'Invalid weights: {invalid_weights}.',
+            obj='RESTAURANTS_VOTE_WEIGHTS',
+            id='restaurants.E001',
+        )]
+
+    return []
@@ -2,7 +2,7 @@ from django.utils.translation import gettext_lazy as _
 
 from django_filters import rest_framework
 
-from .models import Restaurant, RestaurantUserVote
+from .models import Restaurant, RestaurantDailyTally
 
 
 class RestaurantHistoryFilter(rest_framework.FilterSet):
@@ -16,8 +16,8 @@ class RestaurantHistoryFilter(rest_framework.FilterSet):
 
 class RestaurantWinnersHistoryFilter(rest_framework.FilterSet):
     restaurants = rest_framework.AllValuesMultipleFilter(field_name='restaurant_id', label=_('restaurants'))
-    date = rest_framework.DateFromToRangeFilter(field_name='created_datetime', label=_('date'))
+    date = rest_framework.DateFromToRangeFilter(field_name='date', label=_('date'))
 
     class Meta:
-        model = RestaurantUserVote
+        model = RestaurantDailyTally
         fields = ['restaurants', 'date']
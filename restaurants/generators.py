@@ -0,0 +1,119 @@
+import random
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from common.utils import get_day_datetime_range, get_voting_date
+
+from .models import Restaurant, RestaurantUserVote
+
+
+class VoteDataGenerator:
+    """
+    Generates users, restaurants and their votes for last days with bulk_create, respecting user daily vote count
+    and vote weights. Restaurant popularity follows Zipf distribution, so few restaurants get most votes.
+    """
+    username_prefix = 'generated-user-'
+    title_prefix = 'Generated restaurant '
+
+    def __init__(self, users_count, restaurants_count, days_count, max_user_votes_per_day=3, seed=None,
+                 batch_size=5000):
+        self.users_count = users_count
+        self.restaurants_count = restaurants_count
+        self.days_count = days_count
+        self.max_user_votes_per_day = max_user_votes_per_day
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.run_prefix = uuid.UUID(int=self.random.getrandbits(128)).hex[:8]
+
+    @classmethod
+    def clear(cls):
+        """Deletes generated users and restaurants with their votes"""
+        Restaurant.objects.filter(title__startswith=cls.title_prefix).delete()
+        get_user_model().objects.filter(username__startswith=cls.username_prefix).delete()
+
+    def create_users(self):
+        password = make_password(None)
+        get_user_model().objects.bulk_create([
+            get_user_model()(
+                username=f'{self.username_prefix}{self.run_prefix}-{i}', password=password,
+                daily_vote_count=self.random.randint(1, 4),
+            ) for i in range(self.users_count)
+        ], batch_size=self.batch_size)
+
+        return list(get_user_model().objects.filter(username__startswith=f'{self.username_prefix}{self.run_prefix}-'))
+
+    def create_restaurants(self):
+        Restaurant.objects.bulk_create([
+            Restaurant(title=f'{self.title_prefix}{self.run_prefix}-{i}', address=f'Generated street {i}')
+            for i in range(self.restaurants_count)
+        ], batch_size=self.batch_size)
+
+        return list(Restaurant.objects.filter(title__startswith=f'{self.title_prefix}{self.run_prefix}-'))
+
+    def get_day_votes(self, date, users, restaurants, popularity):
+        """Returns votes of single day, each user voting for restaurant no more than user daily vote count times"""
+        day_start, _ = get_day_datetime_range(date)
+        votes = []
+        for user in users:
+            user_votes_counts = {}
+            user_votes_count = self.random.randint(0, self.max_user_votes_per_day)
+            for vote_seconds in sorted(self.random.randint(0, 24 * 60 * 60 - 1) for _ in range(user_votes_count)):
+                restaurant = self.random.choices(restaurants, cum_weights=popularity)[0]
+                votes_count = user_votes_counts.get(restaurant.pk, 0)
+                if votes_count >= user.daily_vote_count:
+                    continue
+                user_votes_counts[restaurant.pk] = votes_count + 1
+                created_datetime = day_start + timedelta(seconds=vote_seconds)
+                if created_datetime > timezone.now():
+                    created_datetime = timezone.now()
+                votes.append(RestaurantUserVote(
+                    user=user, restaurant=restaurant, vote_weight=Restaurant.get_vote_weight(votes_count),
+                    created_datetime=created_datetime, vote_date=date,
+                ))
+
+        return votes
+
+    def create_votes(self, date, votes):
+        """
+        Saves votes of single day with bulk_create, which sets created_datetime to current time, so their generated
+        created_datetime is saved afterwards with bulk_update. Primary keys of created votes are read by vote date of
+        generated users when database doesn't return them.
+        """
+        created_datetimes = [vote.created_datetime for vote in votes]
+        RestaurantUserVote.objects.bulk_create(votes, batch_size=self.batch_size)
+        if votes and votes[0].pk is None:
+            pks = RestaurantUserVote.objects.filter(
+                user__username__startswith=f'{self.username_prefix}{self.run_prefix}-', vote_date=date,
+            ).order_by('pk').values_list('pk', flat=True)
+            for vote, pk in zip(votes, pks):
+                vote.pk = pk
+        for vote, created_datetime in zip(votes, created_datetimes):
+            vote.created_datetime = created_datetime
+        RestaurantUserVote.objects.bulk_update(votes, ['created_datetime'], batch_size=self.batch_size)
+
+    @transaction.atomic
+    def generate(self):
+        """
+        Generates data and returns count of created votes. Restaurant daily tallies and totals should be rebuilt
+        afterwards
+        """
+        users = self.create_users()
+        restaurants = self.create_restaurants()
+        popularity = []
+        for rank in range(1, len(restaurants) + 1):
+            popularity.append((popularity[-1] if popularity else 0) + 1 / rank)
+
+        votes_count = 0
+        today = get_voting_date()
+        for days in range(self.days_count - 1, -1, -1):
+            date = today - timedelta(days=days)
+            votes = self.get_day_votes(date, users, restaurants, popularity)
+            self.create_votes(date, votes)
+            votes_count += len(votes)
+
+        return votes_count
@@ -0,0 +1,265 @@
+import threading
+import time
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class InMemorySortedSetClient:
+    """
+    Process local client implementing subset of redis-py client commands used by restaurant leaderboard.
+    Used in tests and single process deployments, where external store isn't available.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.values = {}
+        self.expire_times = {}
+
+    def get_value(self, name, default_type=None):
+        """Returns value of not expired key, creating it with default_type when it's given"""
+        expire_time = self.expire_times.get(name)
+        if expire_time is not None and expire_time <= time.monotonic():
+            self.delete(name)
+        if name not in self.values and default_type is not None:
+            self.values[name] = default_type()
+
+        return self.values.get(name)
+
+    @staticmethod
+    def parse_score(score):
+        """Parses score boundary, where '(' prefix means exclusive boundary"""
+        score = str(score)
+        if score.startswith('('):
+            return float(score[1:]), True
+
+        return float(score), False
+
+    @classmethod
+    def is_score_in_range(cls, score, min_score, max_score):
+        min_score, is_min_exclusive = cls.parse_score(min_score)
+        max_score, is_max_exclusive = cls.parse_score(max_score)
+
+        return (
+            (min_score < score if is_min_exclusive else min_score <= score)
+            and (score < max_score if is_max_exclusive else score <= max_score)
+        )
+
+    def get_sorted_members(self, name):
+        """Returns (member, score) pairs of sorted set ordered by descending score and descending member"""
+        return sorted((self.get_value(name) or {}).items(), key=lambda item: (item[1], item[0]), reverse=True)
+
+    def set(self, name, value, ex=None, nx=False):
+        with self.lock:
+            if nx and self.get_value(name) is not None:
+                return None
+            self.values[name] = value
+            self.expire_times.pop(name, None)
+            if ex is not None:
+                self.expire(name, ex)
+
+            return True
+
+    def exists(self, *names):
+        with self.lock:
+            return sum(self.get_value(name) is not None for name in names)
+
+    def expire(self, name, time_to_live):
+        with self.lock:
+            if self.get_value(name) is None:
+                return False
+            if isinstance(time_to_live, timedelta):
+                time_to_live = time_to_live.total_seconds()
+            self.expire_times[name] = time.monotonic() + time_to_live
+
+            return True
+
+    def delete(self, *names):
+        with self.lock:
+            deleted_count = 0
+            for name in names:
+                self.expire_times.pop(name, None)
+                deleted_count += int(self.values.pop(name, None) is not None)
+
+            return deleted_count
+
+    def zadd(self, name, mapping):
+        with self.lock:
+            sorted_set = self.get_value(name, dict)
+            added_count = len({str(member) for member in mapping} - set(sorted_set))
+            sorted_set.update({str(member): float(score) for member, score in mapping.items()})
+
+            return added_count
+
+    def zincrby(self, name, amount, value):
+        with self.lock:
+            sorted_set = self.get_value(name, dict)
+            sorted_set[str(value)] = sorted_set.get(str(value), 0.0) + amount
+
+            return sorted_set[str(value)]
+
+    def zrem(self, name, *values):
+        with self.lock:
+            sorted_set = self.get_value(name) or {}
+
+            return sum(sorted_set.pop(str(value), None) is not None for value in values)
+
+    def zcard(self, name):
+        with self.lock:
+            return len(self.get_value(name) or {})
+
+    def zcount(self, name, min, max):
+        with self.lock:
+            return sum(
+                self.is_score_in_range(score, min, max) for score in (self.get_value(name) or {}).values()
+            )
+
+    def zrevrange(self, name, start, end, withscores=False):
+        with self.lock:
+            members = self.get_sorted_members(name)[start:None if end == -1 else end + 1]
+
+            return members if withscores else [member for member, _ in members]
+
+    def zrevrangebyscore(self, name, max, min, withscores=False):
+        with self.lock:
+            members = [
+                (member, score) for member, score in self.get_sorted_members(name)
+                if self.is_score_in_range(score, min, max)
+            ]
+
+            return members if withscores else [member for member, _ in members]
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        with self.lock:
+            mapping = dict(mapping or {})
+            if key is not None:
+                mapping[key] = value
+            self.get_value(name, dict).update({str(key): str(value) for key, value in mapping.items()})
+
+            return len(mapping)
+
+    def hincrby(self, name, key, amount=1):
+        with self.lock:
+            hash_value = self.get_value(name, dict)
+            hash_value[str(key)] = str(int(hash_value.get(str(key), 0)) + amount)
+
+            return int(hash_value[str(key)])
+
+    def hmget(self, name, keys):
+        with self.lock:
+            hash_value = self.get_value(name) or {}
+
+            return [hash_value.get(str(key)) for key in keys]
+
+    def hdel(self, name, *keys):
+        with self.lock:
+            hash_value = self.get_value(name) or {}
+
+            return sum(hash_value.pop(str(key), None) is not None for key in keys)
+
+
+class RestaurantLeaderboard:
+    """
+    Current day restaurant ratings kept in sorted set and distinct voted users kept in hash of redis compatible
+    store, so restaurant list page is read without aggregating all restaurant daily tallies.
+    Leaderboard of the day is built from restaurant daily tallies on first read, votes are added after commit.
+    """
+    key_prefix = 'restaurants:leaderboard:{date}'
+    timeout = timedelta(days=2)
+
+    def __init__(self, client):
+        self.client = client
+
+    def get_keys(self, date):
+        """Returns ratings sorted set, distinct voted users hash and built marker keys of leaderboard day"""
+        prefix = self.key_prefix.format(date=date.isoformat())
+
+        return f'{prefix}:ratings', f'{prefix}:distinct_voted_users', f'{prefix}:built'
+
+    def is_built(self, date):
+        _, _, built_key = self.get_keys(date)
+
+        return bool(self.client.exists(built_key))
+
+    def build(self, date, tallies):
+        """
+        Sets leaderboard day scores from restaurant daily tallies, unless other process already builds it.
+        Votes are counted since built marker is set, so only votes committed between tallies read and scores write
+        can be lost. Such drift is fixed by rebuilding restaurant daily tallies.
+        """
+        ratings_key, distinct_voted_users_key, built_key = self.get_keys(date)
+        if not self.client.set(built_key, 1, ex=self.timeout, nx=True):
+            return
+
+        ratings = {}
+        distinct_voted_users = {}
+        for tally in tallies:
+            ratings[tally.restaurant_id] = tally.rating
+            distinct_voted_users[tally.restaurant_id] = tally.distinct_voted_users
+        if ratings:
+            self.client.zadd(ratings_key, ratings)
+            self.client.hset(distinct_voted_users_key, mapping=distinct_voted_users)
+        self.client.expire(ratings_key, self.timeout)
+        self.client.expire(distinct_voted_users_key, self.timeout)
+
+    def invalidate(self, date):
+        """Deletes leaderboard day, so it's built again on next read"""
+        self.client.delete(*self.get_keys(date))
+
+    def add_votes(self, date, restaurant_id, rating, new_voters_count):
+        """Adds committed votes to built leaderboard day. Not built day will get votes from tallies when built"""
+        if not self.is_built(date):
+            return
+
+        ratings_key, distinct_voted_users_key, _ = self.get_keys(date)
+        self.client.zincrby(ratings_key, rating, restaurant_id)
+        self.client.hincrby(distinct_voted_users_key, restaurant_id, new_voters_count)
+
+    def remove_restaurant(self, date, restaurant_id):
+        ratings_key, distinct_voted_users_key, _ = self.get_keys(date)
+        self.client.zrem(ratings_key, restaurant_id)
+        self.client.hdel(distinct_voted_users_key, restaurant_id)
+
+    def count(self, date):
+        """Returns count of restaurants, which got votes during leaderboard day"""
+        ratings_key, _, _ = self.get_keys(date)
+
+        return self.client.zcard(ratings_key)
+
+    def get_range(self, date, start, stop):
+        """
+        Returns rank of first entry and (restaurant_id, rating, distinct_voted_users) entries ranked from start to stop
+        by rating. Range is extended by all restaurants having the same rating as range boundaries, so entries can be
+        ordered by distinct voted users and title.
+        """
+        ratings_key, distinct_voted_users_key, _ = self.get_keys(date)
+        boundary_ratings = self.client.zrevrange(ratings_key, start, stop - 1, withscores=True)
+        if not boundary_ratings:
+            return start, []
+
+        max_rating = boundary_ratings[0][1]
+        min_rating = boundary_ratings[-1][1]
+        first_rank = self.client.zcount(ratings_key, f'({max_rating!r}', '+inf')
+        ratings = self.client.zrevrangebyscore(ratings_key, max_rating, min_rating, withscores=True)
+        distinct_voted_users = self.client.hmget(distinct_voted_users_key, [member for member, _ in ratings])
+
+        return first_rank, [
+            (int(member), rating, int(voted_users or 0))
+            for (member, rating), voted_users in zip(ratings, distinct_voted_users)
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_leaderboard_client(client_path):
+    return import_string(client_path)()
+
+
+def get_leaderboard():
+    """Returns restaurant leaderboard configured with RESTAURANTS_LEADERBOARD_CLIENT or None when it's disabled"""
+    client_path = getattr(settings, 'RESTAURANTS_LEADERBOARD_CLIENT', None)
+    if client_path is None:
+        return None
+
+    return RestaurantLeaderboard(get_leaderboard_client(client_path))
@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from common.utils import get_voting_date
+
+from .models import RestaurantDailyTally
+
+
+class RestaurantRatingBroadcaster:
+    """
+    Pushes current day restaurant rating changes to connected Server-Sent Events clients.
+    Single ticker thread of process reads restaurant daily tallies updated since previous tick with one query and
+    publishes one event with changed restaurants, so database load doesn't depend on connected clients count and
+    each restaurant is updated at most once per interval. Tallies are updated by votes of every process.
+    """
+    heartbeat_interval = 15
+    history_size = 100
+    commit_lag = timedelta(seconds=5)
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.condition = threading.Condition()
+        self.events = deque(maxlen=self.history_size)
+        self.last_event_id = 0
+        self.clients_count = 0
+        self.ticker = None
+        self.date = None
+        self.ratings = {}
+        self.updated_since = None
+
+    def tick(self):
+        """
+        Publishes event with restaurants which rating or distinct voted users changed since previous tick.
+        Tallies updated shortly before previous tick are read again, as their transactions may have committed later,
+        unchanged ones are skipped. First tick after ticker is started only reads current ratings.
+        """
+        now = timezone.now()
+        date = get_voting_date(now)
+        is_first_tick = self.date is None
+        if date != self.date:
+            self.date = date
+            self.ratings = {}
+            self.updated_since = None
+
+        tallies = RestaurantDailyTally.objects.filter(date=date)
+        if self.updated_since is not None:
+            tallies = tallies.filter(updated_datetime__gte=self.updated_since - self.commit_lag)
+        self.updated_since = now
+
+        restaurants = []
+        for restaurant_id, rating, distinct_voted_users in tallies.values_list(
+            'restaurant_id', 'rating', 'distinct_voted_users'
+        ).order_by():
+            previous_rating, previous_distinct_voted_users = self.ratings.get(restaurant_id, (0.0, 0))
+            if (rating, distinct_voted_users) == (previous_rating, previous_distinct_voted_users):
+                continue
+            self.ratings[restaurant_id] = (rating, distinct_voted_users)
+            restaurants.append({
+                'restaurant_id': restaurant_id,
+                'rating': rating,
+                'distinct_voted_users': distinct_voted_users,
+                'rating_delta': rating - previous_rating,
+                'distinct_voted_users_delta': distinct_voted_users - previous_distinct_voted_users,
+            })
+
+        if restaurants and not is_first_tick:
+            self.publish({'date': date, 'restaurants': sorted(restaurants, key=lambda row: row['restaurant_id'])})
+
+    def publish(self, data):
+        """Serializes event once for all clients and wakes them up"""
+        with self.condition:
+            self.last_event_id += 1
+            self.events.append((self.last_event_id, (
+                f'id: {self.last_event_id}\nevent: ratings\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+            )))
+            self.condition.notify_all()
+
+    def get_events_after(self, event_id):
+        return [message for message_id, message in self.events if message_id > event_id]
+
+    def stream(self, last_event_id=None):
+        """
+        Yields SSE messages published after client connected, or after last_event_id when client reconnects and
+        events are still kept. Comment is sent after heartbeat interval without events, so proxies keep connection.
+        """
+        self.connect()
+        try:
+            event_id = self.last_event_id
+            if last_event_id is not None and 0 <= last_event_id < event_id:
+                event_id = last_event_id
+            yield f'retry: {int(self.interval * 1000)}\n\n'
+
+            while True:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.last_event_id > event_id, timeout=self.heartbeat_interval)
+                    messages = self.get_events_after(event_id)
+                    event_id = self.last_event_id
+                yield ''.join(messages) if messages else ': heartbeat\n\n'
+        finally:
+            self.disconnect()
+
+    def connect(self):
+        with self.condition:
+            self.clients_count += 1
+            if self.ticker is None:
+                self.start_ticker()
+
+    def disconnect(self):
+        with self.condition:
+            self.clients_count -= 1
+
+    def start_ticker(self):
+        """Ratings known by stopped ticker may be stale, so they are read again by first tick"""
+        self.date = None
+        self.ticker = threading.Thread(target=self.run_ticker, name='restaurant-rating-broadcaster', daemon=True)
+        self.ticker.start()
+
+    def run_ticker(self):
+        """Ticks while clients are connected"""
+        try:
+            while True:
+                try:
+                    self.tick()
+                except DatabaseError:
+                    connection.close()
+                time.sleep(self.interval)
+                with self.condition:
+                    if not self.clients_count:
+                        self.ticker = None
+                        return
+        finally:
+            connection.close()
+
+
+@lru_cache(maxsize=None)
+def get_broadcaster(interval):
+    return RestaurantRatingBroadcaster(interval)
+
+
+def get_live_broadcaster():
+    """Returns process restaurant rating broadcaster ticking every RESTAURANTS_LIVE_INTERVAL seconds"""
+    return get_broadcaster(getattr(settings, 'RESTAURANTS_LIVE_INTERVAL', 1))
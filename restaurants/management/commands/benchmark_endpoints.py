@@ -0,0 +1,202 @@
+import json
+import platform
+import statistics
+import time
+from argparse import ArgumentTypeError
+from collections import Counter
+from io import StringIO
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from common.utils import get_percentile
+from restaurants.generators import VoteDataGenerator
+from restaurants.models import Restaurant
+
+
+def scale(value):
+    """Parses USERSxRESTAURANTSxDAYS scale argument"""
+    try:
+        users_count, restaurants_count, days_count = (int(count) for count in value.lower().split('x'))
+    except ValueError:
+        raise ArgumentTypeError(f'Scale should be USERSxRESTAURANTSxDAYS, got {value}')
+
+    return users_count, restaurants_count, days_count
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates vote data at given scales and times every restaurant endpoint, reporting latency percentiles '
+        'and query counts. Runs in separate test database unless --use-current-database is given.'
+    )
+    endpoints = [
+        'restaurant_list', 'restaurant_history', 'restaurant_winners_history', 'restaurant_vote',
+        'restaurant_bulk_vote', 'restaurant_create', 'restaurant_update', 'restaurant_delete',
+    ]
+    bulk_vote_size = 100
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=scale, action='append', dest='scales',
+            help='Generated data size as USERSxRESTAURANTSxDAYS, can be repeated (default: 100x10x7 and 1000x100x30)',
+        )
+        parser.add_argument('--requests', type=int, default=20, help='Timed requests of each endpoint at each scale')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of generated data')
+        parser.add_argument('--output', help='Path of JSON file results are saved to')
+        parser.add_argument('--compare', help='Path of JSON file with previous results to compare with')
+        parser.add_argument(
+            '--use-current-database', action='store_true',
+            help='Generate data in configured database instead of separate test database. Generated data is deleted',
+        )
+
+    def handle(self, *args, **options):
+        scales = options['scales'] or [(100, 10, 7), (1000, 100, 30)]
+        if not options['use_current_database']:
+            old_database_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                results = [self.benchmark_scale(*scale, options['requests'], options['seed']) for scale in scales]
+        finally:
+            if options['use_current_database']:
+                VoteDataGenerator.clear()
+            else:
+                connection.creation.destroy_test_db(old_database_name, verbosity=0)
+
+        report = {
+            'metadata': {
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'requests': options['requests'],
+                'seed': options['seed'],
+            },
+            'scales': results,
+        }
+        self.write_report(report)
+        if options['compare']:
+            with open(options['compare']) as file:
+                self.write_comparison(json.load(file), report)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+
+    def benchmark_scale(self, users_count, restaurants_count, days_count, requests_count, seed):
+        out = StringIO()
+        call_command(
+            'generate_vote_data', users=users_count, restaurants=restaurants_count, days=days_count, seed=seed,
+            clear=True, stdout=out,
+        )
+        users = list(get_user_model().objects.filter(
+            username__startswith=VoteDataGenerator.username_prefix,
+        ).order_by('pk'))
+        restaurants = list(Restaurant.objects.filter(title__startswith=VoteDataGenerator.title_prefix).order_by('pk'))
+        admin = get_user_model().objects.create(username=f'{VoteDataGenerator.username_prefix}admin', is_staff=True)
+
+        requests = {
+            'restaurant_list': lambda i: ('get', reverse('restaurant_list'), None, users[i % len(users)]),
+            'restaurant_history': lambda i: ('get', reverse('restaurant_history'), None, users[i % len(users)]),
+            'restaurant_winners_history': lambda i: (
+                'get', reverse('restaurant_winners_history'), None, users[i % len(users)]
+            ),
+            'restaurant_vote': lambda i: (
+                'post', reverse('restaurant_vote', kwargs={'pk': restaurants[i % len(restaurants)].pk}), None,
+                users[i % len(users)],
+            ),
+            'restaurant_bulk_vote': lambda i: ('post', reverse('restaurant_bulk_vote'), {'votes': [
+                {'user': users[(i + j) % len(users)].pk, 'restaurant': restaurants[j % len(restaurants)].pk}
+                for j in range(self.bulk_vote_size)
+            ]}, admin),
+            'restaurant_create': lambda i: ('post', reverse('restaurant_create'), {
+                'title': f'{VoteDataGenerator.title_prefix}benchmark-{i}', 'address': f'Benchmark street {i}',
+            }, users[0]),
+            'restaurant_update': lambda i: ('put', reverse('restaurant_update', kwargs={'pk': created[i].pk}), {
+                'title': f'{VoteDataGenerator.title_prefix}benchmark-updated-{i}', 'address': created[i].address,
+            }, users[0]),
+            'restaurant_delete': lambda i: (
+                'delete', reverse('restaurant_delete', kwargs={'pk': created[i].pk}), None, users[0]
+            ),
+        }
+        endpoints = {}
+        for name in self.endpoints:
+            if name == 'restaurant_update':
+                created = list(Restaurant.objects.filter(
+                    title__startswith=f'{VoteDataGenerator.title_prefix}benchmark-',
+                ).order_by('pk'))
+            endpoints[name] = self.benchmark_endpoint(requests[name], requests_count)
+
+        return {
+            'scale': f'{users_count}x{restaurants_count}x{days_count}',
+            'users': users_count,
+            'restaurants': restaurants_count,
+            'days': days_count,
+            'summary': out.getvalue().strip().splitlines()[-1],
+            'endpoints': endpoints,
+        }
+
+    @staticmethod
+    def benchmark_endpoint(get_request, requests_count):
+        client = APIClient()
+        durations = []
+        queries_counts = []
+        statuses = Counter()
+        for i in range(requests_count):
+            method, url, data, user = get_request(i)
+            client.force_authenticate(user)
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = getattr(client, method)(url, data, format='json')
+                durations.append((time.perf_counter() - start) * 1000)
+            queries_counts.append(len(queries))
+            statuses[str(response.status_code)] += 1
+
+        durations.sort()
+        return {
+            'requests': requests_count,
+            'statuses': dict(statuses),
+            'latency_ms': {
+                'p50': get_percentile(durations, 50),
+                'p90': get_percentile(durations, 90),
+                'p99': get_percentile(durations, 99),
+                'mean': statistics.mean(durations),
+                'max': durations[-1],
+            },
+            'queries': {'mean': statistics.mean(queries_counts), 'max': max(queries_counts)},
+        }
+
+    def write_report(self, report):
+        for result in report['scales']:
+            self.stdout.write(f'{result["scale"]} (users x restaurants x days): {result["summary"]}')
+            for name, stats in result['endpoints'].items():
+                latency = stats['latency_ms']
+                statuses = ', '.join(f'{status}: {count}' for status, count in sorted(stats['statuses'].items()))
+                self.stdout.write(
+                    f'  {name}: p50 {latency["p50"]:.1f} ms, p90 {latency["p90"]:.1f} ms, p99 {latency["p99"]:.1f} ms, '
+                    f'{stats["queries"]["mean"]:.1f} queries ({statuses})'
+                )
+
+    def write_comparison(self, previous_report, report):
+        previous_endpoints = {
+            (result['scale'], name): stats
+            for result in previous_report['scales'] for name, stats in result['endpoints'].items()
+        }
+        for result in report['scales']:
+            for name, stats in result['endpoints'].items():
+                previous_stats = previous_endpoints.get((result['scale'], name))
+                if previous_stats is None:
+                    continue
+                before = previous_stats['latency_ms']['p50']
+                after = stats['latency_ms']['p50']
+                self.stdout.write(
+                    f'{result["scale"]} {name}: p50 {before:.1f} ms -> {after:.1f} ms ({after / before:.2f}x), '
+                    f'queries {previous_stats["queries"]["mean"]:.1f} -> {stats["queries"]["mean"]:.1f}'
+                )
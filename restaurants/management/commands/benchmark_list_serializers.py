@@ -0,0 +1,106 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from rest_framework import serializers
+from rest_framework.reverse import reverse
+
+from restaurants.models import Restaurant, RestaurantDailyTally
+from restaurants.serializers import RestaurantListBaseSerializer, RestaurantsListSerializer, RestaurantWinnersHistory
+
+
+class ModelRestaurantListBaseSerializer(serializers.ModelSerializer):
+    distinct_voted_users = serializers.ReadOnlyField()
+    rating = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Restaurant
+        fields = ('title', 'address', 'distinct_voted_users', 'rating')
+
+
+class ModelRestaurantsListSerializer(ModelRestaurantListBaseSerializer):
+    user_vote_count_today = serializers.ReadOnlyField()
+    can_user_vote_today = serializers.ReadOnlyField()
+    vote_url = serializers.SerializerMethodField()
+
+    @staticmethod
+    def get_vote_url(obj):
+        return reverse('restaurant_vote', kwargs={'pk': obj.pk})
+
+    class Meta:
+        model = Restaurant
+        fields = (
+            'title', 'address', 'distinct_voted_users', 'rating', 'user_vote_count_today', 'can_user_vote_today',
+            'vote_url',
+        )
+
+
+class ModelRestaurantWinnersHistory(serializers.ModelSerializer):
+    date = serializers.ReadOnlyField()
+    restaurant_id = serializers.ReadOnlyField()
+    title = serializers.ReadOnlyField(source='restaurant.title')
+    address = serializers.ReadOnlyField(source='restaurant.address')
+    total_distinct_users_voted = serializers.ReadOnlyField(source='distinct_voted_users')
+
+    class Meta:
+        model = RestaurantDailyTally
+        fields = ('date', 'restaurant_id', 'title', 'address', 'rating', 'total_distinct_users_voted')
+
+
+class Command(BaseCommand):
+    help = 'Compares rows per second of list serializers with equivalent ModelSerializers on in-memory objects'
+    benchmarks = [
+        ('restaurant history', ModelRestaurantListBaseSerializer, RestaurantListBaseSerializer, 'get_restaurants'),
+        ('restaurant list', ModelRestaurantsListSerializer, RestaurantsListSerializer, 'get_restaurants'),
+        ('winners history', ModelRestaurantWinnersHistory, RestaurantWinnersHistory, 'get_tallies'),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows serialized in each run')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs of each serializer, best run is reported')
+
+    @staticmethod
+    def get_restaurants(rows):
+        restaurants = []
+        for pk in range(1, rows + 1):
+            restaurant = Restaurant(pk=pk, title=f'Restaurant {pk}', address=f'Address {pk}')
+            restaurant.distinct_voted_users = pk % 7
+            restaurant.rating = pk % 13 * 0.25
+            restaurant.user_vote_count_today = pk % 3
+            restaurant.can_user_vote_today = pk % 2 == 0
+            restaurants.append(restaurant)
+
+        return restaurants
+
+    def get_tallies(self, rows):
+        return [
+            RestaurantDailyTally(
+                restaurant=restaurant, date=date(2020, 1, 1), rating=restaurant.rating,
+                distinct_voted_users=restaurant.distinct_voted_users,
+            ) for restaurant in self.get_restaurants(rows)
+        ]
+
+    @classmethod
+    def get_rows_per_second(cls, serializer_class, objects, repeat):
+        best_duration = min(cls.time_serialization(serializer_class, objects) for _ in range(repeat))
+
+        return len(objects) / best_duration
+
+    @staticmethod
+    def time_serialization(serializer_class, objects):
+        start = time.perf_counter()
+        serializer_class(objects, many=True).data
+
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        for name, model_serializer_class, serializer_class, get_objects in self.benchmarks:
+            objects = getattr(self, get_objects)(options['rows'])
+            if model_serializer_class(objects, many=True).data != serializer_class(objects, many=True).data:
+                self.stderr.write(f'{name} serializers return different data')
+            before = self.get_rows_per_second(model_serializer_class, objects, options['repeat'])
+            after = self.get_rows_per_second(serializer_class, objects, options['repeat'])
+            self.stdout.write(
+                f'{name}: {before:,.0f} rows/s before, {after:,.0f} rows/s after ({after / before:.1f}x)'
+            )
@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.db.models import Count, Sum
+
+from common.utils import get_voting_date
+from restaurants.models import ArchivedRestaurantUserVote, RestaurantUserDailyVoteCount, \
+    RestaurantUserDailyVoteRollup, RestaurantUserVote
+
+
+class Command(BaseCommand):
+    help = (
+        'Rolls restaurant user votes older than archive horizon into per restaurant, user and day rollups and moves '
+        'them to archive table, so votes table keeps only recent votes. History results are unchanged.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'RESTAURANTS_VOTE_ARCHIVE_DAYS', None),
+            help='Votes of voting days older than given days are compacted (default: RESTAURANTS_VOTE_ARCHIVE_DAYS)',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows created in single query')
+
+    @staticmethod
+    @transaction.atomic
+    def compact_day(date, batch_size):
+        """
+        Compacts votes of single day in one transaction, adding them to earlier rollups. Returns votes count.
+        """
+        votes = RestaurantUserVote.objects.filter(vote_date=date)
+        rollups = {
+            (rollup.restaurant_id, rollup.user_id): rollup
+            for rollup in RestaurantUserDailyVoteRollup.objects.select_for_update().filter(date=date)
+        }
+        new_rollups = []
+        for row in votes.values('restaurant_id', 'user_id').annotate(
+            rating=Sum('vote_weight'), votes_count=Count('pk'),
+        ).order_by():
+            rollup = rollups.get((row['restaurant_id'], row['user_id']))
+            if rollup is None:
+                new_rollups.append(RestaurantUserDailyVoteRollup(date=date, **row))
+            else:
+                rollup.rating += row['rating']
+                rollup.votes_count += row['votes_count']
+        RestaurantUserDailyVoteRollup.objects.bulk_create(new_rollups, batch_size=batch_size)
+        RestaurantUserDailyVoteRollup.objects.bulk_update(
+            rollups.values(), ['rating', 'votes_count'], batch_size=batch_size
+        )
+
+        archived_votes = ArchivedRestaurantUserVote.objects.bulk_create((
+            ArchivedRestaurantUserVote(
+                vote_id=vote.pk, user_id=vote.user_id, restaurant_id=vote.restaurant_id, vote_weight=vote.vote_weight,
+                vote_date=vote.vote_date, voted_datetime=vote.created_datetime,
+            ) for vote in votes.iterator(chunk_size=batch_size)
+        ), batch_size=batch_size)
+        # Compacted votes are replaced by rollups instead of being removed from history, so they are deleted with raw
+        # SQL DELETE, which sends no post_delete signals: restaurant totals, daily tallies, closed day cache and voter
+        # sketches count rollups like votes, and vote slots of closed days aren't used anymore
+        connection = connections[router.db_for_write(RestaurantUserVote)]
+        table = connection.ops.quote_name(RestaurantUserVote._meta.db_table)
+        column = connection.ops.quote_name(RestaurantUserVote._meta.get_field('vote_date').column)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE {column} = %s', [connection.ops.adapt_datefield_value(date)])
+
+        return len(archived_votes)
+
+    def handle(self, *args, **options):
+        if options['days'] is None or options['days'] < 1:
+            raise CommandError('Archive horizon should be at least 1 day, set --days or RESTAURANTS_VOTE_ARCHIVE_DAYS')
+
+        horizon = get_voting_date() - timedelta(days=options['days'])
+        dates = RestaurantUserVote.objects.filter(vote_date__lt=horizon).values_list(
+            'vote_date', flat=True
+        ).distinct().order_by('vote_date')
+        votes_count = 0
+        for date in list(dates):
+            votes_count += self.compact_day(date, options['batch_size'])
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Compacted votes of {date}')
+
+        # Vote slots are only needed during their day
+        RestaurantUserDailyVoteCount.objects.filter(date__lt=horizon).delete()
+        self.stdout.write(self.style.SUCCESS(f'Compacted {votes_count} restaurant user votes older than {horizon}'))
@@ -0,0 +1,31 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from restaurants.caches import ClosedDayVotesCache
+from restaurants.generators import VoteDataGenerator
+
+
+class Command(BaseCommand):
+    help = 'Generates users, restaurants and their votes for last days, so performance can be measured on real sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Generated users count')
+        parser.add_argument('--restaurants', type=int, default=100, help='Generated restaurants count')
+        parser.add_argument('--days', type=int, default=30, help='Days of votes, ending today')
+        parser.add_argument('--max-user-votes-per-day', type=int, default=3, help='Maximum votes of user per day')
+        parser.add_argument('--seed', type=int, help='Random seed, so the same data can be generated again')
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated data first')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            VoteDataGenerator.clear()
+        votes_count = VoteDataGenerator(
+            options['users'], options['restaurants'], options['days'],
+            max_user_votes_per_day=options['max_user_votes_per_day'], seed=options['seed'],
+        ).generate()
+        call_command('rebuild_restaurant_daily_tallies', stdout=self.stdout)
+        call_command('rebuild_restaurant_totals', stdout=self.stdout)
+        ClosedDayVotesCache.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {options["users"]} users, {options["restaurants"]} restaurants and {votes_count} votes'
+        ))
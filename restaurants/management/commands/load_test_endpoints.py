@@ -0,0 +1,126 @@
+import json
+import time
+from argparse import ArgumentTypeError
+from base64 import b64encode
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from common.utils import get_percentile
+from restaurants.models import Restaurant
+
+
+def target(value):
+    """Parses NAME=URL target argument"""
+    name, separator, url = value.partition('=')
+    if not separator or not name or not url:
+        raise ArgumentTypeError(f'Target should be NAME=URL, got {value}')
+
+    return name, url.rstrip('/')
+
+
+class Command(BaseCommand):
+    help = (
+        'Sends concurrent requests to restaurant list and vote endpoints of running deployments (e.g. WSGI and ASGI '
+        'servers of the same database) and compares their throughput and latency percentiles'
+    )
+    endpoints = ['restaurant_list', 'restaurant_vote']
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', type=target, action='append', dest='targets', required=True,
+            help='Deployment as NAME=URL, e.g. wsgi=http://127.0.0.1:8000, can be repeated',
+        )
+        parser.add_argument('--username', required=True, help='User authenticated with HTTP basic authentication')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--endpoint', choices=self.endpoints, action='append', dest='endpoints')
+        parser.add_argument('--restaurant', type=int, help='Voted restaurant id (default: first restaurant)')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests sent at the same time')
+        parser.add_argument('--requests', type=int, default=500, help='Requests of each endpoint to each target')
+        parser.add_argument('--timeout', type=float, default=30, help='Request timeout in seconds')
+        parser.add_argument('--output', help='Path of JSON file results are saved to')
+
+    def handle(self, *args, **options):
+        endpoints = options['endpoints'] or self.endpoints
+        restaurant_id = options['restaurant']
+        if 'restaurant_vote' in endpoints and restaurant_id is None:
+            restaurant_id = Restaurant.objects.order_by('pk').values_list('pk', flat=True).first()
+            if restaurant_id is None:
+                raise CommandError('There are no restaurants to vote for')
+        paths = {
+            'restaurant_list': ('GET', reverse('restaurant_list')),
+            'restaurant_vote': ('POST', reverse('restaurant_vote', kwargs={'pk': restaurant_id or 0})),
+        }
+        credentials = b64encode(f'{options["username"]}:{options["password"]}'.encode()).decode()
+
+        results = {}
+        for name, url in options['targets']:
+            results[name] = {}
+            for endpoint in endpoints:
+                method, path = paths[endpoint]
+                request_kwargs = {
+                    'url': f'{url}{path}',
+                    'method': method,
+                    'data': b'{}' if method == 'POST' else None,
+                    'headers': {'Authorization': f'Basic {credentials}', 'Content-Type': 'application/json'},
+                }
+                results[name][endpoint] = self.load_test(
+                    request_kwargs, options['requests'], options['concurrency'], options['timeout']
+                )
+
+        self.write_report(results)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({'concurrency': options['concurrency'], 'targets': results}, file, indent=2)
+
+    @staticmethod
+    def send_request(request_kwargs, timeout):
+        start = time.perf_counter()
+        try:
+            with urlopen(Request(**request_kwargs), timeout=timeout) as response:
+                response.read()
+                status = str(response.status)
+        except HTTPError as error:
+            status = str(error.code)
+        except (URLError, OSError) as error:
+            status = type(getattr(error, 'reason', error)).__name__
+
+        return status, (time.perf_counter() - start) * 1000
+
+    def load_test(self, request_kwargs, requests_count, concurrency, timeout):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            responses = list(executor.map(lambda _: self.send_request(request_kwargs, timeout), range(requests_count)))
+        duration = time.perf_counter() - start
+
+        durations = sorted(duration for _, duration in responses)
+        return {
+            'requests': requests_count,
+            'statuses': dict(Counter(status for status, _ in responses)),
+            'requests_per_second': requests_count / duration,
+            'latency_ms': {
+                'p50': get_percentile(durations, 50),
+                'p90': get_percentile(durations, 90),
+                'p99': get_percentile(durations, 99),
+            },
+        }
+
+    def write_report(self, results):
+        baseline_name = next(iter(results))
+        for name, endpoints in results.items():
+            for endpoint, stats in endpoints.items():
+                latency = stats['latency_ms']
+                statuses = ', '.join(f'{status}: {count}' for status, count in sorted(stats['statuses'].items()))
+                comparison = ''
+                if name != baseline_name:
+                    baseline = results[baseline_name][endpoint]['requests_per_second']
+                    comparison = f', {stats["requests_per_second"] / baseline:.2f}x of {baseline_name}'
+                self.stdout.write(
+                    f'{name} {endpoint}: {stats["requests_per_second"]:.1f} requests/s{comparison}, '
+                    f'p50 {latency["p50"]:.1f} ms, p90 {latency["p90"]:.1f} ms, p99 {latency["p99"]:.1f} ms '
+                    f'({statuses})'
+                )
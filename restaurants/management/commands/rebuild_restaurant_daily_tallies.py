@@ -0,0 +1,99 @@
+from collections import defaultdict
+from itertools import chain
+from math import isclose
+from operator import itemgetter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from common.utils import get_voting_date
+
+from restaurants.leaderboards import get_leaderboard
+from restaurants.models import RestaurantDailyTally, RestaurantDailyVoterSketch, RestaurantUserDailyVoteRollup, \
+    RestaurantUserVote
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds restaurant daily tallies and their cumulative ratings from restaurant user votes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true', help='Only report tallies which differ from restaurant user votes',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tallies created in single query')
+
+    @staticmethod
+    def get_vote_tallies():
+        """
+        Returns tallies aggregated from all restaurant user votes and rollups of compacted votes.
+        Compaction moves whole days, so each day is aggregated from either votes or rollups.
+        """
+        vote_tallies = RestaurantUserVote.objects.values('restaurant_id', date=F('vote_date')).annotate(
+            rating=Sum('vote_weight'),
+            distinct_voted_users=Count('user', distinct=True),
+            votes_count=Count('pk'),
+        ).order_by()
+        rollup_tallies = RestaurantUserDailyVoteRollup.objects.values('restaurant_id', 'date').annotate(
+            rating=Sum('rating'),
+            distinct_voted_users=Count('user'),
+            votes_count=Sum('votes_count'),
+        ).order_by()
+
+        return chain(vote_tallies.iterator(), rollup_tallies.iterator())
+
+    @classmethod
+    def get_cumulative_vote_tallies(cls):
+        """Returns vote tallies ordered by restaurant and date, with cumulative rating of restaurant up to tally day"""
+        vote_tallies = sorted(cls.get_vote_tallies(), key=itemgetter('restaurant_id', 'date'))
+        cumulative_ratings = defaultdict(float)
+        for vote_tally in vote_tallies:
+            cumulative_ratings[vote_tally['restaurant_id']] += vote_tally['rating']
+            vote_tally['cumulative_rating'] = cumulative_ratings[vote_tally['restaurant_id']]
+
+        return vote_tallies
+
+    @staticmethod
+    def is_tally_equal(tally, vote_tally):
+        return (
+            isclose(tally.rating, vote_tally['rating'])
+            and tally.distinct_voted_users == vote_tally['distinct_voted_users']
+            and tally.votes_count == vote_tally['votes_count']
+            and isclose(tally.cumulative_rating, vote_tally['cumulative_rating'])
+        )
+
+    def check_tallies(self):
+        vote_tallies = {(row['restaurant_id'], row['date']): row for row in self.get_cumulative_vote_tallies()}
+        drifted_tallies_count = 0
+        for tally in RestaurantDailyTally.objects.iterator():
+            vote_tally = vote_tallies.pop((tally.restaurant_id, tally.date), None)
+            if vote_tally is None or not self.is_tally_equal(tally, vote_tally):
+                drifted_tallies_count += 1
+                self.stdout.write(f'Tally {tally} differs from restaurant user votes')
+        for restaurant_id, date in vote_tallies:
+            drifted_tallies_count += 1
+            self.stdout.write(f'Tally {date} - restaurant {restaurant_id} is missing')
+
+        if drifted_tallies_count:
+            raise CommandError(f'{drifted_tallies_count} restaurant daily tallies differ from restaurant user votes')
+        self.stdout.write(self.style.SUCCESS('Restaurant daily tallies match restaurant user votes'))
+
+    @transaction.atomic
+    def rebuild_tallies(self, batch_size):
+        RestaurantDailyTally.objects.all().delete()
+        tallies = RestaurantDailyTally.objects.bulk_create(
+            (RestaurantDailyTally(**vote_tally) for vote_tally in self.get_cumulative_vote_tallies()),
+            batch_size=batch_size,
+        )
+        # Voter sketches are built again from votes on first approximate history read
+        RestaurantDailyVoterSketch.objects.all().delete()
+        leaderboard = get_leaderboard()
+        if leaderboard is not None:
+            transaction.on_commit(lambda: leaderboard.invalidate(get_voting_date()))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(tallies)} restaurant daily tallies'))
+
+    def handle(self, *args, **options):
+        if options['check']:
+            self.check_tallies()
+        else:
+            self.rebuild_tallies(options['batch_size'])
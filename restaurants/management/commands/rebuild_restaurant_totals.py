@@ -0,0 +1,48 @@
+from math import isclose
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds restaurant total rating, total votes and distinct voters from restaurant user votes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true', help='Only report restaurant totals differing from votes',
+        )
+
+    @staticmethod
+    def is_total_equal(restaurant, total):
+        total_rating, total_votes, distinct_voters = total
+        return (
+            isclose(restaurant.total_rating, total_rating)
+            and restaurant.total_votes == total_votes
+            and restaurant.distinct_voters == distinct_voters
+        )
+
+    def check_totals(self):
+        totals = Restaurant.objects.get_totals()
+        drifted_restaurants_count = 0
+        for restaurant in Restaurant.objects.order_by('pk').iterator():
+            if not self.is_total_equal(restaurant, totals.get(restaurant.pk, (0.0, 0, 0))):
+                drifted_restaurants_count += 1
+                self.stdout.write(f'Totals of restaurant {restaurant} differ from restaurant user votes')
+
+        if drifted_restaurants_count:
+            raise CommandError(f'{drifted_restaurants_count} restaurant totals differ from restaurant user votes')
+        self.stdout.write(self.style.SUCCESS('Restaurant totals match restaurant user votes'))
+
+    @transaction.atomic
+    def rebuild_totals(self):
+        restaurant_ids = list(Restaurant.objects.values_list('pk', flat=True))
+        Restaurant.objects.refresh_totals(restaurant_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt totals of {len(restaurant_ids)} restaurants'))
+
+    def handle(self, *args, **options):
+        if options['check']:
+            self.check_totals()
+        else:
+            self.rebuild_totals()
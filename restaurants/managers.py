@@ -1,9 +1,441 @@
-from django.db import models
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+from common.utils import get_voting_date
+
+
+def get_vote_weight(current_day_vote_count):
+    return apps.get_model('restaurants', 'Restaurant').get_vote_weight(current_day_vote_count)
+
+
+class RestaurantManager(models.Manager):
+    def add_votes(self, restaurant_id, rating, votes_count, new_voters_count):
+        """Adds votes to restaurant totals. Should be called in the same transaction as votes are saved"""
+        self.filter(pk=restaurant_id).update(
+            total_rating=F('total_rating') + rating,
+            total_votes=F('total_votes') + votes_count,
+            distinct_voters=F('distinct_voters') + new_voters_count,
+        )
+
+    def add_restaurants_votes(self, totals):
+        """
+        Adds votes to totals of many restaurants with single update, totals are given as dict of restaurant id and
+        rating, votes_count and new_voters_count. Should be called in the same transaction as votes are saved.
+        """
+        def add_to_total(field, key):
+            return Case(
+                *[When(pk=restaurant_id, then=F(field) + total[key]) for restaurant_id, total in totals.items()],
+                default=F(field),
+            )
+
+        self.filter(pk__in=totals).update(
+            total_rating=add_to_total('total_rating', 'rating'),
+            total_votes=add_to_total('total_votes', 'votes_count'),
+            distinct_voters=add_to_total('distinct_voters', 'new_voters_count'),
+        )
+
+    def get_previous_voters(self, restaurant_ids, user_ids, date):
+        """Returns (restaurant_id, user_id) pairs of given restaurants and users, which voted before date"""
+        votes = apps.get_model('restaurants', 'RestaurantUserVote').objects.filter(
+            restaurant_id__in=restaurant_ids, user_id__in=user_ids, vote_date__lt=date,
+        )
+        rollups = apps.get_model('restaurants', 'RestaurantUserDailyVoteRollup').objects.filter(
+            restaurant_id__in=restaurant_ids, user_id__in=user_ids, date__lt=date,
+        )
+
+        return set(votes.values_list('restaurant_id', 'user_id').order_by().union(
+            rollups.values_list('restaurant_id', 'user_id').order_by()
+        ))
+
+    def get_votes_and_rollups(self, restaurant_ids=None, date_after=None, date_before=None):
+        """
+        Returns querysets of votes and rollups of compacted votes during period from date_after to date_before
+        (excluded), for given restaurants or all restaurants
+        """
+        votes = apps.get_model('restaurants', 'RestaurantUserVote').objects.using(self.db).order_by()
+        rollups = apps.get_model('restaurants', 'RestaurantUserDailyVoteRollup').objects.using(self.db).order_by()
+        if restaurant_ids is not None:
+            votes = votes.filter(restaurant_id__in=restaurant_ids)
+            rollups = rollups.filter(restaurant_id__in=restaurant_ids)
+        if date_after:
+            votes = votes.filter(vote_date__gte=date_after)
+            rollups = rollups.filter(date__gte=date_after)
+        if date_before:
+            votes = votes.filter(vote_date__lt=date_before)
+            rollups = rollups.filter(date__lt=date_before)
+
+        return votes, rollups
+
+    def get_distinct_voters(self, restaurant_ids=None, date_after=None, date_before=None):
+        """
+        Returns {restaurant_id: distinct_voters} of votes and rollups of compacted votes during period.
+        Distinct restaurant voters are united and counted by database.
+        """
+        votes, rollups = self.get_votes_and_rollups(restaurant_ids, date_after, date_before)
+        voters = votes.values_list('restaurant_id', 'user_id').union(rollups.values_list('restaurant_id', 'user_id'))
+        sql, params = voters.query.get_compiler(voters.db).as_sql()
+        with connections[voters.db].cursor() as cursor:
+            cursor.execute(f'SELECT restaurant_id, COUNT(*) FROM ({sql}) voters GROUP BY restaurant_id', params)
+
+            return dict(cursor.fetchall())
+
+    def get_day_totals(self, restaurant_ids, dates):
+        """
+        Returns {(restaurant_id, date): (rating, votes_count, distinct_voters)} counted by database from votes and
+        rollups of compacted votes of given restaurants and dates. User with votes and rollup of the same day is
+        counted once.
+        """
+        votes, rollups = self.get_votes_and_rollups(restaurant_ids)
+        votes = votes.filter(vote_date__in=dates)
+        rollups = rollups.filter(date__in=dates).annotate(has_votes=Exists(votes.filter(
+            restaurant_id=OuterRef('restaurant_id'), user_id=OuterRef('user_id'), vote_date=OuterRef('date'),
+        )))
+        totals = defaultdict(lambda: [0.0, 0, 0])
+        for rows in (
+            votes.values('restaurant_id', 'vote_date').annotate(
+                rating=Sum('vote_weight'), votes_count=Count('pk'), voters_count=Count('user_id', distinct=True),
+            ).values_list('restaurant_id', 'vote_date', 'rating', 'votes_count', 'voters_count'),
+            rollups.values('restaurant_id', 'date').annotate(
+                rating=Sum('rating'), votes_count=Sum('votes_count'),
+                voters_count=Count('user_id', filter=Q(has_votes=False)),
+            ).values_list('restaurant_id', 'date', 'rating', 'votes_count', 'voters_count'),
+        ):
+            for restaurant_id, date, rating, votes_count, voters_count in rows:
+                total = totals[restaurant_id, date]
+                total[0] += rating
+                total[1] += votes_count
+                total[2] += voters_count
+
+        return {day: tuple(total) for day, total in totals.items()}
+
+    def get_totals(self, restaurant_ids=None, date_after=None, date_before=None):
+        """
+        Returns {restaurant_id: (total_rating, total_votes, distinct_voters)} counted by database from votes and
+        rollups of compacted votes during period (all time by default), for given restaurants or all restaurants
+        with votes
+        """
+        votes, rollups = self.get_votes_and_rollups(restaurant_ids, date_after, date_before)
+        totals = defaultdict(lambda: [0.0, 0, 0])
+        for rows in (
+            votes.values('restaurant_id').annotate(rating=Sum('vote_weight'), votes_count=Count('pk')),
+            rollups.values('restaurant_id').annotate(rating=Sum('rating'), votes_count=Sum('votes_count')),
+        ):
+            for restaurant_id, rating, votes_count in rows.values_list('restaurant_id', 'rating', 'votes_count'):
+                totals[restaurant_id][0] += rating
+                totals[restaurant_id][1] += votes_count
+        for restaurant_id, distinct_voters in self.get_distinct_voters(
+            restaurant_ids, date_after, date_before,
+        ).items():
+            totals[restaurant_id][2] = distinct_voters
+
+        return {restaurant_id: tuple(total) for restaurant_id, total in totals.items()}
+
+    def refresh_totals(self, restaurant_ids):
+        """Sets totals of given restaurants counted from their votes. Restaurants are marked updated"""
+        totals = self.get_totals(restaurant_ids)
+        now = timezone.now()
+        restaurants = []
+        for restaurant_id in restaurant_ids:
+            total_rating, total_votes, distinct_voters = totals.get(restaurant_id, (0.0, 0, 0))
+            restaurants.append(self.model(
+                pk=restaurant_id, total_rating=total_rating, total_votes=total_votes, distinct_voters=distinct_voters,
+                updated_datetime=now,
+            ))
+        self.bulk_update(
+            restaurants, ['total_rating', 'total_votes', 'distinct_voters', 'updated_datetime'], batch_size=1000,
+        )
+
 
 class CurrentDayRestaurantUserVoteManager(models.Manager):
     def get_queryset(self):
-        return super(CurrentDayRestaurantUserVoteManager, self).get_queryset().filter(
-            created_datetime__date=timezone.now().date()
+        return super(CurrentDayRestaurantUserVoteManager, self).get_queryset().filter(vote_date=get_voting_date())
+
+
+class RestaurantDailyTallyManager(models.Manager):
+    def add_vote(self, restaurant_id, date, vote_weight, is_new_voter):
+        """Adds single vote to restaurant day tally. Should be called in the same transaction as vote is saved"""
+        self.add_votes(restaurant_id, date, rating=vote_weight, new_voters_count=int(is_new_voter), votes_count=1)
+
+    def get_cumulative_rating(self, restaurant_id, date=None):
+        """Returns expression of restaurant cumulative rating of days before date, or of all days when date is None"""
+        tallies = self.filter(restaurant_id=restaurant_id)
+        if date is not None:
+            tallies = tallies.filter(date__lt=date)
+
+        return Coalesce(Subquery(tallies.order_by('-date').values('cumulative_rating')[:1]), 0.0)
+
+    def lock_restaurants(self, restaurant_ids):
+        """Locks restaurants until transaction ends, so their tallies are created or recounted one at a time"""
+        list(apps.get_model('restaurants', 'Restaurant').objects.db_manager(self.db).select_for_update().filter(
+            pk__in=restaurant_ids,
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def lock_day_tallies(self, date, restaurant_ids):
+        """
+        Locks existing day tallies of restaurants until transaction ends and returns ids of their restaurants.
+        Votes of restaurant day wait only for each other, and later day tally can't be created meanwhile.
+        """
+        return set(self.select_for_update().filter(date=date, restaurant_id__in=restaurant_ids).order_by(
+            'restaurant_id',
+        ).values_list('restaurant_id', flat=True))
+
+    def create_day_tallies(self, date, restaurant_ids):
+        """
+        Creates missing day tallies of restaurants starting from cumulative ratings of previous days. Restaurants and
+        their latest previous tallies are locked first, so cumulative ratings don't miss uncommitted votes of
+        previous days.
+        """
+        self.lock_restaurants(restaurant_ids)
+        latest_dates = self.filter(restaurant_id=OuterRef('restaurant_id'), date__lt=date).order_by('-date')
+        cumulative_ratings = dict(self.select_for_update().filter(
+            restaurant_id__in=restaurant_ids, date=Subquery(latest_dates.values('date')[:1]),
+        ).order_by('restaurant_id').values_list('restaurant_id', 'cumulative_rating'))
+        self.bulk_create([
+            self.model(
+                restaurant_id=restaurant_id, date=date, cumulative_rating=cumulative_ratings.get(restaurant_id, 0.0),
+            ) for restaurant_id in restaurant_ids
+        ], ignore_conflicts=True)
+
+    def add_votes(self, restaurant_id, date, rating, new_voters_count, votes_count):
+        """
+        Adds votes to restaurant day tally and cumulative rating of the day and later days (when vote of previous
+        day is committed after next day began). Missing day tally is created first.
+        Should be called in the same transaction as votes are saved.
+        """
+        if not self.lock_day_tallies(date, [restaurant_id]):
+            self.create_day_tallies(date, [restaurant_id])
+
+        def add_to_tally(field, value):
+            return Case(When(date=date, then=F(field) + value), default=F(field))
+
+        self.filter(restaurant_id=restaurant_id, date__gte=date).update(
+            rating=add_to_tally('rating', rating),
+            distinct_voted_users=add_to_tally('distinct_voted_users', new_voters_count),
+            votes_count=add_to_tally('votes_count', votes_count),
+            cumulative_rating=F('cumulative_rating') + rating,
+            updated_datetime=timezone.now(),
         )
+
+    def add_restaurants_votes(self, date, tallies):
+        """
+        Adds votes to day tallies of many restaurants and their cumulative ratings with single update, tallies are
+        given as dict of restaurant id and rating, new_voters_count and votes_count. Missing tallies of the day are
+        created first, starting from cumulative ratings of previous days.
+        Should be called in the same transaction as votes are saved.
+        """
+        missing_restaurant_ids = set(tallies) - self.lock_day_tallies(date, tallies)
+        if missing_restaurant_ids:
+            self.create_day_tallies(date, missing_restaurant_ids)
+
+        def add_to_tally(field, key):
+            return Case(
+                *[
+                    When(restaurant_id=restaurant_id, date=date, then=F(field) + tally[key])
+                    for restaurant_id, tally in tallies.items()
+                ],
+                default=F(field),
+            )
+
+        self.filter(restaurant_id__in=tallies, date__gte=date).update(
+            rating=add_to_tally('rating', 'rating'),
+            distinct_voted_users=add_to_tally('distinct_voted_users', 'new_voters_count'),
+            votes_count=add_to_tally('votes_count', 'votes_count'),
+            cumulative_rating=Case(
+                *[
+                    When(restaurant_id=restaurant_id, then=F('cumulative_rating') + tally['rating'])
+                    for restaurant_id, tally in tallies.items()
+                ],
+                default=F('cumulative_rating'),
+            ),
+            updated_datetime=timezone.now(),
+        )
+
+    def refresh_tallies(self, days):
+        """
+        Counts day tallies of given (restaurant_id, date) days again from votes and rollups of compacted votes, e.g.
+        after votes were deleted, and shifts cumulative ratings of the days and later days by rating differences,
+        with single update. Restaurants and tallies are locked before counting, so tallies aren't changed by votes
+        meanwhile.
+        """
+        restaurant_ids = {restaurant_id for restaurant_id, _ in days}
+        dates = {date for _, date in days}
+        with transaction.atomic(using=self.db):
+            self.lock_restaurants(restaurant_ids)
+            tallies = [
+                tally for tally in self.select_for_update().filter(
+                    restaurant_id__in=restaurant_ids, date__in=dates,
+                ).order_by('restaurant_id', 'date')
+                if (tally.restaurant_id, tally.date) in days
+            ]
+            totals = apps.get_model('restaurants', 'Restaurant').objects.db_manager(self.db).get_day_totals(
+                restaurant_ids, dates,
+            )
+            if not tallies:
+                return
+
+            rating_differences = defaultdict(list)
+            day_values = {'rating': [], 'votes_count': [], 'distinct_voted_users': []}
+            for tally in tallies:
+                rating, votes_count, distinct_voted_users = totals.get((tally.restaurant_id, tally.date), (0.0, 0, 0))
+                rating_differences[tally.restaurant_id].append((tally.date, rating - tally.rating))
+                for field, value in [
+                    ('rating', rating), ('votes_count', votes_count), ('distinct_voted_users', distinct_voted_users),
+                ]:
+                    day_values[field].append(When(
+                        restaurant_id=tally.restaurant_id, date=tally.date, then=Value(value),
+                    ))
+
+            # Cumulative rating of later day is shifted by differences of all refreshed days up to it
+            cumulative_ratings = []
+            for restaurant_id, differences in rating_differences.items():
+                cumulative_difference = sum(difference for _, difference in differences)
+                for date, difference in sorted(differences, reverse=True):
+                    cumulative_ratings.append(When(
+                        restaurant_id=restaurant_id, date__gte=date,
+                        then=F('cumulative_rating') + cumulative_difference,
+                    ))
+                    cumulative_difference -= difference
+
+            self.filter(restaurant_id__in=rating_differences, date__gte=min(dates)).update(
+                **{
+                    field: Case(*whens, default=F(field), output_field=self.model._meta.get_field(field))
+                    for field, whens in day_values.items()
+                },
+                cumulative_rating=Case(*cumulative_ratings, default=F('cumulative_rating')),
+                updated_datetime=timezone.now(),
+            )
+
+
+class RestaurantUserDailyVoteCountManager(models.Manager):
+    def get_vote_slot(self, restaurant, user, date):
+        """
+        Returns user vote slot of restaurant day, so vote is validated by reading single row.
+        Missing slot is created from user votes of the day, which could be saved without taking slot (e.g. by admin).
+        """
+        try:
+            return self.get(restaurant=restaurant, user=user, date=date)
+        except self.model.DoesNotExist:
+            votes_count = apps.get_model('restaurants', 'RestaurantUserVote').objects.filter(
+                restaurant=restaurant, user=user, vote_date=date,
+            ).count()
+            try:
+                with transaction.atomic(using=self.db):
+                    return self.create(
+                        restaurant=restaurant, user=user, date=date, votes_count=votes_count,
+                        next_vote_weight=get_vote_weight(votes_count),
+                    )
+            except IntegrityError:
+                return self.get(restaurant=restaurant, user=user, date=date)
+
+    def admit_vote(self, vote_slot, user):
+        """
+        Takes next user vote of vote slot read before. Slot is updated only if its votes count is still the read one,
+        so parallel requests can't exceed user daily vote count or give votes of the same weight.
+        Slot changed meanwhile is read again with row lock, so the next update succeeds.
+        Returns vote slot as it was before admitted vote or None when user can't vote anymore.
+        Should be called in the same transaction as admitted vote is saved.
+        """
+        while vote_slot.votes_count < user.daily_vote_count:
+            is_admitted = self.filter(pk=vote_slot.pk, votes_count=vote_slot.votes_count).update(
+                votes_count=vote_slot.votes_count + 1,
+                next_vote_weight=get_vote_weight(vote_slot.votes_count + 1),
+                updated_datetime=timezone.now(),
+            )
+            if is_admitted:
+                return vote_slot
+            vote_slot = self.select_for_update().get(pk=vote_slot.pk)
+
+        return None
+
+    def recount_vote_slots(self, vote_slots):
+        """
+        Counts votes of given (restaurant_id, user_id, date) vote slots again, so user can vote again with the weight
+        of deleted vote. Slots are locked before votes are counted, so votes admitted meanwhile are counted too.
+        """
+        restaurant_ids = {restaurant_id for restaurant_id, _, _ in vote_slots}
+        user_ids = {user_id for _, user_id, _ in vote_slots}
+        dates = {date for _, _, date in vote_slots}
+        with transaction.atomic(using=self.db):
+            slots = [
+                slot for slot in self.select_for_update().filter(
+                    restaurant_id__in=restaurant_ids, user_id__in=user_ids, date__in=dates,
+                ) if (slot.restaurant_id, slot.user_id, slot.date) in vote_slots
+            ]
+            if not slots:
+                return
+
+            votes_counts = {
+                (restaurant_id, user_id, date): votes_count
+                for restaurant_id, user_id, date, votes_count in apps.get_model(
+                    'restaurants', 'RestaurantUserVote',
+                ).objects.using(self.db).filter(
+                    restaurant_id__in=restaurant_ids, user_id__in=user_ids, vote_date__in=dates,
+                ).values('restaurant_id', 'user_id', 'vote_date').annotate(
+                    votes_count=Count('pk'),
+                ).values_list('restaurant_id', 'user_id', 'vote_date', 'votes_count').order_by()
+            }
+            now = timezone.now()
+            for slot in slots:
+                slot.votes_count = votes_counts.get((slot.restaurant_id, slot.user_id, slot.date), 0)
+                slot.next_vote_weight = get_vote_weight(slot.votes_count)
+                slot.updated_datetime = now
+            self.bulk_update(slots, ['votes_count', 'next_vote_weight', 'updated_datetime'], batch_size=1000)
+
+    def admit_votes(self, votes, date):
+        """
+        Takes next user votes for restaurant day for list of (restaurant, user) pairs in given order.
+        Vote count rows of all pairs are locked, so parallel requests can't exceed user daily vote count.
+        Returns user votes count before each admitted vote or None for votes user can't give anymore.
+        Should be called in the same transaction as admitted votes are saved.
+        """
+        restaurant_ids = {restaurant.pk for restaurant, _ in votes}
+        user_ids = {user.pk for _, user in votes}
+        pairs = {(restaurant.pk, user.pk) for restaurant, user in votes}
+        day_vote_counts = self.filter(date=date, restaurant_id__in=restaurant_ids, user_id__in=user_ids)
+
+        missing_pairs = pairs - set(day_vote_counts.values_list('restaurant_id', 'user_id'))
+        if missing_pairs:
+            existing_votes_counts = {
+                (vote['restaurant_id'], vote['user_id']): vote['votes_count']
+                for vote in apps.get_model('restaurants', 'RestaurantUserVote').objects.filter(
+                    restaurant_id__in={restaurant_id for restaurant_id, _ in missing_pairs},
+                    user_id__in={user_id for _, user_id in missing_pairs},
+                    vote_date=date,
+                ).values('restaurant_id', 'user_id').annotate(votes_count=Count('pk'))
+            }
+            self.bulk_create([
+                self.model(
+                    restaurant_id=restaurant_id,
+                    user_id=user_id,
+                    date=date,
+                    votes_count=existing_votes_counts.get((restaurant_id, user_id), 0),
+                    next_vote_weight=get_vote_weight(existing_votes_counts.get((restaurant_id, user_id), 0)),
+                ) for restaurant_id, user_id in missing_pairs
+            ], ignore_conflicts=True)
+
+        vote_counts = {
+            (vote_count.restaurant_id, vote_count.user_id): vote_count
+            for vote_count in day_vote_counts.select_for_update()
+            if (vote_count.restaurant_id, vote_count.user_id) in pairs
+        }
+        current_day_vote_counts = []
+        for restaurant, user in votes:
+            vote_count = vote_counts[restaurant.pk, user.pk]
+            if vote_count.votes_count < user.daily_vote_count:
+                current_day_vote_counts.append(vote_count.votes_count)
+                vote_count.votes_count += 1
+            else:
+                current_day_vote_counts.append(None)
+
+        now = timezone.now()
+        for vote_count in vote_counts.values():
+            vote_count.next_vote_weight = get_vote_weight(vote_count.votes_count)
+            vote_count.updated_datetime = now
+        self.bulk_update(vote_counts.values(), ['votes_count', 'next_vote_weight', 'updated_datetime'])
+
+        return current_day_vote_counts
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-17 00:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantDailyTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_datetime', models.DateTimeField(auto_now_add=True, verbose_name='creation date')),
+                ('updated_datetime', models.DateTimeField(auto_now=True, verbose_name='last update date')),
+                ('date', models.DateField(verbose_name='date')),
+                ('rating', models.FloatField(default=0, verbose_name='rating')),
+                ('distinct_voted_users', models.PositiveIntegerField(default=0, verbose_name='distinct voted users')),
+                ('votes_count', models.PositiveIntegerField(default=0, verbose_name='votes count')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='restaurants.restaurant', verbose_name='restaurant')),
+            ],
+            options={
+                'verbose_name': 'restaurant daily tally',
+                'verbose_name_plural': 'restaurant daily tallies',
+                'unique_together': {('restaurant', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-17 00:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0003_restaurantdailytally'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='restaurantuservote',
+            index=models.Index(fields=['restaurant', 'user', 'created_datetime'], name='vote_restaurant_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantuservote',
+            index=models.Index(fields=['created_datetime', 'restaurant'], name='vote_date_restaurant_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-17 00:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('restaurants', '0004_restaurantuservote_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantUserDailyVoteCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_datetime', models.DateTimeField(auto_now_add=True, verbose_name='creation date')),
+                ('updated_datetime', models.DateTimeField(auto_now=True, verbose_name='last update date')),
+                ('date', models.DateField(verbose_name='date')),
+                ('votes_count', models.PositiveSmallIntegerField(default=0, verbose_name='votes count')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='restaurants.restaurant', verbose_name='restaurant')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'restaurant user daily vote count',
+                'verbose_name_plural': 'restaurant user daily vote counts',
+                'unique_together': {('restaurant', 'user', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_next_vote_weight(apps, schema_editor):
+    """Vote slots get next vote weight of their votes count with configured weight schedule"""
+    vote_weights = getattr(settings, 'RESTAURANTS_VOTE_WEIGHTS', None) or (1, 0.5, 0.25)
+    RestaurantUserDailyVoteCount = apps.get_model('restaurants', 'RestaurantUserDailyVoteCount')
+    votes_counts = RestaurantUserDailyVoteCount.objects.values_list('votes_count', flat=True).distinct()
+    for votes_count in list(votes_counts):
+        RestaurantUserDailyVoteCount.objects.filter(votes_count=votes_count).update(
+            next_vote_weight=vote_weights[min(votes_count, len(vote_weights) - 1)]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0005_restaurantuserdailyvotecount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurantuserdailyvotecount',
+            name='next_vote_weight',
+            field=models.FloatField(default=1, verbose_name='next vote weight'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_next_vote_weight, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:40
+
+from datetime import timedelta
+
+import common.fields
+from django.db import migrations
+from django.db.models import Max, Min
+
+from common.utils import get_day_datetime_range, get_voting_date
+
+
+def fill_vote_date(apps, schema_editor):
+    """Votes get voting day of their creation datetime, with one indexed UPDATE per day"""
+    RestaurantUserVote = apps.get_model('restaurants', 'RestaurantUserVote')
+    votes_range = RestaurantUserVote.objects.aggregate(first=Min('created_datetime'), last=Max('created_datetime'))
+    if votes_range['first'] is None:
+        return
+
+    date = get_voting_date(votes_range['first'])
+    last_date = get_voting_date(votes_range['last'])
+    while date <= last_date:
+        day_start, day_end = get_day_datetime_range(date)
+        RestaurantUserVote.objects.filter(created_datetime__gte=day_start, created_datetime__lt=day_end).update(
+            vote_date=date
+        )
+        date += timedelta(days=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0006_restaurantuserdailyvotecount_next_vote_weight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurantuservote',
+            name='vote_date',
+            field=common.fields.VotingDateField(datetime_field='created_datetime', editable=False, null=True, verbose_name='vote date'),
+        ),
+        migrations.RunPython(fill_vote_date, migrations.RunPython.noop),
+    ]
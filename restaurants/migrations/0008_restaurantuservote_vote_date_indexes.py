@@ -0,0 +1,35 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:40
+
+import common.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0007_restaurantuservote_vote_date'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='restaurantuservote',
+            name='vote_date',
+            field=common.fields.VotingDateField(datetime_field='created_datetime', editable=False, verbose_name='vote date'),
+        ),
+        migrations.RemoveIndex(
+            model_name='restaurantuservote',
+            name='vote_restaurant_user_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='restaurantuservote',
+            name='vote_date_restaurant_idx',
+        ),
+        migrations.AddIndex(
+            model_name='restaurantuservote',
+            index=models.Index(fields=['restaurant', 'user', 'vote_date'], name='vote_restaurant_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantuservote',
+            index=models.Index(fields=['vote_date', 'restaurant'], name='vote_date_restaurant_idx'),
+        ),
+    ]
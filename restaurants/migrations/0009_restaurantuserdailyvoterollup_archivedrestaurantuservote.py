@@ -0,0 +1,59 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('restaurants', '0008_restaurantuservote_vote_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantUserDailyVoteRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_datetime', models.DateTimeField(auto_now_add=True, verbose_name='creation date')),
+                ('updated_datetime', models.DateTimeField(auto_now=True, verbose_name='last update date')),
+                ('date', models.DateField(verbose_name='date')),
+                ('rating', models.FloatField(default=0, verbose_name='rating')),
+                ('votes_count', models.PositiveIntegerField(default=0, verbose_name='votes count')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='restaurants.restaurant', verbose_name='restaurant')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'restaurant user daily vote rollup',
+                'verbose_name_plural': 'restaurant user daily vote rollups',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedRestaurantUserVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_datetime', models.DateTimeField(auto_now_add=True, verbose_name='creation date')),
+                ('updated_datetime', models.DateTimeField(auto_now=True, verbose_name='last update date')),
+                ('vote_id', models.BigIntegerField(unique=True, verbose_name='vote id')),
+                ('vote_weight', models.FloatField(verbose_name='vote weight')),
+                ('vote_date', models.DateField(verbose_name='vote date')),
+                ('voted_datetime', models.DateTimeField(verbose_name='vote creation date')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='restaurants.restaurant', verbose_name='restaurant')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'archived restaurant user vote',
+                'verbose_name_plural': 'archived restaurant user votes',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='restaurantuserdailyvoterollup',
+            index=models.Index(fields=['date', 'restaurant'], name='rollup_date_restaurant_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='restaurantuserdailyvoterollup',
+            unique_together={('restaurant', 'user', 'date')},
+        ),
+    ]
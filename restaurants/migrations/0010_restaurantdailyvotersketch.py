@@ -0,0 +1,37 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0009_restaurantuserdailyvoterollup_archivedrestaurantuservote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantDailyVoterSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_datetime', models.DateTimeField(auto_now_add=True, verbose_name='creation date')),
+                ('updated_datetime', models.DateTimeField(auto_now=True, verbose_name='last update date')),
+                ('date', models.DateField(verbose_name='date')),
+                ('sketch', models.BinaryField(verbose_name='voted users sketch')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='restaurants.restaurant', verbose_name='restaurant')),
+            ],
+            options={
+                'verbose_name': 'restaurant daily voter sketch',
+                'verbose_name_plural': 'restaurant daily voter sketches',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='restaurantdailyvotersketch',
+            index=models.Index(fields=['date', 'restaurant'], name='sketch_date_restaurant_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='restaurantdailyvotersketch',
+            unique_together={('restaurant', 'date')},
+        ),
+    ]
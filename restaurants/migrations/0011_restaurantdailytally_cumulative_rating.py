@@ -0,0 +1,37 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:45
+
+from django.db import migrations, models
+
+
+def fill_cumulative_rating(apps, schema_editor):
+    """Tallies get running sum of their restaurant ratings ordered by date"""
+    RestaurantDailyTally = apps.get_model('restaurants', 'RestaurantDailyTally')
+    tallies = []
+    restaurant_id = None
+    cumulative_rating = 0
+    for tally in RestaurantDailyTally.objects.order_by('restaurant_id', 'date').only(
+        'pk', 'restaurant_id', 'rating',
+    ).iterator():
+        if tally.restaurant_id != restaurant_id:
+            restaurant_id = tally.restaurant_id
+            cumulative_rating = 0
+        cumulative_rating += tally.rating
+        tally.cumulative_rating = cumulative_rating
+        tallies.append(tally)
+    RestaurantDailyTally.objects.bulk_update(tallies, ['cumulative_rating'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0010_restaurantdailyvotersketch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurantdailytally',
+            name='cumulative_rating',
+            field=models.FloatField(default=0, verbose_name='cumulative rating'),
+        ),
+        migrations.RunPython(fill_cumulative_rating, migrations.RunPython.noop),
+    ]
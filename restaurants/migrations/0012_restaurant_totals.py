@@ -0,0 +1,58 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:10
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_restaurant_totals(apps, schema_editor):
+    """Restaurants get totals of their votes and rollups of compacted votes"""
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    RestaurantUserVote = apps.get_model('restaurants', 'RestaurantUserVote')
+    RestaurantUserDailyVoteRollup = apps.get_model('restaurants', 'RestaurantUserDailyVoteRollup')
+    votes = RestaurantUserVote.objects.order_by()
+    rollups = RestaurantUserDailyVoteRollup.objects.order_by()
+    restaurants = Restaurant.objects.in_bulk()
+    for rows in (
+        votes.values('restaurant_id').annotate(rating=Sum('vote_weight'), votes_count=Count('pk')),
+        rollups.values('restaurant_id').annotate(rating=Sum('rating'), votes_count=Sum('votes_count')),
+    ):
+        for restaurant_id, rating, votes_count in rows.values_list('restaurant_id', 'rating', 'votes_count'):
+            restaurants[restaurant_id].total_rating += rating
+            restaurants[restaurant_id].total_votes += votes_count
+    for restaurant_id, _ in votes.values_list('restaurant_id', 'user_id').union(
+        rollups.values_list('restaurant_id', 'user_id')
+    ).iterator():
+        restaurants[restaurant_id].distinct_voters += 1
+    Restaurant.objects.bulk_update(
+        restaurants.values(), ['total_rating', 'total_votes', 'distinct_voters'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0011_restaurantdailytally_cumulative_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='distinct_voters',
+            field=models.PositiveIntegerField(default=0, verbose_name='distinct voters'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='total_rating',
+            field=models.FloatField(default=0, verbose_name='total rating'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='total_votes',
+            field=models.PositiveIntegerField(default=0, verbose_name='total votes'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['-total_rating', '-distinct_voters', 'title', 'id'], name='restaurant_totals_order_idx'),
+        ),
+        migrations.RunPython(fill_restaurant_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:35
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+from common.utils import get_voting_date
+
+
+def fill_current_day_vote_slots(apps, schema_editor):
+    """
+    Current day votes without vote slot get slot of their count, as missing slots are created empty afterwards.
+    Slots of previous days aren't needed, as votes are given only for current day.
+    """
+    vote_weights = getattr(settings, 'RESTAURANTS_VOTE_WEIGHTS', None) or (1, 0.5, 0.25)
+    RestaurantUserVote = apps.get_model('restaurants', 'RestaurantUserVote')
+    RestaurantUserDailyVoteCount = apps.get_model('restaurants', 'RestaurantUserDailyVoteCount')
+    date = get_voting_date()
+    vote_slots = set(RestaurantUserDailyVoteCount.objects.filter(date=date).values_list('restaurant_id', 'user_id'))
+    RestaurantUserDailyVoteCount.objects.bulk_create([
+        RestaurantUserDailyVoteCount(
+            restaurant_id=restaurant_id, user_id=user_id, date=date, votes_count=votes_count,
+            next_vote_weight=vote_weights[min(votes_count, len(vote_weights) - 1)],
+        ) for restaurant_id, user_id, votes_count in RestaurantUserVote.objects.filter(vote_date=date).values_list(
+            'restaurant_id', 'user_id',
+        ).annotate(votes_count=Count('pk')).order_by() if (restaurant_id, user_id) not in vote_slots
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0012_restaurant_totals'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_current_day_vote_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-17 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0013_fill_current_day_vote_slots'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='restaurantdailytally',
+            index=models.Index(fields=['updated_datetime'], name='tally_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantdailytally',
+            index=models.Index(fields=['date', 'updated_datetime'], name='tally_date_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantuservote',
+            index=models.Index(fields=['updated_datetime'], name='vote_updated_idx'),
+        ),
+    ]
@@ -1,16 +1,24 @@
+from collections import defaultdict
+from functools import partial
+
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 
 from common.models import TimestampModelFields
-from .managers import CurrentDayRestaurantUserVoteManager
+from common.fields import VotingDateField
+from common.utils import get_voting_date
+from .leaderboards import get_leaderboard
+from .managers import CurrentDayRestaurantUserVoteManager, RestaurantDailyTallyManager, RestaurantManager, \
+    RestaurantUserDailyVoteCountManager
 
 
 class Restaurant(TimestampModelFields, models.Model):
     FIRST_VOTE_WEIGHT = 1
     SECOND_VOTE_WEIGHT = 0.5
     DEFAULT_VOTE_WEIGHT = 0.25
+    VOTE_WEIGHTS = (FIRST_VOTE_WEIGHT, SECOND_VOTE_WEIGHT, DEFAULT_VOTE_WEIGHT)
 
     title = models.CharField(max_length=255, verbose_name=_('restaurant title'))
     address = models.CharField(max_length=255, verbose_name=_('restaurant address'))
@@ -18,11 +26,21 @@ class Restaurant(TimestampModelFields, models.Model):
     voted_users = models.ManyToManyField(
         settings.AUTH_USER_MODEL, through='restaurants.RestaurantUserVote', verbose_name=_('user votes')
     )
+    total_rating = models.FloatField(default=0, verbose_name=_('total rating'))
+    total_votes = models.PositiveIntegerField(default=0, verbose_name=_('total votes'))
+    distinct_voters = models.PositiveIntegerField(default=0, verbose_name=_('distinct voters'))
+
+    objects = RestaurantManager()
 
     class Meta:
         verbose_name = _('restaurant')
         verbose_name_plural = _('restaurants')
         unique_together = ['title', 'address']
+        indexes = [
+            models.Index(
+                fields=['-total_rating', '-distinct_voters', 'title', 'id'], name='restaurant_totals_order_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -31,16 +49,19 @@ class Restaurant(TimestampModelFields, models.Model):
         return self.restaurantuservote_set(manager='current_day_votes').filter(user=user).count()
 
     def get_user_next_vote_weight(self, user):
-        current_day_vote_count = self.get_user_current_day_vote_count(user)
+        return self.get_vote_weight(self.get_user_current_day_vote_count(user))
 
-        if current_day_vote_count == 0:
-            vote_weight = self.FIRST_VOTE_WEIGHT
-        elif current_day_vote_count == 1:
-            vote_weight = self.SECOND_VOTE_WEIGHT
-        else:
-            vote_weight = self.DEFAULT_VOTE_WEIGHT
+    @classmethod
+    def get_vote_weights(cls):
+        """Returns weights of user first, second, ... votes of the day, last weight is used for all further votes"""
+        return getattr(settings, 'RESTAURANTS_VOTE_WEIGHTS', None) or cls.VOTE_WEIGHTS
 
-        return vote_weight
+    @classmethod
+    def get_vote_weight(cls, current_day_vote_count):
+        """Returns weight of vote given by user, who already voted current_day_vote_count times today"""
+        vote_weights = cls.get_vote_weights()
+
+        return vote_weights[min(current_day_vote_count, len(vote_weights) - 1)]
 
 
 class RestaurantUserVote(TimestampModelFields, models.Model):
@@ -49,6 +70,7 @@ class RestaurantUserVote(TimestampModelFields, models.Model):
     vote_weight = models.FloatField(
         validators=[MinValueValidator(0.25), MaxValueValidator(1)], verbose_name=_('vote weight')
     )
+    vote_date = VotingDateField(verbose_name=_('vote date'))
 
     objects = models.Manager()
     current_day_votes = CurrentDayRestaurantUserVoteManager()
@@ -56,6 +78,209 @@ class RestaurantUserVote(TimestampModelFields, models.Model):
     class Meta:
         verbose_name = _('restaurant user vote')
         verbose_name_plural = _('restaurant user votes')
+        indexes = [
+            models.Index(fields=['restaurant', 'user', 'vote_date'], name='vote_restaurant_user_date_idx'),
+            models.Index(fields=['vote_date', 'restaurant'], name='vote_date_restaurant_idx'),
+            models.Index(fields=['updated_datetime'], name='vote_updated_idx'),
+        ]
 
     def __str__(self):
         return f'{self.created_datetime} - {self.user} - {self.restaurant}'
+
+    def save(self, *args, **kwargs):
+        """
+        New vote is added to restaurant daily tally and restaurant totals in the same transaction. Tally and totals
+        are updated last, so their rows are locked only until transaction is committed.
+        Restaurant leaderboard is updated after transaction is committed.
+        """
+        if not self._state.adding:
+            return super(RestaurantUserVote, self).save(*args, **kwargs)
+
+        using = kwargs.get('using')
+        with transaction.atomic(using=using):
+            super(RestaurantUserVote, self).save(*args, **kwargs)
+            date = self.vote_date
+            is_new_voter = not RestaurantUserVote.objects.filter(
+                restaurant_id=self.restaurant_id, user_id=self.user_id, vote_date=date,
+            ).exclude(pk=self.pk).exists()
+            # User voted for restaurant before when user voted earlier today or during previous days
+            is_new_restaurant_voter = is_new_voter and not Restaurant.objects.get_previous_voters(
+                [self.restaurant_id], [self.user_id], date,
+            )
+            RestaurantDailyTally.objects.add_vote(
+                restaurant_id=self.restaurant_id, date=date, vote_weight=self.vote_weight, is_new_voter=is_new_voter
+            )
+            Restaurant.objects.add_votes(self.restaurant_id, self.vote_weight, 1, int(is_new_restaurant_voter))
+            leaderboard = get_leaderboard()
+            if leaderboard is not None:
+                transaction.on_commit(partial(
+                    leaderboard.add_votes, date, self.restaurant_id, self.vote_weight, int(is_new_voter)
+                ), using=using)
+
+    @classmethod
+    def bulk_vote(cls, votes):
+        """
+        Saves current day votes given as list of (restaurant, user) pairs with single bulk insert.
+        Votes exceeding user daily vote count are skipped, other votes get weights in given order per user.
+        Returns saved vote or None for each pair.
+        """
+        date = get_voting_date()
+        with transaction.atomic():
+            current_day_vote_counts = RestaurantUserDailyVoteCount.objects.admit_votes(votes, date)
+            saved_votes = [
+                None if current_day_vote_count is None else cls(
+                    restaurant=restaurant, user=user, vote_weight=Restaurant.get_vote_weight(current_day_vote_count),
+                    vote_date=date,
+                ) for (restaurant, user), current_day_vote_count in zip(votes, current_day_vote_counts)
+            ]
+            cls.objects.bulk_create([vote for vote in saved_votes if vote is not None])
+
+            # First votes of the day of users, who didn't vote for restaurant during previous days
+            new_voters = {
+                (vote.restaurant_id, vote.user_id)
+                for vote, current_day_vote_count in zip(saved_votes, current_day_vote_counts)
+                if vote is not None and current_day_vote_count == 0
+            }
+            if new_voters:
+                new_voters -= Restaurant.objects.get_previous_voters(
+                    {restaurant_id for restaurant_id, _ in new_voters}, {user_id for _, user_id in new_voters}, date,
+                )
+
+            tallies = defaultdict(lambda: {'rating': 0, 'new_voters_count': 0, 'votes_count': 0})
+            totals = defaultdict(lambda: {'rating': 0, 'votes_count': 0, 'new_voters_count': 0})
+            for vote, current_day_vote_count in zip(saved_votes, current_day_vote_counts):
+                if vote is None:
+                    continue
+                tally = tallies[vote.restaurant_id]
+                tally['rating'] += vote.vote_weight
+                tally['new_voters_count'] += int(current_day_vote_count == 0)
+                tally['votes_count'] += 1
+                total = totals[vote.restaurant_id]
+                total['rating'] += vote.vote_weight
+                total['votes_count'] += 1
+                total['new_voters_count'] += int(
+                    current_day_vote_count == 0 and (vote.restaurant_id, vote.user_id) in new_voters
+                )
+
+            if tallies:
+                RestaurantDailyTally.objects.add_restaurants_votes(date, tallies)
+                Restaurant.objects.add_restaurants_votes(totals)
+            leaderboard = get_leaderboard()
+            if leaderboard is not None:
+                for restaurant_id, tally in tallies.items():
+                    transaction.on_commit(partial(
+                        leaderboard.add_votes, date, restaurant_id, tally['rating'], tally['new_voters_count']
+                    ))
+
+        return saved_votes
+
+
+class RestaurantDailyTally(TimestampModelFields, models.Model):
+    """
+    Restaurant votes aggregated for single day, so list views don't need to aggregate all votes.
+    Cumulative rating sums ratings of restaurant tallies up to the day, so rating of any period is difference of two
+    cumulative ratings.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, verbose_name=_('restaurant'))
+    date = models.DateField(verbose_name=_('date'))
+    rating = models.FloatField(default=0, verbose_name=_('rating'))
+    distinct_voted_users = models.PositiveIntegerField(default=0, verbose_name=_('distinct voted users'))
+    votes_count = models.PositiveIntegerField(default=0, verbose_name=_('votes count'))
+    cumulative_rating = models.FloatField(default=0, verbose_name=_('cumulative rating'))
+
+    objects = RestaurantDailyTallyManager()
+
+    class Meta:
+        verbose_name = _('restaurant daily tally')
+        verbose_name_plural = _('restaurant daily tallies')
+        unique_together = ['restaurant', 'date']
+        indexes = [
+            models.Index(fields=['updated_datetime'], name='tally_updated_idx'),
+            models.Index(fields=['date', 'updated_datetime'], name='tally_date_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.date} - {self.restaurant}'
+
+
+class RestaurantUserDailyVoteCount(TimestampModelFields, models.Model):
+    """
+    User vote slot of restaurant during single day: votes count and weight of next vote, used to admit votes
+    atomically without counting votes or evaluating weight schedule on vote path.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name=_('user'))
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, verbose_name=_('restaurant'))
+    date = models.DateField(verbose_name=_('date'))
+    votes_count = models.PositiveSmallIntegerField(default=0, verbose_name=_('votes count'))
+    next_vote_weight = models.FloatField(verbose_name=_('next vote weight'))
+
+    objects = RestaurantUserDailyVoteCountManager()
+
+    class Meta:
+        verbose_name = _('restaurant user daily vote count')
+        verbose_name_plural = _('restaurant user daily vote counts')
+        unique_together = ['restaurant', 'user', 'date']
+
+    def __str__(self):
+        return f'{self.date} - {self.user} - {self.restaurant}'
+
+
+class RestaurantUserDailyVoteRollup(TimestampModelFields, models.Model):
+    """
+    User votes for restaurant during single compacted day, replacing raw votes older than archive horizon,
+    so aggregations of old periods read one row per user day instead of every vote
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name=_('user'))
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, verbose_name=_('restaurant'))
+    date = models.DateField(verbose_name=_('date'))
+    rating = models.FloatField(default=0, verbose_name=_('rating'))
+    votes_count = models.PositiveIntegerField(default=0, verbose_name=_('votes count'))
+
+    class Meta:
+        verbose_name = _('restaurant user daily vote rollup')
+        verbose_name_plural = _('restaurant user daily vote rollups')
+        unique_together = ['restaurant', 'user', 'date']
+        indexes = [
+            models.Index(fields=['date', 'restaurant'], name='rollup_date_restaurant_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.date} - {self.user} - {self.restaurant}'
+
+
+class ArchivedRestaurantUserVote(TimestampModelFields, models.Model):
+    """Raw restaurant user vote moved out of votes table by compaction, kept for audit"""
+    vote_id = models.BigIntegerField(unique=True, verbose_name=_('vote id'))
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name=_('user'))
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, verbose_name=_('restaurant'))
+    vote_weight = models.FloatField(verbose_name=_('vote weight'))
+    vote_date = models.DateField(verbose_name=_('vote date'))
+    voted_datetime = models.DateTimeField(verbose_name=_('vote creation date'))
+
+    class Meta:
+        verbose_name = _('archived restaurant user vote')
+        verbose_name_plural = _('archived restaurant user votes')
+
+    def __str__(self):
+        return f'{self.voted_datetime} - {self.user} - {self.restaurant}'
+
+
+class RestaurantDailyVoterSketch(TimestampModelFields, models.Model):
+    """
+    HyperLogLog sketch of users voted for restaurant during single closed day, merged with sketches of other days to
+    estimate distinct voted users of long periods
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, verbose_name=_('restaurant'))
+    date = models.DateField(verbose_name=_('date'))
+    sketch = models.BinaryField(verbose_name=_('voted users sketch'))
+
+    class Meta:
+        verbose_name = _('restaurant daily voter sketch')
+        verbose_name_plural = _('restaurant daily voter sketches')
+        unique_together = ['restaurant', 'date']
+        indexes = [
+            models.Index(fields=['date', 'restaurant'], name='sketch_date_restaurant_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.date} - {self.restaurant}'
@@ -0,0 +1,67 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from rest_framework.renderers import BaseRenderer
+
+
+class EchoBuffer:
+    """File-like object returning written value, so csv writer rows can be streamed"""
+
+    @staticmethod
+    def write(value):
+        return value
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Renderer of export format. Exported lists are streamed row by row with render_rows,
+    other responses (e.g. errors) are rendered by render.
+    """
+    charset = 'utf-8'
+
+    def render_rows(self, rows, fields):
+        """Returns iterator of rendered rows, where rows are serialized objects with given fields"""
+        raise NotImplementedError
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows and isinstance(rows[0], dict) else []
+
+        return ''.join(self.render_rows(rows, fields)).encode(self.charset)
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render_rows(self, rows, fields):
+        writer = csv.DictWriter(EchoBuffer(), fieldnames=fields, extrasaction='ignore')
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render_rows(self, rows, fields):
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Renderer of Server-Sent Events views, their not streamed responses (e.g. errors) are rendered as error event"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return f'event: error\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'.encode(self.charset)
@@ -1,9 +1,14 @@
+from functools import lru_cache
+from operator import attrgetter
+
+from django.urls import get_script_prefix
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework import serializers
 from rest_framework.reverse import reverse
 
-from .models import Restaurant, RestaurantUserVote
+from common.utils import get_voting_date
+from .models import Restaurant, RestaurantUserDailyVoteCount, RestaurantUserVote
 
 
 class RestaurantSerializer(serializers.ModelSerializer):
@@ -12,56 +17,131 @@ class RestaurantSerializer(serializers.ModelSerializer):
         fields = ('title', 'address')
 
 
-class RestaurantListBaseSerializer(serializers.ModelSerializer):
-    distinct_voted_users = serializers.ReadOnlyField()
-    rating = serializers.ReadOnlyField()
+class ReadOnlyAttributesSerializer(serializers.BaseSerializer):
+    """
+    Read-only serializer of object attributes, which doesn't create DRF fields, so large list pages are serialized
+    faster. Meta.fields are output keys, Meta.sources maps output keys to dotted attribute paths.
+    Meta.optional_fields are left out when their attribute isn't set on object (e.g. missing queryset annotations),
+    like DRF read-only fields do. Static methods named get_<field> are used instead of object attributes.
+    """
 
     class Meta:
-        model = Restaurant
-        fields = ('title', 'address', 'distinct_voted_users', 'rating')
+        fields = ()
+        sources = {}
+        optional_fields = ()
+
+    @property
+    def fields(self):
+        return self.Meta.fields
+
+    @classmethod
+    def get_attribute_getters(cls):
+        """Returns (field, getter, attribute of optional field or None) of each field"""
+        if '_attribute_getters' not in cls.__dict__:
+            cls._attribute_getters = tuple(
+                (
+                    field,
+                    getattr(cls, f'get_{field}', None) or attrgetter(cls.Meta.sources.get(field, field)),
+                    cls.Meta.sources.get(field, field) if field in cls.Meta.optional_fields else None,
+                ) for field in cls.Meta.fields
+            )
+
+        return cls._attribute_getters
 
+    def to_representation(self, instance):
+        representation = {}
+        for field, getter, optional_attribute in self.get_attribute_getters():
+            if optional_attribute is not None and optional_attribute not in instance.__dict__:
+                continue
+            representation[field] = getter(instance)
 
-class RestaurantWinnersHistory(serializers.ModelSerializer):
-    date = serializers.ReadOnlyField(source='created_datetime__date')
-    title = serializers.ReadOnlyField(source='restaurant__title')
-    address = serializers.ReadOnlyField(source='restaurant__address')
-    rating = serializers.ReadOnlyField()
-    total_distinct_users_voted = serializers.ReadOnlyField()
+        return representation
 
+
+class RestaurantListBaseSerializer(ReadOnlyAttributesSerializer):
     class Meta:
-        model = RestaurantUserVote
-        fields = ('date', 'restaurant_id', 'title', 'address', 'rating', 'total_distinct_users_voted')
+        fields = ('title', 'address', 'distinct_voted_users', 'rating')
+        sources = {}
+        optional_fields = ('distinct_voted_users', 'rating')
 
 
-class RestaurantsListSerializer(RestaurantListBaseSerializer):
-    user_vote_count_today = serializers.ReadOnlyField()
-    can_user_vote_today = serializers.ReadOnlyField()
-    vote_url = serializers.SerializerMethodField()
+class RestaurantWinnersHistory(ReadOnlyAttributesSerializer):
+    class Meta:
+        fields = ('date', 'restaurant_id', 'title', 'address', 'rating', 'total_distinct_users_voted')
+        sources = {
+            'title': 'restaurant.title',
+            'address': 'restaurant.address',
+            'total_distinct_users_voted': 'distinct_voted_users',
+        }
+        optional_fields = ()
 
-    @staticmethod
-    def get_vote_url(obj):
-        return reverse('restaurant_vote', kwargs={'pk': obj.pk})
 
+class RestaurantsListSerializer(RestaurantListBaseSerializer):
     class Meta:
-        model = Restaurant
         fields = (
             'title', 'address', 'distinct_voted_users', 'rating', 'user_vote_count_today', 'can_user_vote_today',
             'vote_url',
         )
+        sources = {}
+        optional_fields = ('distinct_voted_users', 'rating', 'user_vote_count_today', 'can_user_vote_today')
+
+    @staticmethod
+    def get_vote_url(obj):
+        return get_vote_url_template(get_script_prefix()).format(pk=obj.pk)
+
+
+@lru_cache(maxsize=None)
+def get_vote_url_template(script_prefix):
+    """
+    Restaurant vote URL with {pk} placeholder, so URL isn't reversed for every restaurant.
+    Templates are cached per script prefix, which is part of reversed URL.
+    """
+    placeholder_pk = 1234567890
+
+    return reverse('restaurant_vote', kwargs={'pk': placeholder_pk}).replace(str(placeholder_pk), '{pk}')
 
 
 class RestaurantUserVoteSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
+    default_error_messages = {
+        'daily_vote_count_exceeded': _('You already voted maximum times allowed for this restaurant today'),
+    }
+
     class Meta:
         model = RestaurantUserVote
         fields = ['user']
 
     def validate(self, attrs):
-        current_day_vote_count = self.context.get('restaurant').get_user_current_day_vote_count(attrs.get('user'))
-        if current_day_vote_count >= attrs.get('user').daily_vote_count:
-            raise serializers.ValidationError(
-                _('You already voted maximum times allowed for this restaurant today'),
-            )
+        """User vote slot of restaurant day is read once, it's taken by vote view when vote is saved"""
+        self.vote_slot = RestaurantUserDailyVoteCount.objects.get_vote_slot(
+            self.context.get('restaurant'), attrs.get('user'), get_voting_date(),
+        )
+        if self.vote_slot.votes_count >= attrs.get('user').daily_vote_count:
+            self.fail('daily_vote_count_exceeded')
 
         return attrs
+
+
+class RestaurantBulkVoteItemSerializer(serializers.Serializer):
+    user = serializers.IntegerField(min_value=1)
+    restaurant = serializers.IntegerField(min_value=1)
+
+
+class RestaurantBulkVoteSerializer(serializers.Serializer):
+    MAX_VOTES_COUNT = 1000
+
+    votes = RestaurantBulkVoteItemSerializer(many=True, allow_empty=False)
+
+    default_error_messages = {
+        'max_votes_count_exceeded': _('Ensure there are no more than {max_votes_count} votes'),
+        'user_not_found': _('User not found'),
+        'restaurant_not_found': _('Restaurant not found'),
+        'daily_vote_count_exceeded': _('You already voted maximum times allowed for this restaurant today'),
+    }
+
+    def validate_votes(self, votes):
+        if len(votes) > self.MAX_VOTES_COUNT:
+            self.fail('max_votes_count_exceeded', max_votes_count=self.MAX_VOTES_COUNT)
+
+        return votes
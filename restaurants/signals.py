@@ -0,0 +1,141 @@
+import threading
+from collections import defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from common.utils import get_voting_date
+
+from .caches import ClosedDayVotesCache
+from .leaderboards import get_leaderboard
+from .models import Restaurant, RestaurantDailyTally, RestaurantDailyVoterSketch, RestaurantUserDailyVoteCount, \
+    RestaurantUserDailyVoteRollup, RestaurantUserVote
+
+deleted_votes = threading.local()
+
+
+def collect_deleted_vote(name, using, item, callback):
+    """
+    Collects item of deleted vote into named set of transaction database and registers callback, so collected items
+    are handled once after transaction is committed, and deleting user or restaurant with many votes doesn't run
+    queries for every vote. First callback of transaction handles all items, later ones find nothing to handle.
+    """
+    if not hasattr(deleted_votes, name):
+        setattr(deleted_votes, name, defaultdict(set))
+    getattr(deleted_votes, name)[using].add(item)
+    transaction.on_commit(partial(callback, using), using=using)
+
+
+def pop_deleted_votes(name, using):
+    """Returns and forgets items collected for transaction database"""
+    return getattr(deleted_votes, name).pop(using, None)
+
+
+def get_deleted_vote_date(sender, instance):
+    return instance.vote_date if sender is RestaurantUserVote else instance.date
+
+
+@receiver(post_delete, sender=RestaurantUserVote)
+def invalidate_closed_day_votes_cache(sender, instance, using, **kwargs):
+    """Votes are created only for current day, so closed day votes are changed only by deleting them"""
+    transaction.on_commit(ClosedDayVotesCache.invalidate, using=using)
+
+
+@receiver(post_delete, sender=RestaurantUserVote)
+def release_vote_slot(sender, instance, using, **kwargs):
+    """
+    Current day vote slots of deleted votes are counted again after transaction is committed, so user can vote again.
+    Slots of closed days aren't used to admit votes anymore.
+    """
+    if instance.vote_date == get_voting_date():
+        collect_deleted_vote(
+            'vote_slots', using, (instance.restaurant_id, instance.user_id, instance.vote_date),
+            recount_deleted_votes_vote_slots,
+        )
+
+
+def recount_deleted_votes_vote_slots(using):
+    vote_slots = pop_deleted_votes('vote_slots', using)
+    if vote_slots:
+        RestaurantUserDailyVoteCount.objects.db_manager(using).recount_vote_slots(vote_slots)
+
+
+@receiver(post_delete, sender=RestaurantUserVote)
+@receiver(post_delete, sender=RestaurantUserDailyVoteRollup)
+def refresh_restaurant_daily_tallies(sender, instance, using, **kwargs):
+    """Day tallies of deleted votes or rollups of compacted votes are counted again after transaction is committed"""
+    collect_deleted_vote(
+        'tally_days', using, (instance.restaurant_id, get_deleted_vote_date(sender, instance)),
+        refresh_deleted_votes_tallies,
+    )
+
+
+def refresh_deleted_votes_tallies(using):
+    tally_days = pop_deleted_votes('tally_days', using)
+    if tally_days:
+        RestaurantDailyTally.objects.db_manager(using).refresh_tallies(tally_days)
+
+
+@receiver(post_delete, sender=RestaurantUserVote)
+def invalidate_leaderboard(sender, instance, using, **kwargs):
+    """
+    Leaderboard days of deleted votes are deleted after their tallies are counted again, so they are built again from
+    tallies on next read. Leaderboard can't subtract deleted votes, as distinct voted users are counted again.
+    """
+    if get_leaderboard() is not None:
+        collect_deleted_vote('leaderboard_dates', using, instance.vote_date, invalidate_deleted_votes_leaderboard)
+
+
+def invalidate_deleted_votes_leaderboard(using):
+    dates = pop_deleted_votes('leaderboard_dates', using)
+    leaderboard = get_leaderboard()
+    if dates and leaderboard is not None:
+        for date in dates:
+            leaderboard.invalidate(date)
+
+
+@receiver(post_delete, sender=Restaurant)
+def remove_restaurant_from_leaderboard(sender, instance, using, **kwargs):
+    """Deleted restaurant is removed from current day leaderboard after transaction is committed"""
+    leaderboard = get_leaderboard()
+    if leaderboard is not None:
+        transaction.on_commit(
+            partial(leaderboard.remove_restaurant, get_voting_date(), instance.pk), using=using,
+        )
+
+
+@receiver(post_delete, sender=RestaurantUserVote)
+@receiver(post_delete, sender=RestaurantUserDailyVoteRollup)
+def refresh_restaurant_totals(sender, instance, using, **kwargs):
+    """Restaurant totals of deleted votes are counted again after transaction is committed"""
+    collect_deleted_vote('restaurant_ids', using, instance.restaurant_id, refresh_deleted_votes_restaurant_totals)
+
+
+def refresh_deleted_votes_restaurant_totals(using):
+    restaurant_ids = pop_deleted_votes('restaurant_ids', using)
+    if restaurant_ids:
+        Restaurant.objects.db_manager(using).refresh_totals(restaurant_ids)
+
+
+@receiver(post_delete, sender=RestaurantUserVote)
+@receiver(post_delete, sender=RestaurantUserDailyVoteRollup)
+def invalidate_voter_sketches(sender, instance, using, **kwargs):
+    """
+    Voter sketches of restaurant days of deleted votes are deleted after transaction is committed, so they are built
+    again from remaining votes on next read
+    """
+    collect_deleted_vote(
+        'sketch_days', using, (instance.restaurant_id, get_deleted_vote_date(sender, instance)),
+        delete_deleted_votes_voter_sketches,
+    )
+
+
+def delete_deleted_votes_voter_sketches(using):
+    sketch_days = pop_deleted_votes('sketch_days', using)
+    if sketch_days:
+        RestaurantDailyVoterSketch.objects.using(using).filter(
+            restaurant_id__in={restaurant_id for restaurant_id, _ in sketch_days},
+            date__in={date for _, date in sketch_days},
+        ).delete()
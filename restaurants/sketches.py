@@ -0,0 +1,155 @@
+import hashlib
+import math
+
+from django.db import router
+
+from .models import RestaurantDailyTally, RestaurantDailyVoterSketch, RestaurantUserDailyVoteRollup, \
+    RestaurantUserVote
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch estimating count of distinct values in 2 ** precision one byte registers.
+    Relative standard error of estimate is 1.04 / sqrt(2 ** precision), 1.6% with default precision 12,
+    counts below 2.5 * 2 ** precision are estimated by linear counting, so small counts are nearly exact.
+    Merged sketches estimate distinct values of union, so day sketches are merged into sketch of any period.
+    """
+    default_precision = 12
+    hash_bits = 64
+    dense_format = 0
+    sparse_format = 1
+
+    def __init__(self, precision=None):
+        self.precision = precision or self.default_precision
+        if not 4 <= self.precision <= 16:
+            raise ValueError(f'HyperLogLog precision should be from 4 to 16, got {self.precision}')
+        self.registers_count = 1 << self.precision
+        self.registers = bytearray(self.registers_count)
+
+    @classmethod
+    def get_standard_error(cls, precision=None):
+        return 1.04 / math.sqrt(1 << (precision or cls.default_precision))
+
+    def get_hash(self, value):
+        """Stable 64 bit hash of value string, so sketches built by different processes can be merged"""
+        return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+    def add(self, value):
+        """Register of first hash bits keeps maximum position of first set bit among remaining hash bits"""
+        value_hash = self.get_hash(value)
+        remaining_bits = self.hash_bits - self.precision
+        index = value_hash >> remaining_bits
+        rank = remaining_bits - (value_hash & ((1 << remaining_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError('HyperLogLog sketches of different precision can\'t be merged')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def merge_bytes(self, data):
+        """Merges serialized sketch without deserializing it, sparse sketches update only their registers"""
+        data = bytes(data)
+        if data[0] != self.precision:
+            raise ValueError('HyperLogLog sketches of different precision can\'t be merged')
+
+        if data[1] == self.dense_format:
+            self.registers = bytearray(map(max, self.registers, data[2:]))
+            return
+        for offset in range(2, len(data), 3):
+            index = int.from_bytes(data[offset:offset + 2], 'big')
+            if data[offset + 2] > self.registers[index]:
+                self.registers[index] = data[offset + 2]
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.registers_count)
+        estimate = alpha * self.registers_count ** 2 / sum(2.0 ** -register for register in self.registers)
+        empty_registers_count = self.registers.count(0)
+        if estimate <= 2.5 * self.registers_count and empty_registers_count:
+            estimate = self.registers_count * math.log(self.registers_count / empty_registers_count)
+
+        return round(estimate)
+
+    def to_bytes(self):
+        """
+        Sketch is serialized as precision and format bytes followed by registers. Sketch with few set registers
+        (restaurant day with few voters) is serialized as 2 byte index and value of each set register.
+        """
+        indexes = [index for index, register in enumerate(self.registers) if register]
+        if len(indexes) * 3 >= self.registers_count:
+            return bytes([self.precision, self.dense_format]) + bytes(self.registers)
+
+        return bytes([self.precision, self.sparse_format]) + b''.join(
+            index.to_bytes(2, 'big') + bytes([self.registers[index]]) for index in indexes
+        )
+
+    @classmethod
+    def from_bytes(cls, data):
+        sketch = cls(precision=bytes(data[:1])[0])
+        sketch.merge_bytes(data)
+
+        return sketch
+
+
+class RestaurantVoterSketches:
+    """
+    Restaurant daily voted users sketches of closed days, so distinct voted users of long periods are estimated by
+    merging one sketch per restaurant day instead of counting distinct users of all votes.
+    Sketches are built on first read of their day from votes and rollups, for every restaurant with daily tally.
+    """
+
+    def __init__(self, restaurants_queryset):
+        self.restaurants_queryset = restaurants_queryset
+
+    def get_sketches(self, first_date, last_date):
+        """Returns {restaurant_id: HyperLogLog} of closed days from first_date to last_date merged by restaurant"""
+        self.build_missing_sketches(first_date, last_date)
+        sketches = {}
+        for restaurant_id, data in RestaurantDailyVoterSketch.objects.filter(
+            date__gte=first_date, date__lte=last_date, restaurant_id__in=self.restaurants_queryset.values('pk'),
+        ).values_list('restaurant_id', 'sketch').order_by().iterator():
+            sketches.setdefault(restaurant_id, HyperLogLog()).merge_bytes(data)
+
+        return sketches
+
+    @staticmethod
+    def build_missing_sketches(first_date, last_date):
+        """
+        Sketches are kept without rebuilding, so they are built from primary database without replication lag.
+        Days are built whole, so concurrently built sketches of the same day are equal and conflicts are ignored.
+        """
+        using = router.db_for_write(RestaurantDailyVoterSketch)
+        built_days = set(RestaurantDailyVoterSketch.objects.using(using).filter(
+            date__gte=first_date, date__lte=last_date,
+        ).values_list('restaurant_id', 'date').order_by())
+        missing_days = set(RestaurantDailyTally.objects.using(using).filter(
+            date__gte=first_date, date__lte=last_date,
+        ).values_list('restaurant_id', 'date').order_by()) - built_days
+        if not missing_days:
+            return
+
+        # Missing days are usually the latest ones, so votes are read from the first to the last missing day
+        first_date = min(date for _, date in missing_days)
+        last_date = max(date for _, date in missing_days)
+        sketches = {day: HyperLogLog() for day in missing_days}
+        votes = RestaurantUserVote.objects.using(using).filter(vote_date__gte=first_date, vote_date__lte=last_date)
+        rollups = RestaurantUserDailyVoteRollup.objects.using(using).filter(date__gte=first_date, date__lte=last_date)
+        for rows in (
+            votes.values_list('restaurant_id', 'vote_date', 'user_id').distinct().order_by(),
+            rollups.values_list('restaurant_id', 'date', 'user_id').order_by(),
+        ):
+            for restaurant_id, date, user_id in rows.iterator():
+                sketch = sketches.get((restaurant_id, date))
+                if sketch is not None:
+                    sketch.add(user_id)
+
+        RestaurantDailyVoterSketch.objects.using(using).bulk_create((
+            RestaurantDailyVoterSketch(restaurant_id=restaurant_id, date=date, sketch=sketch.to_bytes())
+            for (restaurant_id, date), sketch in sketches.items()
+        ), batch_size=1000, ignore_conflicts=True)
+
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from restaurant_voting.urls import urlpatterns as project_urlpatterns
+from restaurants import views
+
+urlpatterns = [
+    path('restaurant/list/', views.AsyncListRestaurants.as_view(), name='restaurant_list'),
+    path('restaurant/<int:pk>/vote/', views.AsyncVoteRestaurant.as_view(), name='restaurant_vote'),
+    *project_urlpatterns,
+]
@@ -0,0 +1,115 @@
+import random
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils.timezone import make_aware
+
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from common.utils import get_voting_date
+from restaurants.analytics import get_vote_columns, numpy
+from restaurants.generators import VoteDataGenerator
+from restaurants.models import Restaurant, RestaurantUserVote
+from restaurants.tests.test_views import KeysetPaginatedHistoryShould
+from users.models import User
+
+
+@skipIf(numpy is None, 'NumPy is not installed')
+@override_settings(RESTAURANTS_HISTORY_COLUMNAR_ENGINE=True)
+class ColumnarHistoryEngineShould(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='viewer'))
+
+    def get_results(self, url_name, params=None):
+        results = []
+        url = reverse(url_name)
+        while url:
+            response = self.client.get(url, params)
+            if response.status_code != 200:
+                return response.status_code, response.data
+            results.extend(response.data['results'])
+            url, params = response.data['next'], None
+
+        return results
+
+    def assertResultsEqualDatabase(self, url_name, params=None):
+        results = self.get_results(url_name, params)
+        with override_settings(RESTAURANTS_HISTORY_COLUMNAR_ENGINE=False):
+            self.assertEqual(results, self.get_results(url_name, params))
+
+    def create_votes(self, days, users_count, restaurant):
+        users = [User.objects.get_or_create(username=f'voter{i}')[0] for i in range(users_count)]
+        with mock.patch('django.utils.timezone.now') as mocked_timezone_now:
+            for day in days:
+                mocked_timezone_now.return_value = make_aware(datetime(2020, 1, day, 12))
+                RestaurantUserVote.bulk_vote([(restaurant, user) for user in users])
+
+    def test_return_the_same_results_as_database_for_random_datasets_and_periods(self):
+        for seed in range(5):
+            with self.subTest(seed=seed), transaction.atomic():
+                cache.clear()
+                randomizer = random.Random(seed)
+                VoteDataGenerator(
+                    randomizer.randint(1, 30), randomizer.randint(1, 15), randomizer.randint(1, 10), seed=seed,
+                ).generate()
+                call_command('rebuild_restaurant_daily_tallies', stdout=StringIO())
+                call_command('rebuild_restaurant_totals', stdout=StringIO())
+                restaurant_ids = list(Restaurant.objects.values_list('pk', flat=True))
+                for _ in range(5):
+                    first_date = get_voting_date() - timedelta(days=randomizer.randint(0, 12))
+                    params = {
+                        'date_after': first_date.isoformat(),
+                        'date_before': (first_date + timedelta(days=randomizer.randint(0, 12))).isoformat(),
+                        'restaurants': randomizer.sample(restaurant_ids, randomizer.randint(1, len(restaurant_ids))),
+                    }
+                    for period_params in [{}, {'date_after': params['date_after']}, params]:
+                        self.assertResultsEqualDatabase('restaurant_history', period_params)
+                        self.assertResultsEqualDatabase('restaurant_winners_history', period_params)
+                transaction.set_rollback(True)
+
+    def test_append_new_votes_to_loaded_columns(self):
+        restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        self.create_votes([1], 2, restaurant)
+        self.get_results('restaurant_history')
+        RestaurantUserVote.bulk_vote([(restaurant, User.objects.create_user(username=f'u{i}')) for i in range(3)])
+
+        self.assertEqual(get_vote_columns().get_columns()[0].tolist(), [restaurant.pk] * 5)
+        self.assertResultsEqualDatabase('restaurant_history')
+
+    def test_load_columns_again_when_votes_deleted(self):
+        restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        self.create_votes([1, 2], 2, restaurant)
+        self.get_results('restaurant_history')
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(username='voter1').delete()
+
+        self.assertEqual(len(get_vote_columns().get_columns()[0]), 2)
+        self.assertResultsEqualDatabase('restaurant_history')
+
+    def test_read_compacted_votes_from_rollups(self):
+        restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        restaurant2 = Restaurant.objects.create(title='TestTitle2', address='TestAddress')
+        self.create_votes([1, 2, 3], 2, restaurant)
+        self.create_votes([1, 2], 3, restaurant2)
+        with mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, 5, 12))):
+            call_command('compact_restaurant_votes', days=3, stdout=StringIO())
+        get_vote_columns().reload()
+
+        self.assertResultsEqualDatabase('restaurant_history', {'date_after': '2020-01-02'})
+        self.assertResultsEqualDatabase('restaurant_winners_history')
+
+
+@skipIf(numpy is None, 'NumPy is not installed')
+@override_settings(RESTAURANTS_HISTORY_COLUMNAR_ENGINE=True)
+class ColumnarKeysetPaginatedHistoryShould(KeysetPaginatedHistoryShould):
+    def setUp(self):
+        cache.clear()
+        super(ColumnarKeysetPaginatedHistoryShould, self).setUp()
@@ -0,0 +1,94 @@
+import json
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+
+from rest_framework.reverse import reverse
+
+from restaurants.models import Restaurant, RestaurantUserVote
+from restaurants.tests.test_views import ConditionalListRequestsShould, ListRestaurantsShould, VoteRestaurantShould
+from restaurants.views import AsyncListRestaurants, AsyncVoteRestaurant
+from users.models import User
+
+
+@override_settings(ROOT_URLCONF='restaurants.tests.async_urls')
+class AsyncListRestaurantsShould(ListRestaurantsShould):
+    pass
+
+
+@override_settings(ROOT_URLCONF='restaurants.tests.async_urls')
+class AsyncConditionalListRequestsShould(ConditionalListRequestsShould):
+    pass
+
+
+@override_settings(ROOT_URLCONF='restaurants.tests.async_urls')
+class AsyncVoteRestaurantShould(VoteRestaurantShould):
+    pass
+
+
+@override_settings(ROOT_URLCONF='restaurants.tests.async_urls')
+class AsyncViewsASGIRequestsShould(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u', daily_vote_count=2)
+        self.async_client.force_login(self.user)
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+
+    def test_be_coroutine_functions_awaited_by_asgi_handler(self):
+        for view_class in (AsyncListRestaurants, AsyncVoteRestaurant):
+            with self.subTest(view_class=view_class):
+                view = view_class.as_view()
+
+                self.assertTrue(asyncio.iscoroutinefunction(view))
+                self.assertTrue(view.csrf_exempt)
+
+    async def test_return_restaurant_list_to_asgi_request(self):
+        response = await self.async_client.get(reverse('restaurant_list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['title'], 'TestTitle')
+
+    async def test_create_restaurant_user_vote_from_asgi_request(self):
+        response = await self.async_client.post(
+            reverse('restaurant_vote', kwargs={'pk': self.restaurant.pk}), {}, content_type='application/json',
+        )
+        votes_count = await sync_to_async(RestaurantUserVote.objects.filter(user=self.user).count)()
+
+        self.assertEqual((response.status_code, votes_count), (201, 1))
+
+    async def test_return_http_403_when_asgi_request_user_is_anonymous(self):
+        await sync_to_async(self.async_client.logout)()
+        response = await self.async_client.get(reverse('restaurant_list'))
+
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(ROOT_URLCONF='restaurants.tests.async_urls')
+class ExportListASGIRequestsShould(TestCase):
+    def setUp(self):
+        self.async_client.force_login(User.objects.create_user(username='u'))
+        restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        RestaurantUserVote.objects.create(
+            user=User.objects.create_user(username='u2'), restaurant=restaurant, vote_weight=1
+        )
+
+    async def get_export_rows(self, url_name, export_format):
+        response = await self.async_client.get(f'{reverse(url_name)}?format={export_format}')
+
+        return response.status_code, b''.join(response.streaming_content).decode().splitlines()
+
+    async def test_stream_restaurant_history_and_winners_as_csv_to_asgi_request(self):
+        for url_name in ('restaurant_history', 'restaurant_winners_history'):
+            with self.subTest(url_name=url_name):
+                status_code, rows = await self.get_export_rows(url_name, 'csv')
+
+                self.assertEqual((status_code, len(rows)), (200, 2))
+                self.assertIn('TestTitle', rows[1])
+
+    async def test_stream_restaurant_history_and_winners_as_ndjson_to_asgi_request(self):
+        for url_name in ('restaurant_history', 'restaurant_winners_history'):
+            with self.subTest(url_name=url_name):
+                status_code, rows = await self.get_export_rows(url_name, 'ndjson')
+
+                self.assertEqual((status_code, len(rows)), (200, 1))
+                self.assertEqual(json.loads(rows[0])['title'], 'TestTitle')
@@ -0,0 +1,50 @@
+from array import array
+from datetime import date, datetime
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils.timezone import make_aware
+
+from restaurants.caches import ClosedDayVotesCache
+from restaurants.models import Restaurant, RestaurantUserVote
+from users.models import User
+
+
+class ClosedDayVotesCacheShould(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='u')
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        with mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, 2, 12))):
+            RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+            RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=0.5)
+        self.days_cache = ClosedDayVotesCache(RestaurantUserVote.objects)
+
+    def test_return_votes_aggregated_by_day_and_restaurant(self):
+        self.assertDictEqual(self.days_cache.get_days(date(2020, 1, 1), date(2020, 1, 2)), {
+            date(2020, 1, 1): {},
+            date(2020, 1, 2): {self.restaurant.pk: (1.5, array('q', [self.user.pk]))},
+        })
+
+    def test_cache_sorted_distinct_voter_ids_of_day(self):
+        user2 = User.objects.create_user(username='u2')
+        with mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, 2, 12))):
+            RestaurantUserVote.objects.create(user=user2, restaurant=self.restaurant, vote_weight=1)
+
+        self.assertDictEqual(self.days_cache.get_days(date(2020, 1, 2), date(2020, 1, 2)), {
+            date(2020, 1, 2): {self.restaurant.pk: (2.5, array('q', [self.user.pk, user2.pk]))},
+        })
+
+    def test_not_query_cached_days(self):
+        self.days_cache.get_days(date(2020, 1, 1), date(2020, 1, 2))
+
+        with self.assertNumQueries(0):
+            self.days_cache.get_days(date(2020, 1, 1), date(2020, 1, 2))
+
+    def test_query_days_again_when_invalidated(self):
+        self.days_cache.get_days(date(2020, 1, 1), date(2020, 1, 2))
+        ClosedDayVotesCache.invalidate()
+
+        with self.assertNumQueries(1):
+            self.days_cache.get_days(date(2020, 1, 1), date(2020, 1, 2))
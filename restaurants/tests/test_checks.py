@@ -0,0 +1,20 @@
+from django.test import SimpleTestCase, override_settings
+
+from restaurants.checks import check_vote_weights
+
+
+class CheckVoteWeightsShould(SimpleTestCase):
+    def test_return_no_errors_when_vote_weights_fit_vote_weight_field_validators(self):
+        self.assertListEqual(check_vote_weights(None), [])
+
+    @override_settings(RESTAURANTS_VOTE_WEIGHTS=None)
+    def test_return_no_errors_when_vote_weights_setting_not_given(self):
+        self.assertListEqual(check_vote_weights(None), [])
+
+    @override_settings(RESTAURANTS_VOTE_WEIGHTS=[2, 1, 0.1])
+    def test_return_error_with_invalid_weights_when_vote_weights_exceed_vote_weight_field_validators(self):
+        errors = check_vote_weights(None)
+
+        self.assertListEqual([error.id for error in errors], ['restaurants.E001'])
+        self.assertIn('[2, 0.1]', errors[0].hint)
+
@@ -0,0 +1,343 @@
+import json
+import os
+import tempfile
+from datetime import date, datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+from django.db.models.signals import post_delete
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.timezone import make_aware
+
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from common.utils import get_voting_date
+from restaurants.management.commands.benchmark_endpoints import Command
+from restaurants.models import ArchivedRestaurantUserVote, Restaurant, RestaurantDailyTally, \
+    RestaurantDailyVoterSketch, RestaurantUserDailyVoteCount, RestaurantUserDailyVoteRollup, RestaurantUserVote
+from users.models import User
+
+
+class RebuildRestaurantDailyTalliesShould(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u')
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=0.5)
+
+    def test_rebuild_restaurant_daily_tallies_from_restaurant_user_votes(self):
+        RestaurantDailyTally.objects.update(rating=10, distinct_voted_users=10, votes_count=10)
+        call_command('rebuild_restaurant_daily_tallies', stdout=StringIO())
+        tally = RestaurantDailyTally.objects.get()
+
+        self.assertEqual((tally.rating, tally.distinct_voted_users, tally.votes_count), (1.5, 1, 2))
+
+    @mock.patch('django.utils.timezone.now')
+    def test_rebuild_cumulative_ratings_of_restaurant_daily_tallies(self, mocked_timezone_now):
+        mocked_timezone_now.return_value = make_aware(datetime(2020, 1, 1, 12))
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+        mocked_timezone_now.return_value = make_aware(datetime(2020, 1, 3, 12))
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=0.5)
+        RestaurantDailyTally.objects.update(cumulative_rating=0)
+        call_command('rebuild_restaurant_daily_tallies', stdout=StringIO())
+
+        self.assertListEqual(
+            list(RestaurantDailyTally.objects.order_by('date').values_list('cumulative_rating', flat=True)),
+            [1.0, 1.5, 3.0],
+        )
+
+    def test_raise_command_error_when_check_and_cumulative_rating_differs_from_votes(self):
+        RestaurantDailyTally.objects.update(cumulative_rating=10)
+
+        with self.assertRaisesMessage(CommandError, '1 restaurant daily tallies differ'):
+            call_command('rebuild_restaurant_daily_tallies', check=True, stdout=StringIO())
+
+    def test_delete_voter_sketches_when_rebuilding_tallies(self):
+        RestaurantDailyVoterSketch.objects.create(restaurant=self.restaurant, date=date(2020, 1, 1), sketch=b'')
+        call_command('rebuild_restaurant_daily_tallies', stdout=StringIO())
+
+        self.assertFalse(RestaurantDailyVoterSketch.objects.exists())
+
+    def test_not_raise_command_error_when_check_and_tallies_match_votes(self):
+        out = StringIO()
+        call_command('rebuild_restaurant_daily_tallies', check=True, stdout=out)
+        call_command('rebuild_restaurant_totals', check=True, stdout=out)
+
+        self.assertIn('match', out.getvalue())
+
+    def test_raise_command_error_when_check_and_tally_differs_from_votes(self):
+        RestaurantDailyTally.objects.update(rating=10)
+
+        with self.assertRaisesMessage(CommandError, '1 restaurant daily tallies differ'):
+            call_command('rebuild_restaurant_daily_tallies', check=True, stdout=StringIO())
+
+    def test_raise_command_error_when_check_and_tally_is_missing(self):
+        RestaurantDailyTally.objects.all().delete()
+
+        with self.assertRaisesMessage(CommandError, '1 restaurant daily tallies differ'):
+            call_command('rebuild_restaurant_daily_tallies', check=True, stdout=StringIO())
+
+
+class RebuildRestaurantTotalsShould(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u')
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=0.5)
+
+    def test_rebuild_restaurant_totals_from_restaurant_user_votes_and_rollups(self):
+        RestaurantUserDailyVoteRollup.objects.create(
+            user=self.user, restaurant=self.restaurant, date=date(2020, 1, 1), rating=2, votes_count=3,
+        )
+        Restaurant.objects.update(total_rating=10, total_votes=10, distinct_voters=10)
+        call_command('rebuild_restaurant_totals', stdout=StringIO())
+        restaurant = Restaurant.objects.get()
+
+        self.assertEqual((restaurant.total_rating, restaurant.total_votes, restaurant.distinct_voters), (3.5, 5, 1))
+
+    def test_not_raise_command_error_when_check_and_totals_match_votes(self):
+        out = StringIO()
+        call_command('rebuild_restaurant_totals', check=True, stdout=out)
+
+        self.assertIn('match', out.getvalue())
+
+    def test_raise_command_error_when_check_and_totals_differ_from_votes(self):
+        Restaurant.objects.create(title='TestTitle2', address='TestAddress', total_votes=1)
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(distinct_voters=2)
+
+        with self.assertRaisesMessage(CommandError, '2 restaurant totals differ'):
+            call_command('rebuild_restaurant_totals', check=True, stdout=StringIO())
+
+
+class CompactRestaurantVotesShould(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='viewer'))
+        self.users = [User.objects.create_user(username=f'u{i}', daily_vote_count=2) for i in range(2)]
+        self.restaurants = [
+            Restaurant.objects.create(title=f'TestTitle{i}', address='TestAddress') for i in range(2)
+        ]
+        for day in range(1, 11):
+            with self.now(day):
+                for i, user in enumerate(self.users):
+                    for restaurant in self.restaurants[:1 + (day + i) % 2]:
+                        RestaurantUserVote.objects.create(user=user, restaurant=restaurant, vote_weight=1)
+                RestaurantUserVote.objects.create(user=self.users[0], restaurant=self.restaurants[0], vote_weight=0.5)
+
+    @staticmethod
+    def now(day):
+        return mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, day, 12)))
+
+    def compact(self, **options):
+        with self.now(10):
+            call_command('compact_restaurant_votes', stdout=StringIO(), **options)
+
+    def get_history(self, params):
+        with self.now(10):
+            response = self.client.get(reverse('restaurant_history'), params)
+
+        return [(row['title'], row['rating'], row['distinct_voted_users']) for row in response.data['results']]
+
+    def test_move_votes_older_than_horizon_to_rollups_and_archive(self):
+        old_votes = set(RestaurantUserVote.objects.filter(
+            vote_date__lt=date(2020, 1, 5)
+        ).values_list('pk', 'user_id', 'restaurant_id', 'vote_weight'))
+        votes_count = RestaurantUserVote.objects.count()
+        self.compact(days=5)
+
+        self.assertFalse(RestaurantUserVote.objects.filter(vote_date__lt=date(2020, 1, 5)).exists())
+        self.assertEqual(RestaurantUserVote.objects.count(), votes_count - len(old_votes))
+        self.assertSetEqual(
+            set(ArchivedRestaurantUserVote.objects.values_list('vote_id', 'user_id', 'restaurant_id', 'vote_weight')),
+            old_votes,
+        )
+        rollup = RestaurantUserDailyVoteRollup.objects.get(
+            date=date(2020, 1, 1), user=self.users[0], restaurant=self.restaurants[0]
+        )
+        self.assertEqual((rollup.rating, rollup.votes_count), (1.5, 2))
+
+    def test_keep_restaurant_history_unchanged_when_votes_compacted(self):
+        periods = [
+            {}, {'date_after': '2020-01-02'}, {'date_before': '2020-01-04'}, {'date_after': '2020-01-06'},
+            {'date_after': '2020-01-03', 'date_before': '2020-01-08'},
+        ]
+        histories = [self.get_history(params) for params in periods]
+        self.compact(days=5)
+
+        for closed_day_cache in [False, True]:
+            with override_settings(RESTAURANTS_HISTORY_CLOSED_DAY_CACHE=closed_day_cache):
+                for params, history in zip(periods, histories):
+                    with self.subTest(params=params, closed_day_cache=closed_day_cache):
+                        self.assertListEqual(self.get_history(params), history)
+
+    def test_keep_restaurant_daily_tallies_rebuilt_from_votes_and_rollups(self):
+        tallies = list(RestaurantDailyTally.objects.order_by('date', 'restaurant').values_list(
+            'date', 'restaurant', 'rating', 'distinct_voted_users', 'votes_count'
+        ))
+        self.compact(days=5)
+        call_command('rebuild_restaurant_daily_tallies', check=True, stdout=StringIO())
+        call_command('rebuild_restaurant_totals', check=True, stdout=StringIO())
+        call_command('rebuild_restaurant_daily_tallies', stdout=StringIO())
+
+        self.assertListEqual(list(RestaurantDailyTally.objects.order_by('date', 'restaurant').values_list(
+            'date', 'restaurant', 'rating', 'distinct_voted_users', 'votes_count'
+        )), tallies)
+
+    def test_not_send_vote_post_delete_signals_when_votes_compacted(self):
+        receiver = mock.Mock()
+        post_delete.connect(receiver, sender=RestaurantUserVote)
+        self.addCleanup(post_delete.disconnect, receiver, sender=RestaurantUserVote)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.compact(days=5)
+
+        receiver.assert_not_called()
+        self.assertListEqual(callbacks, [])
+
+    def test_keep_restaurant_totals_and_closed_day_cache_valid_when_votes_compacted(self):
+        params = {'date_after': '2020-01-02', 'date_before': '2020-01-04'}
+        with override_settings(RESTAURANTS_HISTORY_CLOSED_DAY_CACHE=True):
+            history = self.get_history(params)
+            self.compact(days=5)
+
+            self.assertListEqual(self.get_history(params), history)
+        self.assertDictEqual(Restaurant.objects.get_totals(), {
+            restaurant.pk: (restaurant.total_rating, restaurant.total_votes, restaurant.distinct_voters)
+            for restaurant in Restaurant.objects.all()
+        })
+
+    def test_add_votes_to_existing_rollups_when_compacted_day_has_new_votes(self):
+        self.compact(days=5)
+        with self.now(1):
+            RestaurantUserVote.objects.create(user=self.users[0], restaurant=self.restaurants[0], vote_weight=0.25)
+        self.compact(days=5)
+        rollup = RestaurantUserDailyVoteRollup.objects.get(
+            date=date(2020, 1, 1), user=self.users[0], restaurant=self.restaurants[0]
+        )
+
+        self.assertEqual((rollup.rating, rollup.votes_count), (1.75, 3))
+
+    def test_delete_vote_slots_older_than_horizon(self):
+        for day in (1, 9):
+            RestaurantUserDailyVoteCount.objects.get_vote_slot(self.restaurants[0], self.users[1], date(2020, 1, day))
+        self.compact(days=5)
+
+        self.assertQuerysetEqual(
+            RestaurantUserDailyVoteCount.objects.values_list('date', flat=True), [date(2020, 1, 9)]
+        )
+
+    @override_settings(RESTAURANTS_VOTE_ARCHIVE_DAYS=None)
+    def test_raise_command_error_when_archive_horizon_not_given(self):
+        with self.assertRaisesMessage(CommandError, 'Archive horizon should be at least 1 day'):
+            self.compact()
+
+
+class BenchmarkListSerializersShould(TestCase):
+    def test_report_rows_per_second_of_identical_serializers(self):
+        out = StringIO()
+        err = StringIO()
+        call_command('benchmark_list_serializers', rows=10, repeat=1, stdout=out, stderr=err)
+
+        self.assertEqual(out.getvalue().count('rows/s after'), 3)
+        self.assertEqual(err.getvalue(), '')
+
+
+class GenerateVoteDataShould(TestCase):
+    def test_generate_votes_respecting_user_daily_vote_count_and_weights(self):
+        call_command('generate_vote_data', users=20, restaurants=5, days=3, seed=1, stdout=StringIO())
+        users = {user.pk: user for user in User.objects.all()}
+        votes = {}
+        for vote in RestaurantUserVote.objects.order_by('created_datetime', 'pk'):
+            key = (vote.user_id, vote.restaurant_id, timezone.localdate(vote.created_datetime))
+            votes.setdefault(key, []).append(vote.vote_weight)
+
+        self.assertEqual((len(users), Restaurant.objects.count()), (20, 5))
+        self.assertTrue(votes)
+        for (user_id, _, _), weights in votes.items():
+            self.assertLessEqual(len(weights), users[user_id].daily_vote_count)
+            self.assertEqual(weights, [Restaurant.get_vote_weight(count) for count in range(len(weights))])
+
+    def test_save_generated_created_datetime_and_vote_date_of_votes_of_each_day(self):
+        call_command('generate_vote_data', users=20, restaurants=5, days=3, seed=1, stdout=StringIO())
+        votes = RestaurantUserVote.objects.all()
+
+        self.assertEqual(len({vote.vote_date for vote in votes}), 3)
+        for vote in votes:
+            self.assertEqual(vote.vote_date, get_voting_date(vote.created_datetime))
+        self.assertTrue(RestaurantUserVote._meta.get_field('created_datetime').auto_now_add)
+
+    def test_rebuild_restaurant_daily_tallies_of_generated_votes(self):
+        out = StringIO()
+        call_command('generate_vote_data', users=10, restaurants=3, days=2, seed=1, stdout=out)
+        call_command('rebuild_restaurant_daily_tallies', check=True, stdout=out)
+        call_command('rebuild_restaurant_totals', check=True, stdout=out)
+
+        self.assertIn('match', out.getvalue())
+
+    def test_delete_previously_generated_data_when_clear(self):
+        call_command('generate_vote_data', users=5, restaurants=2, days=1, seed=1, stdout=StringIO())
+        call_command('generate_vote_data', users=3, restaurants=1, days=1, clear=True, stdout=StringIO())
+
+        self.assertEqual((User.objects.count(), Restaurant.objects.count()), (3, 1))
+
+
+class BenchmarkEndpointsShould(TestCase):
+    def test_report_latency_and_queries_of_each_endpoint(self):
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command(
+                'benchmark_endpoints', scales=[(5, 2, 2)], requests=2, output=output, use_current_database=True,
+                stdout=out,
+            )
+            with open(output) as file:
+                results = json.load(file)
+
+        endpoints = results['scales'][0]['endpoints']
+        self.assertEqual(results['scales'][0]['scale'], '5x2x2')
+        self.assertEqual(set(endpoints), {name for name in Command.endpoints})
+        self.assertEqual(endpoints['restaurant_list']['statuses'], {'200': 2})
+        self.assertEqual(endpoints['restaurant_delete']['statuses'], {'204': 2})
+        self.assertGreater(endpoints['restaurant_list']['queries']['mean'], 0)
+        self.assertEqual(out.getvalue().count('p99'), len(Command.endpoints))
+
+    def test_delete_generated_data_when_use_current_database(self):
+        call_command(
+            'benchmark_endpoints', scales=[(3, 1, 1)], requests=1, use_current_database=True, stdout=StringIO(),
+        )
+
+        self.assertEqual((User.objects.count(), Restaurant.objects.count()), (0, 0))
+
+
+class LoadTestEndpointsShould(LiveServerTestCase):
+    def setUp(self):
+        User.objects.create_user(username='u', password='p', daily_vote_count=2)
+        Restaurant.objects.create(title='TestTitle', address='TestAddress')
+
+    def test_report_throughput_and_statuses_of_each_target_and_endpoint(self):
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command(
+                'load_test_endpoints', '--target', f'first={self.live_server_url}',
+                '--target', f'second={self.live_server_url}', username='u', password='p', requests=4, concurrency=2,
+                output=output, stdout=out,
+            )
+            with open(output) as file:
+                results = json.load(file)
+
+        self.assertEqual(results['targets']['first']['restaurant_list']['statuses'], {'200': 4})
+        self.assertEqual(
+            sum(target['restaurant_vote']['statuses'].get('201', 0) for target in results['targets'].values()), 2
+        )
+        self.assertIn('x of first', out.getvalue())
+
+    def test_raise_command_error_when_there_are_no_restaurants_to_vote_for(self):
+        Restaurant.objects.all().delete()
+
+        with self.assertRaisesMessage(CommandError, 'There are no restaurants to vote for'):
+            call_command('load_test_endpoints', '--target', f'first={self.live_server_url}', username='u', password='p')
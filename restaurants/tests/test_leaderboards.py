@@ -0,0 +1,103 @@
+from datetime import date
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, override_settings
+
+from restaurants.leaderboards import InMemorySortedSetClient, RestaurantLeaderboard, get_leaderboard, \
+    get_leaderboard_client
+
+
+class FakeRedisClient(InMemorySortedSetClient):
+    """Local fake of external store client, returning members and hash values as bytes like redis-py does"""
+
+    def zrevrange(self, name, start, end, withscores=False):
+        members = super(FakeRedisClient, self).zrevrange(name, start, end, withscores=True)
+
+        return [(member.encode(), score) if withscores else member.encode() for member, score in members]
+
+    def zrevrangebyscore(self, name, max, min, withscores=False):
+        members = super(FakeRedisClient, self).zrevrangebyscore(name, max, min, withscores=True)
+
+        return [(member.encode(), score) if withscores else member.encode() for member, score in members]
+
+    def hmget(self, name, keys):
+        return [
+            None if value is None else value.encode()
+            for value in super(FakeRedisClient, self).hmget(name, [key.decode() for key in keys])
+        ]
+
+
+class RestaurantLeaderboardShould(SimpleTestCase):
+    client_class = InMemorySortedSetClient
+
+    def setUp(self):
+        self.date = date(2020, 1, 1)
+        self.leaderboard = RestaurantLeaderboard(self.client_class())
+        self.leaderboard.build(self.date, [
+            SimpleNamespace(restaurant_id=1, rating=1.0, distinct_voted_users=1),
+            SimpleNamespace(restaurant_id=2, rating=2.0, distinct_voted_users=2),
+            SimpleNamespace(restaurant_id=3, rating=1.0, distinct_voted_users=2),
+            SimpleNamespace(restaurant_id=4, rating=0.25, distinct_voted_users=1),
+        ])
+
+    def test_return_entries_ranked_by_rating(self):
+        first_rank, entries = self.leaderboard.get_range(self.date, 0, 1)
+
+        self.assertEqual(first_rank, 0)
+        self.assertListEqual(entries, [(2, 2.0, 2)])
+
+    def test_extend_range_by_restaurants_with_boundary_ratings(self):
+        first_rank, entries = self.leaderboard.get_range(self.date, 2, 4)
+
+        self.assertEqual(first_rank, 1)
+        self.assertCountEqual(entries, [(1, 1.0, 1), (3, 1.0, 2), (4, 0.25, 1)])
+
+    def test_return_empty_range_when_start_is_greater_than_ranked_restaurants_count(self):
+        self.assertEqual(self.leaderboard.get_range(self.date, 10, 20), (10, []))
+
+    def test_add_votes_to_built_day(self):
+        self.leaderboard.add_votes(self.date, 4, 1.0, 1)
+        _, entries = self.leaderboard.get_range(self.date, 1, 2)
+
+        self.assertIn((4, 1.25, 2), entries)
+
+    def test_not_add_votes_to_not_built_day(self):
+        self.leaderboard.add_votes(date(2020, 1, 2), 1, 1.0, 1)
+
+        self.assertFalse(self.leaderboard.is_built(date(2020, 1, 2)))
+        self.assertEqual(self.leaderboard.count(date(2020, 1, 2)), 0)
+
+    def test_not_build_already_built_day(self):
+        self.leaderboard.build(self.date, [SimpleNamespace(restaurant_id=5, rating=5.0, distinct_voted_users=1)])
+
+        self.assertEqual(self.leaderboard.count(self.date), 4)
+
+    def test_remove_restaurant(self):
+        self.leaderboard.remove_restaurant(self.date, 2)
+
+        self.assertEqual(self.leaderboard.count(self.date), 3)
+        self.assertEqual(self.leaderboard.get_range(self.date, 0, 1)[1][0][0], 3)
+
+    def test_build_day_again_when_invalidated(self):
+        self.leaderboard.invalidate(self.date)
+
+        self.assertFalse(self.leaderboard.is_built(self.date))
+        self.assertEqual(self.leaderboard.count(self.date), 0)
+
+
+class RestaurantLeaderboardWithExternalClientShould(RestaurantLeaderboardShould):
+    client_class = FakeRedisClient
+
+
+class GetLeaderboardShould(SimpleTestCase):
+    def setUp(self):
+        get_leaderboard_client.cache_clear()
+
+    @override_settings(RESTAURANTS_LEADERBOARD_CLIENT=None)
+    def test_return_none_when_leaderboard_is_disabled(self):
+        self.assertIsNone(get_leaderboard())
+
+    @override_settings(RESTAURANTS_LEADERBOARD_CLIENT='restaurants.tests.test_leaderboards.FakeRedisClient')
+    def test_return_leaderboard_sharing_configured_client(self):
+        self.assertIsInstance(get_leaderboard().client, FakeRedisClient)
+        self.assertIs(get_leaderboard().client, get_leaderboard().client)
@@ -0,0 +1,166 @@
+import json
+from datetime import date
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from restaurants.live import RestaurantRatingBroadcaster, get_broadcaster
+from restaurants.models import Restaurant, RestaurantUserVote
+from users.models import User
+
+
+def get_event_data(message):
+    return json.loads(message.split('data: ', 1)[1])
+
+
+@mock.patch.object(RestaurantRatingBroadcaster, 'start_ticker')
+class RestaurantRatingBroadcasterShould(TestCase):
+    def setUp(self):
+        self.broadcaster = RestaurantRatingBroadcaster(interval=1)
+        self.user = User.objects.create_user(username='u', daily_vote_count=3)
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        self.restaurant2 = Restaurant.objects.create(title='TestTitle2', address='TestAddress')
+
+    def vote(self, restaurant, user=None, vote_weight=1):
+        RestaurantUserVote.objects.create(user=user or self.user, restaurant=restaurant, vote_weight=vote_weight)
+
+    def test_not_publish_current_ratings_on_first_tick(self, start_ticker):
+        self.vote(self.restaurant)
+        self.broadcaster.tick()
+
+        self.assertEqual(list(self.broadcaster.events), [])
+
+    def test_publish_coalesced_deltas_of_changed_restaurants_on_next_tick(self, start_ticker):
+        self.vote(self.restaurant)
+        self.broadcaster.tick()
+        self.vote(self.restaurant, vote_weight=0.5)
+        self.vote(self.restaurant, user=User.objects.create_user(username='u2'))
+        self.broadcaster.tick()
+
+        self.assertEqual(len(self.broadcaster.events), 1)
+        self.assertEqual(get_event_data(self.broadcaster.events[0][1])['restaurants'], [{
+            'restaurant_id': self.restaurant.pk, 'rating': 2.5, 'distinct_voted_users': 2,
+            'rating_delta': 1.5, 'distinct_voted_users_delta': 1,
+        }])
+
+    def test_not_publish_event_when_ratings_did_not_change(self, start_ticker):
+        self.vote(self.restaurant)
+        self.broadcaster.tick()
+        self.broadcaster.tick()
+
+        self.assertEqual(list(self.broadcaster.events), [])
+
+    def test_publish_new_day_ratings_as_deltas_from_zero(self, start_ticker):
+        self.broadcaster.tick()
+        self.broadcaster.date = date(2020, 1, 1)
+        self.vote(self.restaurant2)
+        self.broadcaster.tick()
+
+        self.assertEqual(get_event_data(self.broadcaster.events[0][1])['restaurants'][0]['rating_delta'], 1.0)
+
+    def test_read_changed_tallies_with_single_query_for_all_clients(self, start_ticker):
+        streams = [self.broadcaster.stream() for _ in range(10)]
+        for stream in streams:
+            next(stream)
+        self.broadcaster.tick()
+        self.vote(self.restaurant)
+        self.vote(self.restaurant2)
+
+        with self.assertNumQueries(1):
+            self.broadcaster.tick()
+
+    def test_stream_retry_interval_and_events_published_after_client_connected(self, start_ticker):
+        self.broadcaster.publish({'restaurants': [1]})
+        stream = self.broadcaster.stream()
+
+        self.assertEqual(next(stream), 'retry: 1000\n\n')
+        self.broadcaster.publish({'restaurants': [2]})
+        self.assertEqual(next(stream), 'id: 2\nevent: ratings\ndata: {"restaurants": [2]}\n\n')
+
+    def test_stream_events_after_last_event_id_when_client_reconnects(self, start_ticker):
+        for restaurants in ([1], [2], [3]):
+            self.broadcaster.publish({'restaurants': restaurants})
+        stream = self.broadcaster.stream(last_event_id=1)
+        next(stream)
+
+        self.assertEqual([get_event_data(message) for message in next(stream).split('\n\n')[:-1]], [
+            {'restaurants': [2]}, {'restaurants': [3]},
+        ])
+
+    def test_stream_heartbeat_comment_when_no_events_are_published(self, start_ticker):
+        self.broadcaster.heartbeat_interval = 0
+        stream = self.broadcaster.stream()
+        next(stream)
+
+        self.assertEqual(next(stream), ': heartbeat\n\n')
+
+    def test_start_ticker_once_and_count_connected_clients(self, start_ticker):
+        start_ticker.side_effect = lambda: setattr(self.broadcaster, 'ticker', mock.Mock())
+        streams = [self.broadcaster.stream() for _ in range(2)]
+        for stream in streams:
+            next(stream)
+
+        self.assertEqual((start_ticker.call_count, self.broadcaster.clients_count), (1, 2))
+        for stream in streams:
+            stream.close()
+        self.assertEqual(self.broadcaster.clients_count, 0)
+
+    @mock.patch('restaurants.live.connection')
+    def test_stop_ticker_when_no_clients_are_connected(self, connection, start_ticker):
+        self.broadcaster.interval = 0
+        self.broadcaster.ticker = mock.Mock()
+        with mock.patch.object(self.broadcaster, 'tick') as tick:
+            self.broadcaster.run_ticker()
+
+        self.assertEqual((tick.call_count, self.broadcaster.ticker), (1, None))
+        connection.close.assert_called_once_with()
+
+
+@mock.patch.object(RestaurantRatingBroadcaster, 'start_ticker')
+class LiveRestaurantsShould(TestCase):
+    def setUp(self):
+        get_broadcaster.cache_clear()
+        self.client = APIClient()
+        self.url = reverse('restaurant_live')
+
+    def test_return_http_403_when_user_is_anonymous(self, start_ticker):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(response.content.startswith(b'event: error\n'))
+
+    def test_stream_events_when_user_is_authenticated(self, start_ticker):
+        self.client.force_authenticate(User.objects.create_user(username='u'))
+        response = self.client.get(self.url, HTTP_ACCEPT='text/event-stream')
+        content = iter(response.streaming_content)
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream; charset=utf-8')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertEqual(next(content), b'retry: 1000\n\n')
+        response.close()
+
+    def test_resume_stream_after_last_event_id_header(self, start_ticker):
+        self.client.force_authenticate(User.objects.create_user(username='u'))
+        broadcaster = get_broadcaster(1)
+        broadcaster.publish({'restaurants': [1]})
+        broadcaster.publish({'restaurants': [2]})
+        response = self.client.get(self.url, HTTP_LAST_EVENT_ID='1')
+        content = iter(response.streaming_content)
+        next(content)
+
+        self.assertTrue(next(content).startswith(b'id: 2\n'))
+        response.close()
+
+    async def test_return_http_501_when_request_is_served_by_asgi_handler(self, start_ticker):
+        await sync_to_async(self.async_client.force_login)(
+            await sync_to_async(User.objects.create_user)(username='u')
+        )
+        response = await self.async_client.get(self.url)
+
+        self.assertEqual(response.status_code, 501)
+        self.assertIn(b'WSGI server only', response.content)
+        start_ticker.assert_not_called()
@@ -1,10 +1,14 @@
-from datetime import datetime
+from datetime import date, datetime
 from unittest import mock
 
-from django.test import TestCase
+from django.db import connection
+from django.db.models import OuterRef
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.utils.timezone import make_aware
 
-from restaurants.models import Restaurant, RestaurantUserVote
+from restaurants.models import Restaurant, RestaurantUserVote, RestaurantUserDailyVoteCount, RestaurantDailyTally
 from users.models import User
 
 
@@ -27,3 +31,164 @@ class CurrentDayRestaurantUserVoteManagerShould(TestCase):
         )
 
         self.assertQuerysetEqual(RestaurantUserVote.current_day_votes.all(), [restaurant_user_vote])
+
+
+class RestaurantUserDailyVoteCountManagerShould(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u', daily_vote_count=2)
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+
+    def test_return_current_day_vote_counts_in_order_when_admitting_votes(self):
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+        current_day_vote_counts = RestaurantUserDailyVoteCount.objects.admit_votes(
+            [(self.restaurant, self.user), (self.restaurant, self.user)], timezone.localdate()
+        )
+
+        self.assertListEqual(current_day_vote_counts, [1, None])
+        self.assertEqual(RestaurantUserDailyVoteCount.objects.get().votes_count, 2)
+
+    def admit_vote(self):
+        vote_slot = RestaurantUserDailyVoteCount.objects.get_vote_slot(self.restaurant, self.user, timezone.localdate())
+
+        return RestaurantUserDailyVoteCount.objects.admit_vote(vote_slot, self.user)
+
+    def test_return_none_when_admitting_vote_after_user_voted_maximum_times(self):
+        for _ in range(2):
+            self.admit_vote()
+
+        self.assertIsNone(self.admit_vote())
+
+    def test_return_vote_slot_with_precomputed_weight_when_admitting_votes(self):
+        vote_slots = [self.admit_vote() for _ in range(2)]
+
+        self.assertListEqual([vote_slot.votes_count for vote_slot in vote_slots], [0, 1])
+        self.assertListEqual(
+            [vote_slot.next_vote_weight for vote_slot in vote_slots],
+            [Restaurant.FIRST_VOTE_WEIGHT, Restaurant.SECOND_VOTE_WEIGHT],
+        )
+        self.assertEqual(RestaurantUserDailyVoteCount.objects.get().next_vote_weight, Restaurant.DEFAULT_VOTE_WEIGHT)
+
+    def test_read_single_vote_slot_row_when_getting_existing_vote_slot(self):
+        self.admit_vote()
+
+        with self.assertNumQueries(1):
+            vote_slot = RestaurantUserDailyVoteCount.objects.get_vote_slot(
+                self.restaurant, self.user, timezone.localdate()
+            )
+
+        self.assertEqual(vote_slot.next_vote_weight, Restaurant.SECOND_VOTE_WEIGHT)
+
+    def test_update_single_vote_slot_row_when_admitting_vote_of_read_vote_slot(self):
+        vote_slot = RestaurantUserDailyVoteCount.objects.get_vote_slot(self.restaurant, self.user, timezone.localdate())
+
+        with self.assertNumQueries(1):
+            RestaurantUserDailyVoteCount.objects.admit_vote(vote_slot, self.user)
+
+        self.assertEqual(RestaurantUserDailyVoteCount.objects.get().votes_count, 1)
+
+    def test_create_vote_slot_from_current_day_votes_when_vote_slot_is_missing(self):
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+        vote_slot = RestaurantUserDailyVoteCount.objects.get_vote_slot(self.restaurant, self.user, timezone.localdate())
+
+        self.assertEqual((vote_slot.votes_count, vote_slot.next_vote_weight), (1, Restaurant.SECOND_VOTE_WEIGHT))
+        self.assertEqual(RestaurantUserDailyVoteCount.objects.admit_vote(vote_slot, self.user).votes_count, 1)
+        self.assertIsNone(self.admit_vote())
+
+    def test_read_vote_slot_again_when_vote_slot_changed_after_reading(self):
+        stale_vote_slot = RestaurantUserDailyVoteCount.objects.get_vote_slot(
+            self.restaurant, self.user, timezone.localdate()
+        )
+        self.admit_vote()
+        vote_slot = RestaurantUserDailyVoteCount.objects.admit_vote(stale_vote_slot, self.user)
+
+        self.assertEqual(vote_slot.votes_count, 1)
+        self.assertEqual(vote_slot.next_vote_weight, Restaurant.SECOND_VOTE_WEIGHT)
+        self.assertEqual(RestaurantUserDailyVoteCount.objects.get().votes_count, 2)
+
+    @override_settings(RESTAURANTS_VOTE_WEIGHTS=[3, 2, 1, 0.5])
+    def test_use_configured_vote_weights_when_admitting_votes(self):
+        self.user.daily_vote_count = 5
+        self.user.save()
+        vote_slots = [self.admit_vote() for _ in range(5)]
+
+        self.assertListEqual([vote_slot.next_vote_weight for vote_slot in vote_slots], [3, 2, 1, 0.5, 0.5])
+
+
+class RestaurantDailyTallyManagerShould(TestCase):
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        self.restaurant2 = Restaurant.objects.create(title='TestTitle2', address='TestAddress')
+
+    def get_cumulative_ratings(self, restaurant):
+        return list(RestaurantDailyTally.objects.filter(restaurant=restaurant).order_by('date').values_list(
+            'date', 'cumulative_rating',
+        ))
+
+    def test_start_new_day_tally_from_cumulative_rating_of_previous_days(self):
+        RestaurantDailyTally.objects.add_votes(self.restaurant.pk, date(2020, 1, 1), 1.5, 2, 2)
+        RestaurantDailyTally.objects.add_votes(self.restaurant.pk, date(2020, 1, 1), 1, 1, 1)
+        RestaurantDailyTally.objects.add_votes(self.restaurant2.pk, date(2020, 1, 1), 4, 4, 4)
+        RestaurantDailyTally.objects.add_votes(self.restaurant.pk, date(2020, 1, 3), 0.5, 0, 1)
+
+        self.assertListEqual(self.get_cumulative_ratings(self.restaurant), [
+            (date(2020, 1, 1), 2.5), (date(2020, 1, 3), 3.0),
+        ])
+        self.assertListEqual(self.get_cumulative_ratings(self.restaurant2), [(date(2020, 1, 1), 4.0)])
+
+    def test_add_late_vote_of_previous_day_to_cumulative_rating_of_later_days(self):
+        RestaurantDailyTally.objects.add_votes(self.restaurant.pk, date(2020, 1, 1), 1, 1, 1)
+        RestaurantDailyTally.objects.add_votes(self.restaurant.pk, date(2020, 1, 2), 1, 1, 1)
+        RestaurantDailyTally.objects.add_votes(self.restaurant.pk, date(2020, 1, 1), 0.5, 0, 1)
+
+        self.assertListEqual(self.get_cumulative_ratings(self.restaurant), [
+            (date(2020, 1, 1), 1.5), (date(2020, 1, 2), 2.5),
+        ])
+        self.assertListEqual(
+            list(RestaurantDailyTally.objects.order_by('date').values_list('rating', 'votes_count')), [(1.5, 2), (1, 1)]
+        )
+
+    def test_add_votes_of_many_restaurants_to_day_tallies_and_cumulative_ratings_of_later_days(self):
+        RestaurantDailyTally.objects.add_votes(self.restaurant.pk, date(2020, 1, 1), 1, 1, 1)
+        RestaurantDailyTally.objects.add_votes(self.restaurant.pk, date(2020, 1, 3), 1, 1, 1)
+        RestaurantDailyTally.objects.add_votes(self.restaurant2.pk, date(2020, 1, 1), 4, 4, 4)
+        RestaurantDailyTally.objects.add_restaurants_votes(date(2020, 1, 2), {
+            self.restaurant.pk: {'rating': 1.5, 'new_voters_count': 2, 'votes_count': 2},
+            self.restaurant2.pk: {'rating': 0.5, 'new_voters_count': 1, 'votes_count': 1},
+        })
+
+        self.assertListEqual(self.get_cumulative_ratings(self.restaurant), [
+            (date(2020, 1, 1), 1.0), (date(2020, 1, 2), 2.5), (date(2020, 1, 3), 3.5),
+        ])
+        self.assertListEqual(self.get_cumulative_ratings(self.restaurant2), [
+            (date(2020, 1, 1), 4.0), (date(2020, 1, 2), 4.5),
+        ])
+        self.assertListEqual(
+            list(RestaurantDailyTally.objects.filter(date=date(2020, 1, 2)).order_by('restaurant').values_list(
+                'rating', 'distinct_voted_users', 'votes_count',
+            )),
+            [(1.5, 2, 2), (0.5, 1, 1)],
+        )
+
+    def test_update_day_tallies_of_many_restaurants_with_single_update(self):
+        RestaurantDailyTally.objects.add_votes(self.restaurant.pk, date(2020, 1, 1), 1, 1, 1)
+        with CaptureQueriesContext(connection) as queries:
+            RestaurantDailyTally.objects.add_restaurants_votes(date(2020, 1, 1), {
+                self.restaurant.pk: {'rating': 1, 'new_voters_count': 1, 'votes_count': 1},
+                self.restaurant2.pk: {'rating': 1, 'new_voters_count': 1, 'votes_count': 1},
+            })
+
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 1)
+
+    def test_return_cumulative_rating_before_date(self):
+        RestaurantDailyTally.objects.add_votes(self.restaurant.pk, date(2020, 1, 1), 1, 1, 1)
+        RestaurantDailyTally.objects.add_votes(self.restaurant.pk, date(2020, 1, 3), 2, 1, 1)
+        restaurants = Restaurant.objects.order_by('pk')
+
+        for before_date, ratings in [
+            (date(2020, 1, 1), [0.0, 0.0]), (date(2020, 1, 2), [1.0, 0.0]), (date(2020, 1, 4), [3.0, 0.0]),
+            (None, [3.0, 0.0]),
+        ]:
+            with self.subTest(before_date=before_date):
+                self.assertListEqual(list(restaurants.annotate(
+                    cumulative_rating=RestaurantDailyTally.objects.get_cumulative_rating(OuterRef('pk'), before_date),
+                ).values_list('cumulative_rating', flat=True)), ratings)
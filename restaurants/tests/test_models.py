@@ -1,15 +1,25 @@
-from datetime import datetime
-from unittest import mock
+from datetime import date, datetime, time, timedelta
+from unittest import mock, skipUnless
 
-from django.test import TestCase
+from django.db import connection
+from django.db.models import Sum
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import make_aware
 
-from restaurants.models import Restaurant, RestaurantUserVote
+from rest_framework.test import APIRequestFactory
+
+from common.utils import get_voting_date
+
+from restaurants.models import Restaurant, RestaurantUserVote, RestaurantDailyTally, RestaurantUserDailyVoteRollup
+from restaurants.views import ListRestaurants, ListRestaurantsHistory
 from users.models import User
 
 
 class RestaurantShould(TestCase):
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(username='u')
         self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
 
@@ -45,3 +55,260 @@ class RestaurantShould(TestCase):
         RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
 
         self.assertEqual(self.restaurant.get_user_next_vote_weight(self.user), self.restaurant.DEFAULT_VOTE_WEIGHT)
+
+    @override_settings(RESTAURANTS_VOTE_WEIGHTS=[2, 1.5, 1, 0.75, 0.5])
+    def test_return_configured_vote_weight_when_vote_weights_setting_given(self):
+        self.assertListEqual(
+            [Restaurant.get_vote_weight(count) for count in range(7)], [2, 1.5, 1, 0.75, 0.5, 0.5, 0.5]
+        )
+
+    @override_settings(RESTAURANTS_VOTE_WEIGHTS=None)
+    def test_return_default_vote_weights_when_vote_weights_setting_not_given(self):
+        self.assertEqual(Restaurant.get_vote_weights(), Restaurant.VOTE_WEIGHTS)
+
+
+class RestaurantUserVoteShould(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u')
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+
+    def test_create_restaurant_daily_tally_when_first_restaurant_vote_created_today(self):
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+        tally = RestaurantDailyTally.objects.get()
+
+        self.assertEqual(
+            (tally.restaurant, tally.rating, tally.distinct_voted_users, tally.votes_count), (self.restaurant, 1, 1, 1)
+        )
+
+    def test_add_vote_to_restaurant_daily_tally_when_same_user_votes_again(self):
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=0.5)
+        tally = RestaurantDailyTally.objects.get()
+
+        self.assertEqual((tally.rating, tally.distinct_voted_users, tally.votes_count), (1.5, 1, 2))
+
+    def test_add_distinct_voted_user_to_restaurant_daily_tally_when_other_user_votes(self):
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+        RestaurantUserVote.objects.create(
+            user=User.objects.create_user(username='u2'), restaurant=self.restaurant, vote_weight=1
+        )
+
+        self.assertEqual(RestaurantDailyTally.objects.get().distinct_voted_users, 2)
+
+    @mock.patch('django.utils.timezone.now')
+    def test_create_restaurant_daily_tally_for_each_day(self, mocked_timezone_now):
+        mocked_timezone_now.return_value = make_aware(datetime(2020, 1, 1))
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+        mocked_timezone_now.return_value = make_aware(datetime(2020, 1, 2))
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+
+        self.assertQuerysetEqual(
+            RestaurantDailyTally.objects.order_by('date').values_list('date', 'distinct_voted_users'),
+            [(datetime(2020, 1, 1).date(), 1), (datetime(2020, 1, 2).date(), 1)],
+            transform=tuple,
+        )
+
+    @override_settings(VOTING_DAY_TIME_ZONE='Europe/Minsk', VOTING_DAY_START=time(4))
+    @mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, 2, 0, 30)))
+    def test_save_vote_date_and_tally_of_voting_day_when_vote_created_before_voting_day_start(self, _):
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+
+        self.assertEqual(RestaurantUserVote.objects.get().vote_date, date(2020, 1, 1))
+        self.assertEqual(RestaurantDailyTally.objects.get().date, date(2020, 1, 1))
+
+    def test_save_vote_date_of_created_datetime_when_votes_bulk_created(self):
+        created_datetime = make_aware(datetime(2020, 1, 1, 12))
+        with mock.patch('django.utils.timezone.now', return_value=created_datetime):
+            RestaurantUserVote.objects.bulk_create([
+                RestaurantUserVote(user=self.user, restaurant=self.restaurant, vote_weight=1),
+            ])
+
+        self.assertEqual(RestaurantUserVote.objects.get().vote_date, date(2020, 1, 1))
+
+    def test_not_change_restaurant_daily_tally_when_existing_vote_saved(self):
+        restaurant_user_vote = RestaurantUserVote.objects.create(
+            user=self.user, restaurant=self.restaurant, vote_weight=1
+        )
+        restaurant_user_vote.save()
+
+        self.assertEqual(RestaurantDailyTally.objects.get().votes_count, 1)
+
+    def test_remove_deleted_votes_from_restaurant_daily_tallies_and_later_cumulative_ratings(self):
+        user2 = User.objects.create_user(username='u2')
+        for day, user, vote_weight in [(1, self.user, 1), (1, self.user, 0.5), (1, user2, 1), (2, self.user, 1)]:
+            with mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, day, 12))):
+                RestaurantUserVote.objects.create(user=user, restaurant=self.restaurant, vote_weight=vote_weight)
+        RestaurantUserDailyVoteRollup.objects.create(
+            user=user2, restaurant=self.restaurant, date=date(2020, 1, 2), rating=1, votes_count=1,
+        )
+        RestaurantDailyTally.objects.add_votes(self.restaurant.pk, date(2020, 1, 2), 1, 1, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantUserVote.objects.filter(user=self.user, vote_date=date(2020, 1, 1), vote_weight=0.5).delete()
+        self.assertListEqual(list(RestaurantDailyTally.objects.order_by('date').values_list(
+            'rating', 'distinct_voted_users', 'votes_count', 'cumulative_rating',
+        )), [(2.0, 2, 2, 2.0), (2.0, 2, 2, 4.0)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertListEqual(list(RestaurantDailyTally.objects.order_by('date').values_list(
+            'rating', 'distinct_voted_users', 'votes_count', 'cumulative_rating',
+        )), [(1.0, 1, 1, 1.0), (1.0, 1, 1, 2.0)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user2.delete()
+        self.assertListEqual(list(RestaurantDailyTally.objects.order_by('date').values_list(
+            'rating', 'distinct_voted_users', 'votes_count', 'cumulative_rating',
+        )), [(0.0, 0, 0, 0.0), (0.0, 0, 0, 0.0)])
+
+    def delete_user_votes(self, days_count):
+        """Returns queries count of deleting user with votes of given days and today, and callbacks of transaction"""
+        user = User.objects.create_user(username=f'voter{days_count}', daily_vote_count=3)
+        for day in range(1, days_count + 1):
+            with mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, day, 12))):
+                for _ in range(2):
+                    RestaurantUserVote.objects.create(user=user, restaurant=self.restaurant, vote_weight=1)
+        RestaurantUserVote.bulk_vote([(self.restaurant, user)])
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+
+        return len(queries)
+
+    def test_delete_many_votes_with_constant_queries_count(self):
+        self.assertEqual(self.delete_user_votes(2), self.delete_user_votes(20))
+        self.assertFalse(RestaurantDailyTally.objects.exclude(rating=0).exists())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class RestaurantUserVoteIndexesShould(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u')
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+
+    def test_be_used_by_current_day_user_votes_query(self):
+        query_plan = RestaurantUserVote.current_day_votes.filter(restaurant=self.restaurant, user=self.user).explain()
+
+        self.assertIn('vote_restaurant_user_date_idx', query_plan)
+
+    def test_be_used_by_restaurant_list_user_vote_count_today_annotation(self):
+        request = APIRequestFactory().get('/')
+        request.user = self.user
+        query_plan = ListRestaurants(request=request).get_queryset().explain()
+
+        self.assertIn('vote_restaurant_user_date_idx', query_plan)
+
+    def test_be_used_by_votes_aggregation_in_date_range(self):
+        query_plan = RestaurantUserVote.objects.filter(
+            vote_date__gte=get_voting_date() - timedelta(days=7), vote_date__lte=get_voting_date()
+        ).values('restaurant_id').annotate(rating=Sum('vote_weight')).explain()
+
+        self.assertIn('vote_date_restaurant_idx', query_plan)
+
+
+class RestaurantTotalsShould(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u', daily_vote_count=3)
+        self.user2 = User.objects.create_user(username='u2', daily_vote_count=3)
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+
+    def get_totals(self, restaurant=None):
+        restaurant = Restaurant.objects.get(pk=(restaurant or self.restaurant).pk)
+
+        return restaurant.total_rating, restaurant.total_votes, restaurant.distinct_voters
+
+    def vote(self, day, user, restaurant=None):
+        with mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, day, 12))):
+            RestaurantUserVote.objects.create(user=user, restaurant=restaurant or self.restaurant, vote_weight=1)
+
+    def test_add_votes_to_restaurant_totals_counting_each_voter_once(self):
+        self.vote(1, self.user)
+        self.vote(1, self.user)
+        self.vote(2, self.user)
+        self.vote(2, self.user2)
+
+        self.assertEqual(self.get_totals(), (4.0, 4, 2))
+
+    def test_update_restaurant_row_only_by_last_query_of_vote_when_day_tally_exists(self):
+        self.vote(1, self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.vote(1, self.user2)
+        restaurant_queries = [
+            index for index, query in enumerate(queries)
+            if 'FROM "restaurants_restaurant" ' in query['sql'] or 'UPDATE "restaurants_restaurant" ' in query['sql']
+        ]
+
+        # Last query releases savepoint of vote transaction
+        self.assertListEqual(restaurant_queries, [len(queries) - 2])
+        self.assertTrue(queries[len(queries) - 2]['sql'].startswith('UPDATE "restaurants_restaurant" '))
+
+    def test_not_count_voter_of_compacted_votes_again(self):
+        RestaurantUserDailyVoteRollup.objects.create(
+            user=self.user, restaurant=self.restaurant, date=date(2020, 1, 1), rating=1, votes_count=1,
+        )
+        self.vote(2, self.user)
+
+        self.assertEqual(self.get_totals()[2], 0)
+
+    def test_add_bulk_votes_to_restaurant_totals(self):
+        restaurant2 = Restaurant.objects.create(title='TestTitle2', address='TestAddress')
+        self.vote(1, self.user)
+        with mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, 2, 12))):
+            RestaurantUserVote.bulk_vote([
+                (self.restaurant, self.user), (self.restaurant, self.user2), (self.restaurant, self.user2),
+                (restaurant2, self.user),
+            ])
+
+        self.assertEqual(self.get_totals(), (3.5, 4, 2))
+        self.assertEqual(self.get_totals(restaurant2), (1.0, 1, 1))
+
+    def test_count_restaurant_totals_of_period_from_votes_and_rollups(self):
+        self.vote(1, self.user)
+        self.vote(2, self.user)
+        self.vote(3, self.user2)
+        RestaurantUserDailyVoteRollup.objects.create(
+            user=self.user2, restaurant=self.restaurant, date=date(2020, 1, 2), rating=1.5, votes_count=2,
+        )
+
+        self.assertDictEqual(Restaurant.objects.get_totals(date_after=date(2020, 1, 2), date_before=date(2020, 1, 3)), {
+            self.restaurant.pk: (2.5, 3, 2),
+        })
+
+    def test_count_restaurant_totals_again_when_votes_deleted(self):
+        self.vote(1, self.user)
+        self.vote(1, self.user2)
+        self.vote(2, self.user2)
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantUserVote.objects.filter(user=self.user2, vote_date=date(2020, 1, 1)).delete()
+        self.assertEqual(self.get_totals(), (2.0, 2, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user2.delete()
+        self.assertEqual(self.get_totals(), (1.0, 1, 1))
+
+    def test_count_restaurant_totals_once_when_many_votes_deleted(self):
+        restaurant2 = Restaurant.objects.create(title='TestTitle2', address='TestAddress')
+        for day in range(1, 6):
+            self.vote(day, self.user)
+            self.vote(day, self.user, restaurant2)
+        self.vote(1, self.user2)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.delete()
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(self.get_totals(), (1.0, 1, 1))
+        self.assertEqual(self.get_totals(restaurant2), (0.0, 0, 0))
+        self.assertLessEqual(len([
+            query for query in queries if 'UPDATE "restaurants_restaurant" ' in query['sql']
+        ]), 1)
+
+    def test_be_ordered_by_restaurant_totals_index_in_history_of_all_time(self):
+        request = APIRequestFactory().get('/')
+        request.user = self.user
+        view = ListRestaurantsHistory(request=request, format_kwarg=None)
+        view.request = view.initialize_request(request)
+        query_plan = view.filter_queryset(view.get_queryset()).explain()
+
+        self.assertIn('restaurant_totals_order_idx', query_plan)
+        self.assertNotIn('TEMP B-TREE', query_plan)
@@ -0,0 +1,104 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from common.testing import QueryBudgetMixin, query_budget
+from restaurants.generators import VoteDataGenerator
+from restaurants.models import Restaurant
+from users.models import User
+
+
+class EndpointQueryBudgetsShould(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='u', daily_vote_count=2)
+        self.client.force_authenticate(self.user)
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+
+    @staticmethod
+    def populate(rows_count):
+        """Creates rows_count users and restaurants with their votes of last two days"""
+        VoteDataGenerator(rows_count, rows_count, 2, seed=rows_count).generate()
+        call_command('rebuild_restaurant_daily_tallies', stdout=StringIO())
+
+    def request(self, method, url, data=None, status_code=200):
+        def send_request():
+            response = getattr(self.client, method)(url, data, format='json')
+            self.assertEqual(response.status_code, status_code)
+
+        return send_request
+
+    def test_list_restaurants_within_constant_query_budget(self):
+        self.assertConstantQueries(self.populate, self.request('get', reverse('restaurant_list')), budget=4)
+
+    def test_list_restaurants_history_within_constant_query_budget(self):
+        self.assertConstantQueries(self.populate, self.request('get', reverse('restaurant_history')), budget=5)
+
+    def test_list_restaurants_approximate_history_within_constant_query_budget(self):
+        send_request = self.request('get', reverse('restaurant_history'), {'approx': '1'})
+
+        def populate(rows_count):
+            """Voter sketches of closed days are built by first request"""
+            self.populate(rows_count)
+            send_request()
+
+        self.assertConstantQueries(populate, send_request, budget=8)
+
+    def test_list_restaurant_winners_history_within_constant_query_budget(self):
+        self.assertConstantQueries(
+            self.populate, self.request('get', reverse('restaurant_winners_history')), budget=4,
+        )
+
+    def test_vote_restaurant_within_constant_query_budget(self):
+        self.assertConstantQueries(self.populate, self.request(
+            'post', reverse('restaurant_vote', kwargs={'pk': self.restaurant.pk}), status_code=201,
+        ), budget=20)
+
+    def test_bulk_vote_restaurants_within_constant_query_budget_of_votes_count(self):
+        """
+        Votes are given for one restaurant per five votes, so tallies and totals of growing number of restaurants
+        are updated. SQLite splits bulk queries of more than 999 parameters in batches, so up to 100 votes are given.
+        """
+        votes = []
+
+        def populate(rows_count):
+            User.objects.bulk_create([User(username=f'bulk{i}') for i in range(rows_count)])
+            Restaurant.objects.bulk_create([
+                Restaurant(title=f'Bulk{i}', address='BulkAddress') for i in range(rows_count // 5)
+            ])
+            restaurant_ids = list(Restaurant.objects.filter(address='BulkAddress').values_list('pk', flat=True))
+            votes[:] = [
+                {'user': user_id, 'restaurant': restaurant_ids[i % len(restaurant_ids)]}
+                for i, user_id in enumerate(
+                    User.objects.filter(username__startswith='bulk').values_list('pk', flat=True)
+                )
+            ]
+
+        def send_request():
+            response = self.client.post(reverse('restaurant_bulk_vote'), {'votes': votes}, format='json')
+            self.assertTrue(all(result['voted'] for result in response.data['results']))
+
+        self.user.is_staff = True
+        self.user.save()
+        self.assertConstantQueries(populate, send_request, budget=17, row_counts=(10, 50, 100))
+
+    def test_create_restaurant_within_constant_query_budget(self):
+        self.assertConstantQueries(self.populate, self.request(
+            'post', reverse('restaurant_create'), {'title': 'NewTitle', 'address': 'NewAddress'}, status_code=201,
+        ), budget=2)
+
+    @query_budget(3)
+    def test_update_restaurant_within_query_budget(self):
+        self.request(
+            'put', reverse('restaurant_update', kwargs={'pk': self.restaurant.pk}),
+            {'title': 'NewTitle', 'address': 'NewAddress'},
+        )()
+
+    def test_delete_restaurant_within_constant_query_budget(self):
+        self.assertConstantQueries(self.populate, self.request(
+            'delete', reverse('restaurant_delete', kwargs={'pk': self.restaurant.pk}), status_code=204,
+        ), budget=8)
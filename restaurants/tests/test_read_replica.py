@@ -0,0 +1,100 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.connection import ConnectionDoesNotExist
+
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from common.routers import read_database
+from restaurants.models import Restaurant
+from users.models import User
+
+
+@override_settings(READ_REPLICA_DATABASE='missing-replica')
+class ReadReplicaViewsShould(TestCase):
+    """Read replica alias isn't configured, so reads routed to it fail"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='u')
+        self.client.force_authenticate(self.user)
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+
+    def test_read_restaurant_list_from_read_replica_when_user_did_not_write(self):
+        for url_name in ['restaurant_list', 'restaurant_history', 'restaurant_winners_history']:
+            with self.subTest(url_name=url_name), self.assertRaises(ConnectionDoesNotExist):
+                self.client.get(reverse(url_name))
+
+        self.assertIsNone(read_database.get())
+
+    def test_read_restaurant_list_from_primary_when_user_voted_recently(self):
+        self.client.post(reverse('restaurant_vote', kwargs={'pk': self.restaurant.pk}), {})
+        response = self.client.get(reverse('restaurant_list'))
+
+        self.assertEqual(response.data['results'][0]['rating'], 1)
+        self.assertIsNone(read_database.get())
+
+    def test_read_restaurant_list_from_primary_when_user_created_restaurant_recently(self):
+        self.client.post(reverse('restaurant_create'), {'title': 'NewTitle', 'address': 'NewAddress'})
+        response = self.client.get(reverse('restaurant_list'))
+
+        self.assertEqual(response.data['count'], 2)
+
+    def test_read_restaurant_list_from_read_replica_when_user_vote_failed(self):
+        self.client.post(reverse('restaurant_vote', kwargs={'pk': self.restaurant.pk + 1}), {})
+
+        with self.assertRaises(ConnectionDoesNotExist):
+            self.client.get(reverse('restaurant_list'))
+
+
+@skipUnless('replica' in settings.DATABASES, 'Database with "replica" alias is not configured')
+@override_settings(READ_REPLICA_DATABASE='replica')
+class ReadReplicaDatabaseShould(TransactionTestCase):
+    """
+    Runs with 'replica' alias configured as test mirror of default database (see settings/test.py), which sees
+    committed rows only (hence TransactionTestCase), so routing is checked by queries run on each connection.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.voter = User.objects.create_user(username='voter')
+        self.viewer = User.objects.create_user(username='viewer')
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+
+    def get_database_queries_count(self, user, url_name='restaurant_list'):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connections['default']) as default_queries, \
+                CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.get(reverse(url_name))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {'default': len(default_queries), 'replica': len(replica_queries)}
+
+    def test_read_restaurant_list_and_history_from_replica(self):
+        for url_name in ['restaurant_list', 'restaurant_history', 'restaurant_winners_history']:
+            with self.subTest(url_name=url_name):
+                queries_count = self.get_database_queries_count(self.viewer, url_name)
+
+                self.assertGreater(queries_count['replica'], 0)
+                self.assertEqual(queries_count['default'], 0)
+
+    def test_read_from_primary_when_user_voted_recently(self):
+        self.client.force_authenticate(self.voter)
+        self.client.post(reverse('restaurant_vote', kwargs={'pk': self.restaurant.pk}), {})
+
+        voter_queries_count = self.get_database_queries_count(self.voter)
+        viewer_queries_count = self.get_database_queries_count(self.viewer)
+
+        self.assertEqual(voter_queries_count['replica'], 0)
+        self.assertGreater(voter_queries_count['default'], 0)
+        self.assertGreater(viewer_queries_count['replica'], 0)
+        self.assertEqual(viewer_queries_count['default'], 0)
@@ -1,12 +1,18 @@
+from datetime import date
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import set_script_prefix
 from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 from rest_framework.reverse import reverse
 from rest_framework.test import APIRequestFactory
 
-from restaurants.models import Restaurant, RestaurantUserVote
-from restaurants.serializers import RestaurantsListSerializer, RestaurantUserVoteSerializer
+from common.utils import get_voting_date
+from restaurants.models import Restaurant, RestaurantUserVote, RestaurantDailyTally, RestaurantUserDailyVoteCount
+from restaurants.serializers import RestaurantsListSerializer, RestaurantUserVoteSerializer, \
+    RestaurantListBaseSerializer, RestaurantWinnersHistory
 from users.models import User
 
 
@@ -17,9 +23,57 @@ class RestaurantsListSerializerShould(TestCase):
 
         self.assertURLEqual(serializer.data.get('vote_url'), reverse('restaurant_vote', kwargs={'pk': restaurant.pk}))
 
+    def test_return_annotated_restaurant_fields(self):
+        restaurant = Restaurant(pk=12, title='TestTitle', address='TestAddress')
+        restaurant.distinct_voted_users = 2
+        restaurant.rating = 1.5
+        restaurant.user_vote_count_today = 1
+        restaurant.can_user_vote_today = True
+
+        self.assertDictEqual(RestaurantsListSerializer(restaurant).data, {
+            'title': 'TestTitle', 'address': 'TestAddress', 'distinct_voted_users': 2, 'rating': 1.5,
+            'user_vote_count_today': 1, 'can_user_vote_today': True, 'vote_url': '/restaurant/12/vote/',
+        })
+
+    def test_leave_out_missing_annotations(self):
+        restaurant = Restaurant(title='TestTitle', address='TestAddress')
+
+        self.assertDictEqual(RestaurantListBaseSerializer(restaurant).data, {
+            'title': 'TestTitle', 'address': 'TestAddress'
+        })
+
+    def test_raise_attribute_error_of_not_optional_field(self):
+        tally = RestaurantDailyTally(date=date(2020, 1, 1), rating=2.5, distinct_voted_users=2)
+
+        with self.assertRaises(RestaurantDailyTally.restaurant.RelatedObjectDoesNotExist):
+            RestaurantWinnersHistory(tally).data
+
+    def test_return_vote_url_with_current_script_prefix(self):
+        restaurant = Restaurant(pk=12, title='TestTitle', address='TestAddress')
+        RestaurantsListSerializer(restaurant).data
+        set_script_prefix('/prefix/')
+        try:
+            self.assertEqual(RestaurantsListSerializer(restaurant).data['vote_url'], '/prefix/restaurant/12/vote/')
+        finally:
+            set_script_prefix('/')
+
+
+class RestaurantWinnersHistoryShould(TestCase):
+    def test_return_tally_and_restaurant_fields(self):
+        restaurant = Restaurant(pk=3, title='TestTitle', address='TestAddress')
+        tally = RestaurantDailyTally(
+            restaurant=restaurant, date=date(2020, 1, 1), rating=2.5, distinct_voted_users=2, votes_count=3
+        )
+
+        self.assertListEqual(RestaurantWinnersHistory([tally], many=True).data, [{
+            'date': date(2020, 1, 1), 'restaurant_id': 3, 'title': 'TestTitle', 'address': 'TestAddress',
+            'rating': 2.5, 'total_distinct_users_voted': 2,
+        }])
+
 
 class RestaurantUserVoteSerializerShould(TestCase):
     def setUp(self):
+        cache.clear()
         self.error_message = _('You already voted maximum times allowed for this restaurant today')
         self.user = User.objects.create_user(username='u', daily_vote_count=1)
         self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
@@ -27,8 +81,9 @@ class RestaurantUserVoteSerializerShould(TestCase):
         self.request.user = self.user
 
     def test_raise_validation_error_when_current_day_user_vote_count_is_greater_than_user_daily_vote_count(self):
-        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
-        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+        RestaurantUserDailyVoteCount.objects.create(
+            user=self.user, restaurant=self.restaurant, date=get_voting_date(), votes_count=2, next_vote_weight=0.25,
+        )
 
         with self.assertRaisesMessage(serializers.ValidationError, self.error_message):
             serializer = RestaurantUserVoteSerializer(
@@ -37,7 +92,7 @@ class RestaurantUserVoteSerializerShould(TestCase):
             serializer.is_valid(raise_exception=True)
 
     def test_raise_validation_error_when_current_day_user_vote_count_is_equal_to_user_daily_vote_count(self):
-        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+        RestaurantUserVote.bulk_vote([(self.restaurant, self.user)])
 
         with self.assertRaisesMessage(serializers.ValidationError, self.error_message):
             serializer = RestaurantUserVoteSerializer(
@@ -50,3 +105,13 @@ class RestaurantUserVoteSerializerShould(TestCase):
             data={}, context={'restaurant': self.restaurant, 'request': self.request}
         )
         self.assertTrue(serializer.is_valid())
+
+    def test_read_single_vote_slot_row_when_validating_vote(self):
+        RestaurantUserDailyVoteCount.objects.get_vote_slot(self.restaurant, self.user, get_voting_date())
+        serializer = RestaurantUserVoteSerializer(
+            data={}, context={'restaurant': self.restaurant, 'request': self.request}
+        )
+
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.vote_slot.next_vote_weight, Restaurant.FIRST_VOTE_WEIGHT)
@@ -0,0 +1,69 @@
+from django.test import SimpleTestCase
+
+from restaurants.sketches import HyperLogLog
+
+
+class HyperLogLogShould(SimpleTestCase):
+    def get_sketch(self, values, precision=None):
+        sketch = HyperLogLog(precision=precision)
+        sketch.update(values)
+
+        return sketch
+
+    def assertWithinErrorBound(self, estimate, count, precision=None):
+        """Estimates are checked against three standard errors, which hold for 99.7% of estimates"""
+        self.assertLessEqual(abs(estimate - count), 3 * HyperLogLog.get_standard_error(precision) * count)
+
+    def test_estimate_distinct_values_count_within_error_bound(self):
+        for count in [1, 10, 100, 1000, 10000, 100000]:
+            with self.subTest(count=count):
+                self.assertWithinErrorBound(self.get_sketch(range(count)).count(), count)
+
+    def test_estimate_distinct_values_count_within_error_bound_of_lower_precision(self):
+        for count in [100, 1000, 10000]:
+            with self.subTest(count=count):
+                self.assertWithinErrorBound(self.get_sketch(range(count), precision=8).count(), count, precision=8)
+
+    def test_count_small_counts_exactly(self):
+        self.assertEqual(self.get_sketch(range(50)).count(), 50)
+
+    def test_not_count_repeated_values(self):
+        self.assertEqual(self.get_sketch([1, 2, 3] * 100).count(), 3)
+
+    def test_return_zero_when_sketch_is_empty(self):
+        self.assertEqual(HyperLogLog().count(), 0)
+
+    def test_estimate_union_count_within_error_bound_when_merging_sketches(self):
+        sketch = self.get_sketch(range(0, 6000))
+        sketch.merge(self.get_sketch(range(4000, 10000)))
+
+        self.assertWithinErrorBound(sketch.count(), 10000)
+        self.assertEqual(sketch.registers, self.get_sketch(range(10000)).registers)
+
+    def test_merge_serialized_sketches_like_sketches(self):
+        for values in [range(10), range(10000)]:
+            with self.subTest(values=values):
+                sketch = self.get_sketch(range(5, 500))
+                merged_sketch = self.get_sketch(range(5, 500))
+                sketch.merge_bytes(self.get_sketch(values).to_bytes())
+                merged_sketch.merge(self.get_sketch(values))
+
+                self.assertEqual(sketch.registers, merged_sketch.registers)
+
+    def test_serialize_sketch_with_few_voters_sparsely(self):
+        data = self.get_sketch(range(10)).to_bytes()
+
+        self.assertEqual(len(data), 2 + 10 * 3)
+        self.assertEqual(HyperLogLog.from_bytes(data).registers, self.get_sketch(range(10)).registers)
+
+    def test_serialize_sketch_with_many_values_densely(self):
+        data = self.get_sketch(range(10000)).to_bytes()
+
+        self.assertEqual(len(data), 2 + 2 ** HyperLogLog.default_precision)
+        self.assertEqual(HyperLogLog.from_bytes(data).registers, self.get_sketch(range(10000)).registers)
+
+    def test_raise_value_error_when_merging_sketches_of_different_precision(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog().merge(HyperLogLog(precision=10))
+        with self.assertRaises(ValueError):
+            HyperLogLog().merge_bytes(HyperLogLog(precision=10).to_bytes())
@@ -1,14 +1,28 @@
+import json
+import time
+from base64 import urlsafe_b64encode
 from datetime import datetime
+from io import StringIO
+from threading import Barrier, Thread
 from unittest import mock
 
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
 from django.db.models import Q
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.utils.timezone import make_aware
 
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient, APIRequestFactory
 
-from restaurants.models import Restaurant, RestaurantUserVote
+from common.pagination import KeysetPagination
+from common.utils import get_voting_date
+from restaurants.leaderboards import get_leaderboard, get_leaderboard_client
+from restaurants.models import Restaurant, RestaurantUserVote, RestaurantDailyTally, RestaurantDailyVoterSketch
+from restaurants.sketches import HyperLogLog
 from restaurants.views import ListRestaurantsBase, ListRestaurantsHistory
 from users.models import User
 
@@ -317,14 +331,14 @@ class ListRestaurantsHistoryGetRestaurantUserVoteFilterShould(TestCase):
         self.list_restaurants_history_class = ListRestaurantsHistory(request=self.request)
         vote_filter = self.list_restaurants_history_class.get_restaurant_user_vote_filter()
 
-        self.assertEqual(vote_filter, Q() & Q(restaurantuservote__created_datetime__gt=datetime(2020, 1, 1).date()))
+        self.assertEqual(vote_filter, Q() & Q(restaurantuservote__vote_date__gte=datetime(2020, 1, 1).date()))
 
     def test_return_Q_object_with_date_before_filter_when_request_has_date_before_query_param(self):
         self.request.query_params = {'date_before': datetime(2020, 1, 1).date()}
         self.list_restaurants_history_class = ListRestaurantsHistory(request=self.request)
         vote_filter = self.list_restaurants_history_class.get_restaurant_user_vote_filter()
 
-        self.assertEqual(vote_filter, Q() & Q(restaurantuservote__created_datetime__lte=datetime(2020, 1, 1).date()))
+        self.assertEqual(vote_filter, Q() & Q(restaurantuservote__vote_date__lt=datetime(2020, 1, 1).date()))
 
     def test_return_Q_object_with_date_before_and_date_after_filters_when_request_has_both_query_params(self):
         self.request.query_params = {
@@ -335,13 +349,113 @@ class ListRestaurantsHistoryGetRestaurantUserVoteFilterShould(TestCase):
 
         expected_filter = (
             Q()
-            & Q(restaurantuservote__created_datetime__gt=datetime(2020, 1, 1).date())
-            & Q(restaurantuservote__created_datetime__lte=datetime(2020, 2, 1).date())
+            & Q(restaurantuservote__vote_date__gte=datetime(2020, 1, 1).date())
+            & Q(restaurantuservote__vote_date__lt=datetime(2020, 2, 1).date())
 
         )
         self.assertEqual(vote_filter, expected_filter)
 
 
+@override_settings(RESTAURANTS_LEADERBOARD_CLIENT='restaurants.leaderboards.InMemorySortedSetClient')
+class ListRestaurantsWithLeaderboardShould(ListRestaurantsShould):
+    def setUp(self):
+        super(ListRestaurantsWithLeaderboardShould, self).setUp()
+        get_leaderboard_client.cache_clear()
+
+    def create_votes(self, restaurant, weights):
+        for i, vote_weight in enumerate(weights):
+            user, _ = User.objects.get_or_create(username=f'voter{i}')
+            RestaurantUserVote.objects.create(user=user, restaurant=restaurant, vote_weight=vote_weight)
+
+    def get_titles(self, page_size):
+        self.client.force_authenticate(User.objects.get_or_create(username='viewer')[0])
+        titles = []
+        page = 1
+        with mock.patch('rest_framework.pagination.PageNumberPagination.page_size', page_size):
+            while page:
+                response = self.client.get(self.url, {'page': page})
+                titles.extend(result.get('title') for result in response.data.get('results'))
+                page = page + 1 if response.data.get('next') else None
+
+        return titles
+
+    def test_return_the_same_restaurant_order_as_database_ranking_on_every_page(self):
+        self.create_votes(self.restaurant, [1])
+        for title, weights in [('B', [1]), ('A', [1]), ('C', [0.5, 0.5]), ('D', [1, 1]), ('E', []), ('F', [0.25])]:
+            self.create_votes(Restaurant.objects.create(title=title, address='TestAddress'), weights)
+        titles = self.get_titles(page_size=2)
+
+        with override_settings(RESTAURANTS_LEADERBOARD_CLIENT=None):
+            self.assertListEqual(titles, self.get_titles(page_size=2))
+        self.assertListEqual(titles, ['D', 'C', 'A', 'B', 'TestTitle', 'F', 'E'])
+
+    def test_add_committed_votes_to_built_leaderboard(self):
+        self.client.force_authenticate(User.objects.create_user(username='viewer'))
+        self.client.get(self.url)
+        restaurant = Restaurant.objects.create(title='A', address='TestAddress')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_votes(restaurant, [1, 0.5])
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data.get('results')[0].get('title'), 'A')
+        self.assertEqual(response.data.get('results')[0].get('rating'), 1.5)
+        self.assertEqual(response.data.get('results')[0].get('distinct_voted_users'), 2)
+
+    def test_not_return_deleted_restaurant(self):
+        self.client.force_authenticate(User.objects.create_user(username='viewer'))
+        self.create_votes(self.restaurant, [1])
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('restaurant_delete', kwargs={'pk': self.restaurant.pk}))
+        response = self.client.get(self.url)
+
+        self.assertListEqual(response.data.get('results'), [])
+
+    def test_remove_restaurant_deleted_without_view_from_leaderboard(self):
+        self.create_votes(self.restaurant, [1])
+        self.get_titles(page_size=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurant.delete()
+
+        self.assertEqual(get_leaderboard().count(get_voting_date()), 0)
+
+    def test_keep_restaurant_in_leaderboard_when_restaurant_delete_is_rolled_back(self):
+        self.create_votes(self.restaurant, [1])
+        self.get_titles(page_size=2)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                self.restaurant.delete()
+                raise DatabaseError
+
+        self.assertListEqual(callbacks, [])
+        self.assertListEqual(self.get_titles(page_size=2), ['TestTitle'])
+
+    def test_return_ratings_without_deleted_votes(self):
+        self.create_votes(self.restaurant, [1, 0.5])
+        self.get_titles(page_size=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantUserVote.objects.filter(vote_weight=1).delete()
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data.get('results')[0].get('rating'), 0.5)
+        self.assertEqual(response.data.get('results')[0].get('distinct_voted_users'), 1)
+
+    def test_not_execute_more_queries_when_restaurants_count_grows(self):
+        self.client.force_authenticate(User.objects.create_user(username='viewer'))
+        queries_counts = []
+        for restaurants_count in (5, 50):
+            for i in range(restaurants_count):
+                self.create_votes(Restaurant.objects.create(title=f'{restaurants_count}-{i}', address='a'), [1])
+            get_leaderboard_client.cache_clear()
+            self.client.get(self.url, {'page': 1})
+            with CaptureQueriesContext(connection) as queries:
+                with mock.patch('rest_framework.pagination.PageNumberPagination.page_size', 3):
+                    self.client.get(self.url)
+            queries_counts.append(len(queries))
+
+        self.assertEqual(queries_counts[0], queries_counts[1])
+
+
 class ListRestaurantsHistoryShould(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -405,6 +519,172 @@ class ListRestaurantsHistoryShould(TestCase):
         self.assertEqual(response.data.get('results')[0].get('rating'), 0.5)
 
 
+@override_settings(RESTAURANTS_HISTORY_CLOSED_DAY_CACHE=True)
+class ListRestaurantsHistoryWithClosedDayCacheShould(ListRestaurantsHistoryShould):
+    def setUp(self):
+        super(ListRestaurantsHistoryWithClosedDayCacheShould, self).setUp()
+        cache.clear()
+
+    def create_votes(self, days, restaurant=None):
+        users = [User.objects.get_or_create(username=f'voter{i}')[0] for i in range(2)]
+        with mock.patch('django.utils.timezone.now') as mocked_timezone_now:
+            for day in days:
+                mocked_timezone_now.return_value = make_aware(datetime(2020, 1, day, 12))
+                for user, vote_weight in zip(users, (1, 0.5)):
+                    RestaurantUserVote.objects.create(
+                        user=user, restaurant=restaurant or self.restaurant, vote_weight=vote_weight
+                    )
+
+    def get_history(self, params=None):
+        self.client.force_authenticate(User.objects.get_or_create(username='viewer')[0])
+        with mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, 10, 12))):
+            response = self.client.get(self.url, params or {})
+
+        return [
+            (result['title'], result['rating'], result['distinct_voted_users']) for result in response.data['results']
+        ]
+
+    def test_return_the_same_history_as_aggregated_by_database(self):
+        restaurant = Restaurant.objects.create(title='TestTitle2', address='TestAddress')
+        self.create_votes([1, 2, 3, 10])
+        self.create_votes([2, 4, 5, 6, 7, 9], restaurant)
+        Restaurant.objects.create(title='TestTitle3', address='TestAddress')
+        for params in [{}, {'date_after': '2020-01-02'}, {'date_before': '2020-01-05'},
+                       {'date_after': '2020-01-03', 'date_before': '2020-01-07'}, {'date_after': '2020-01-09'},
+                       {'restaurants': restaurant.pk}]:
+            with self.subTest(params=params):
+                history = self.get_history(params)
+                with override_settings(RESTAURANTS_HISTORY_CLOSED_DAY_CACHE=False):
+                    self.assertListEqual(history, self.get_history(params))
+
+    def test_read_closed_days_from_cache(self):
+        self.create_votes([1, 2, 10])
+        self.get_history()
+        with CaptureQueriesContext(connection) as queries:
+            history = self.get_history()
+
+        self.assertListEqual(history, [('TestTitle', 4.5, 2)])
+        self.assertFalse([query for query in queries if 'GROUP BY' in query['sql'] and '2020-01-02' in query['sql']])
+
+    def test_merge_distinct_voted_users_of_closed_days_and_today_without_counting_them_by_database(self):
+        self.create_votes([1, 2, 10])
+        voter = User.objects.create_user(username='voter2')
+        with mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, 10, 12))):
+            RestaurantUserVote.objects.create(user=voter, restaurant=self.restaurant, vote_weight=1)
+        params = {'date_after': '2020-01-02'}
+        self.get_history(params)
+        with CaptureQueriesContext(connection) as queries:
+            history = self.get_history(params)
+
+        self.assertListEqual(history, [('TestTitle', 4.0, 3)])
+        self.assertFalse([query for query in queries if 'COUNT(DISTINCT' in query['sql'] or 'UNION' in query['sql']])
+
+    def test_aggregate_today_votes_live(self):
+        self.create_votes([1])
+        self.get_history()
+        self.create_votes([10])
+
+        self.assertListEqual(self.get_history(), [('TestTitle', 3.0, 2)])
+
+    def test_invalidate_cache_when_closed_day_vote_deleted(self):
+        self.create_votes([1])
+        self.get_history()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(username='voter1').delete()
+
+        self.assertListEqual(self.get_history(), [('TestTitle', 1.0, 1)])
+
+
+class ListRestaurantsApproximateHistoryShould(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('restaurant_history')
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        self.restaurant2 = Restaurant.objects.create(title='TestTitle2', address='TestAddress')
+        Restaurant.objects.create(title='TestTitle3', address='TestAddress')
+
+    def create_votes(self, days, users_count, restaurant=None):
+        users = [User.objects.get_or_create(username=f'voter{i}')[0] for i in range(users_count)]
+        with mock.patch('django.utils.timezone.now') as mocked_timezone_now:
+            for day in days:
+                mocked_timezone_now.return_value = make_aware(datetime(2020, 1, day, 12))
+                RestaurantUserVote.bulk_vote([(restaurant or self.restaurant, user) for user in users])
+
+    def get_history(self, params=None):
+        self.client.force_authenticate(User.objects.get_or_create(username='viewer')[0])
+        with mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, 10, 12))):
+            response = self.client.get(self.url, params or {})
+
+        return {
+            result['title']: (result['rating'], result['distinct_voted_users']) for result in response.data['results']
+        }
+
+    def test_return_the_same_history_as_aggregated_by_database_when_voters_are_few(self):
+        self.create_votes([1, 2, 3, 10], 3)
+        self.create_votes([2, 4, 5, 6, 7, 9], 5, self.restaurant2)
+        for params in [{}, {'date_after': '2020-01-02'}, {'date_before': '2020-01-05'},
+                       {'date_after': '2020-01-03', 'date_before': '2020-01-07'}, {'date_after': '2020-01-10'},
+                       {'restaurants': self.restaurant2.pk}]:
+            with self.subTest(params=params):
+                self.assertDictEqual(self.get_history({**params, 'approx': '1'}), self.get_history(params))
+
+    def test_ignore_blank_period_dates(self):
+        self.create_votes([1, 2, 3], 3)
+        params = {'date_after': '2020-01-02', 'date_before': ''}
+
+        self.assertDictEqual(self.get_history({**params, 'approx': '1'}), self.get_history(params))
+        self.assertEqual(self.get_history({**params, 'approx': '1'})['TestTitle'], (6.0, 3))
+
+    def test_estimate_distinct_voted_users_within_error_bound(self):
+        self.create_votes([1, 2, 10], 300)
+        self.create_votes([3, 4], 1000, self.restaurant2)
+        error_bound = 3 * HyperLogLog.get_standard_error()
+        history = self.get_history()
+        approximate_history = self.get_history({'approx': '1'})
+
+        for title, (rating, distinct_voted_users) in history.items():
+            with self.subTest(title=title):
+                approximate_rating, approximate_distinct_voted_users = approximate_history[title]
+                self.assertAlmostEqual(approximate_rating, rating)
+                self.assertLessEqual(
+                    abs(approximate_distinct_voted_users - distinct_voted_users), error_bound * distinct_voted_users
+                )
+
+    def test_build_closed_day_sketches_once(self):
+        self.create_votes([1, 2, 10], 3)
+        self.get_history({'approx': '1', 'date_after': '2020-01-01'})
+        with CaptureQueriesContext(connection) as queries:
+            history = self.get_history({'approx': '1', 'date_after': '2020-01-01'})
+
+        self.assertEqual(history['TestTitle'], (9.0, 3))
+        self.assertEqual(RestaurantDailyVoterSketch.objects.count(), 2)
+        self.assertFalse([query for query in queries if 'INSERT' in query['sql'] or '2020-01-02' in query['sql']])
+
+    def test_build_closed_day_sketches_again_when_their_votes_deleted(self):
+        self.create_votes([1, 2, 10], 3)
+        self.get_history({'approx': '1', 'date_after': '2020-01-01'})
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(username='voter2').delete()
+
+        self.assertEqual(self.get_history({'approx': '1', 'date_after': '2020-01-01'})['TestTitle'][1], 2)
+        self.assertEqual(RestaurantDailyVoterSketch.objects.count(), 2)
+
+    def test_add_today_voters_live(self):
+        self.create_votes([1], 2)
+        self.get_history({'approx': '1'})
+        self.create_votes([10], 3)
+
+        self.assertEqual(self.get_history({'approx': '1'})['TestTitle'], (5.0, 3))
+
+    def test_count_compacted_votes(self):
+        self.create_votes([1, 2], 2)
+        self.create_votes([3], 3)
+        with mock.patch('django.utils.timezone.now', return_value=make_aware(datetime(2020, 1, 10, 12))):
+            call_command('compact_restaurant_votes', days=8, stdout=StringIO())
+
+        self.assertEqual(self.get_history({'approx': '1'})['TestTitle'], (7.0, 3))
+
+
 class ListRestaurantWinnersHistoryShould(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -546,9 +826,294 @@ class ListRestaurantWinnersHistoryShould(TestCase):
         ]
         self.assertListEqual(result_list, [(datetime(2020, 1, 1).date(), restaurant1.pk, 0.6, 2)])
 
+    @mock.patch('django.utils.timezone.now')
+    def test_have_count_of_days_when_multiple_restaurants_voted_each_day(self, mocked_timezone_now):
+        user = User.objects.create_user(username='u')
+        self.client.force_authenticate(user)
+        mocked_timezone_now.return_value = make_aware(datetime(2020, 1, 1))
+        restaurant1 = Restaurant.objects.create(title='TestTitle1', address='TestAddress')
+        restaurant2 = Restaurant.objects.create(title='TestTitle2', address='TestAddress')
+        for day in (1, 2, 3):
+            mocked_timezone_now.return_value = make_aware(datetime(2020, 1, day))
+            RestaurantUserVote.objects.create(user=user, restaurant=restaurant1, vote_weight=1)
+            RestaurantUserVote.objects.create(user=user, restaurant=restaurant2, vote_weight=0.5)
+        response = self.client.get(self.url)
+
+        self.assertListEqual([result['restaurant_id'] for result in response.data.get('results')], [restaurant1.pk] * 3)
+
+    @mock.patch('django.utils.timezone.now')
+    def test_have_winner_only_from_filtered_restaurants_when_restaurants_query_param_given(self, mocked_timezone_now):
+        user = User.objects.create_user(username='u')
+        self.client.force_authenticate(user)
+        mocked_timezone_now.return_value = make_aware(datetime(2020, 1, 1))
+        restaurant1 = Restaurant.objects.create(title='TestTitle1', address='TestAddress')
+        restaurant2 = Restaurant.objects.create(title='TestTitle2', address='TestAddress')
+        RestaurantUserVote.objects.create(user=user, restaurant=restaurant1, vote_weight=1)
+        RestaurantUserVote.objects.create(user=user, restaurant=restaurant2, vote_weight=0.5)
+        response = self.client.get(f'{self.url}?restaurants={restaurant2.pk}')
+
+        self.assertListEqual(
+            [(result['restaurant_id'], result['rating']) for result in response.data.get('results')],
+            [(restaurant2.pk, 0.5)]
+        )
+
+    @mock.patch('django.utils.timezone.now')
+    def test_have_only_days_in_date_range_when_date_after_and_date_before_query_params_given(
+            self, mocked_timezone_now
+    ):
+        user = User.objects.create_user(username='u')
+        self.client.force_authenticate(user)
+        mocked_timezone_now.return_value = make_aware(datetime(2020, 1, 1))
+        restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        for day in (1, 2, 3):
+            mocked_timezone_now.return_value = make_aware(datetime(2020, 1, day, 12))
+            RestaurantUserVote.objects.create(user=user, restaurant=restaurant, vote_weight=1)
+        response = self.client.get(f'{self.url}?date_after=2020-01-02&date_before=2020-01-03')
+
+        self.assertListEqual(
+            [result['date'] for result in response.data.get('results')],
+            [datetime(2020, 1, 2).date(), datetime(2020, 1, 3).date()]
+        )
+
+    @mock.patch('django.utils.timezone.now')
+    def test_have_each_day_winner_when_database_does_not_support_window_functions(self, mocked_timezone_now):
+        user = User.objects.create_user(username='u')
+        user2 = User.objects.create_user(username='u2')
+        self.client.force_authenticate(user)
+        mocked_timezone_now.return_value = make_aware(datetime(2020, 1, 1))
+        restaurant1 = Restaurant.objects.create(title='TestTitle1', address='TestAddress')
+        restaurant2 = Restaurant.objects.create(title='TestTitle2', address='TestAddress')
+        RestaurantUserVote.objects.create(user=user, restaurant=restaurant1, vote_weight=1)
+        RestaurantUserVote.objects.create(user=user, restaurant=restaurant2, vote_weight=1)
+        RestaurantUserVote.objects.create(user=user2, restaurant=restaurant2, vote_weight=1)
+        mocked_timezone_now.return_value = make_aware(datetime(2020, 1, 2))
+        RestaurantUserVote.objects.create(user=user, restaurant=restaurant1, vote_weight=1)
+        with mock.patch.object(connection.features, 'supports_over_clause', False):
+            response = self.client.get(self.url)
+
+        self.assertListEqual(
+            [(result['date'], result['restaurant_id']) for result in response.data.get('results')],
+            [(datetime(2020, 1, 1).date(), restaurant2.pk), (datetime(2020, 1, 2).date(), restaurant1.pk)]
+        )
+
+
+class ConditionalListRequestsShould(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='u')
+        self.client.force_authenticate(self.user)
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+
+    def test_return_http_304_when_list_is_not_modified(self):
+        for url in (reverse('restaurant_list'), reverse('restaurant_history'), reverse('restaurant_winners_history')):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+                self.assertEqual(response.status_code, 304)
+
+    def test_not_query_list_when_list_is_not_modified(self):
+        etag = self.client.get(reverse('restaurant_list'))['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('restaurant_list'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertFalse([query for query in queries if 'current_day_user_votes' in query['sql']])
+
+    def test_return_http_200_when_restaurant_voted_after_etag_given(self):
+        for url in (reverse('restaurant_list'), reverse('restaurant_history'), reverse('restaurant_winners_history')):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+                self.assertEqual(response.status_code, 200)
+
+    def test_return_http_200_when_restaurant_updated_after_etag_given(self):
+        etag = self.client.get(reverse('restaurant_list'))['ETag']
+        Restaurant.objects.create(title='TestTitle2', address='TestAddress')
+        response = self.client.get(reverse('restaurant_list'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_return_different_list_etags_for_different_users(self):
+        etag = self.client.get(reverse('restaurant_list'))['ETag']
+        self.client.force_authenticate(User.objects.create_user(username='u2'))
+
+        self.assertNotEqual(self.client.get(reverse('restaurant_list'))['ETag'], etag)
+
+    def test_return_different_etags_for_different_query_params(self):
+        url = reverse('restaurant_winners_history')
+
+        self.assertNotEqual(self.client.get(url)['ETag'], self.client.get(url, {'date_after': '2020-01-01'})['ETag'])
+
+    def test_return_http_200_when_vote_deleted_after_etag_given(self):
+        vote = RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=0.5)
+        etag = self.client.get(reverse('restaurant_history'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            vote.delete()
+        response = self.client.get(reverse('restaurant_history'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_return_last_modified_when_etag_is_list_validator(self):
+        for url in (reverse('restaurant_list'), reverse('restaurant_history'), reverse('restaurant_winners_history')):
+            with self.subTest(url=url):
+                self.assertFalse(self.client.get(url).has_header('Last-Modified'))
+
+    def test_not_count_votes_or_tallies_when_reading_list_version(self):
+        for url in (reverse('restaurant_list'), reverse('restaurant_history'), reverse('restaurant_winners_history')):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+                self.assertFalse([
+                    query for query in queries if 'COUNT(' in query['sql'] and (
+                        'restaurants_restaurantuservote' in query['sql']
+                        or 'restaurants_restaurantdailytally' in query['sql']
+                    )
+                ])
+
+
+class KeysetPaginatedHistoryShould(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='u'))
+
+    def get_all_pages(self, url, page_size=2):
+        results = []
+        pages_count = 0
+        with mock.patch.object(KeysetPagination, 'page_size', page_size):
+            while url:
+                response = self.client.get(url)
+                results.extend(response.data.get('results'))
+                url = response.data.get('next')
+                pages_count += 1
+
+        return results, pages_count
+
+    def test_return_all_restaurant_history_in_ordering_when_following_next_links(self):
+        users = [User.objects.create_user(username=f'voter{i}') for i in range(3)]
+        for title, vote_weights in [('A', [1]), ('B', [1, 0.5]), ('C', [1]), ('D', []), ('E', [0.5, 0.5]), ('F', [])]:
+            restaurant = Restaurant.objects.create(title=title, address='TestAddress')
+            for user, vote_weight in zip(users, vote_weights):
+                RestaurantUserVote.objects.create(user=user, restaurant=restaurant, vote_weight=vote_weight)
+        Restaurant.objects.create(title='A', address='TestAddress2')
+        results, pages_count = self.get_all_pages(reverse('restaurant_history'))
+
+        self.assertEqual(pages_count, 4)
+        self.assertListEqual(
+            [(result['title'], result['address']) for result in results],
+            [('B', 'TestAddress'), ('E', 'TestAddress'), ('A', 'TestAddress'), ('C', 'TestAddress'),
+             ('A', 'TestAddress2'), ('D', 'TestAddress'), ('F', 'TestAddress')],
+        )
+
+    @mock.patch('django.utils.timezone.now')
+    def test_return_all_winners_in_date_order_when_following_next_links(self, mocked_timezone_now):
+        user = User.objects.create_user(username='voter')
+        mocked_timezone_now.return_value = make_aware(datetime(2020, 1, 1))
+        restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        for day in range(1, 6):
+            mocked_timezone_now.return_value = make_aware(datetime(2020, 1, day))
+            RestaurantUserVote.objects.create(user=user, restaurant=restaurant, vote_weight=1)
+        results, pages_count = self.get_all_pages(reverse('restaurant_winners_history'))
+
+        self.assertEqual(pages_count, 3)
+        self.assertListEqual([result['date'].day for result in results], [1, 2, 3, 4, 5])
+
+    def test_not_query_count(self):
+        Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('restaurant_history'))
+
+        self.assertFalse([query for query in queries if 'COUNT(*)' in query['sql']])
+
+    def test_return_http_404_when_cursor_is_invalid(self):
+        response = self.client.get(reverse('restaurant_history'), {'cursor': 'invalid'})
+
+        self.assertContains(response, status_code=404, text='Invalid cursor')
+
+    def test_return_http_404_when_cursor_value_is_invalid(self):
+        cursor = urlsafe_b64encode(b'["invalid"]').decode()
+        response = self.client.get(reverse('restaurant_winners_history'), {'cursor': cursor})
+
+        self.assertContains(response, status_code=404, text='Invalid cursor')
+
+
+class ExportRestaurantsHistoryShould(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='u'))
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        RestaurantUserVote.objects.create(
+            user=User.objects.create_user(username='u2'), restaurant=self.restaurant, vote_weight=1
+        )
+        Restaurant.objects.create(title='TestTitle2', address='TestAddress, 2')
+
+    def test_stream_restaurant_history_as_csv_when_format_is_csv(self):
+        response = self.client.get(reverse('restaurant_history'), {'format': 'csv'})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="restaurant_history.csv"')
+        self.assertEqual(b''.join(response.streaming_content).decode(), (
+            'title,address,distinct_voted_users,rating\r\n'
+            'TestTitle,TestAddress,1,1.0\r\n'
+            'TestTitle2,"TestAddress, 2",0,0.0\r\n'
+        ))
+
+    def test_stream_restaurant_history_as_ndjson_when_format_is_ndjson(self):
+        response = self.client.get(reverse('restaurant_history'), {'format': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertListEqual(rows, [
+            {'title': 'TestTitle', 'address': 'TestAddress', 'distinct_voted_users': 1, 'rating': 1.0},
+            {'title': 'TestTitle2', 'address': 'TestAddress, 2', 'distinct_voted_users': 0, 'rating': 0.0},
+        ])
+
+    def test_stream_all_restaurants_without_pagination(self):
+        Restaurant.objects.bulk_create([
+            Restaurant(title=f'Restaurant{i}', address='TestAddress') for i in range(60)
+        ])
+        with mock.patch.object(ListRestaurantsHistory, 'export_chunk_size', 7):
+            response = self.client.get(reverse('restaurant_history'), {'format': 'ndjson'})
+
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 62)
+
+    def test_filter_exported_restaurant_history(self):
+        response = self.client.get(
+            reverse('restaurant_history'), {'format': 'ndjson', 'restaurants': self.restaurant.pk}
+        )
+
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 1)
+
+    def test_stream_restaurant_winners_history_as_csv_when_format_is_csv(self):
+        response = self.client.get(reverse('restaurant_winners_history'), {'format': 'csv'})
+
+        self.assertEqual(b''.join(response.streaming_content).decode(), (
+            'date,restaurant_id,title,address,rating,total_distinct_users_voted\r\n'
+            f'{timezone.localdate().isoformat()},{self.restaurant.pk},TestTitle,TestAddress,1.0,1\r\n'
+        ))
+
+    def test_return_http_403_in_export_format_when_user_is_anonymous(self):
+        self.client.force_authenticate(None)
+        response = self.client.get(reverse('restaurant_history'), {'format': 'ndjson'})
+
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('detail', json.loads(response.content))
+
+    def test_return_paginated_json_when_format_is_not_given(self):
+        response = self.client.get(reverse('restaurant_history'))
+
+        self.assertEqual(len(response.data.get('results')), 2)
+        self.assertIsNone(response.data.get('next'))
+
 
 class VoteRestaurantShould(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
         self.url = self.get_url(self.restaurant.pk)
@@ -594,3 +1159,205 @@ class VoteRestaurantShould(TestCase):
 
         self.assertEqual(restaurant_user_vote.user, user)
         self.assertEqual(restaurant_user_vote.restaurant, self.restaurant)
+
+    def test_create_restaurant_user_votes_with_decreasing_vote_weights_when_user_votes_multiple_times(self):
+        self.client.force_authenticate(User.objects.create_user(username='u'))
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(self.url, {})
+
+        self.assertListEqual(
+            list(RestaurantUserVote.objects.order_by('pk').values_list('vote_weight', flat=True)),
+            [Restaurant.FIRST_VOTE_WEIGHT, Restaurant.SECOND_VOTE_WEIGHT, Restaurant.DEFAULT_VOTE_WEIGHT]
+        )
+
+    def test_return_http_400_when_user_voted_maximum_times_today(self):
+        self.client.force_authenticate(User.objects.create_user(username='u', daily_vote_count=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {})
+        response = self.client.post(self.url, {})
+
+        self.assertContains(response, status_code=400, text='maximum times')
+
+    def test_return_http_400_when_user_voted_maximum_times_today_without_vote_endpoint(self):
+        user = User.objects.create_user(username='u', daily_vote_count=1)
+        RestaurantUserVote.objects.create(user=user, restaurant=self.restaurant, vote_weight=1)
+        self.client.force_authenticate(user)
+        response = self.client.post(self.url, {})
+
+        self.assertContains(response, status_code=400, text='maximum times')
+        self.assertEqual(RestaurantUserVote.objects.count(), 1)
+
+    def test_return_http_201_with_first_vote_weight_when_user_voted_maximum_times_and_vote_was_deleted(self):
+        user = User.objects.create_user(username='u', daily_vote_count=1)
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {})
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantUserVote.objects.get().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {})
+
+        self.assertContains(response, status_code=201, text='')
+        self.assertEqual(RestaurantUserVote.objects.get().vote_weight, Restaurant.FIRST_VOTE_WEIGHT)
+        self.assertEqual(self.restaurant.get_user_current_day_vote_count(user), 1)
+
+
+class BulkVoteRestaurantsShould(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+        self.url = reverse('restaurant_bulk_vote')
+        self.user = User.objects.create_user(username='u', daily_vote_count=2)
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+
+    def test_return_http_403_when_user_is_not_staff(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, {'votes': [{'user': self.user.pk, 'restaurant': self.restaurant.pk}]})
+
+        self.assertContains(response, status_code=403, text='')
+
+    def test_return_http_400_when_votes_are_empty(self):
+        response = self.client.post(self.url, {'votes': []}, format='json')
+
+        self.assertContains(response, status_code=400, text='votes')
+
+    def test_create_votes_with_vote_weights_in_order_per_user(self):
+        user = User.objects.create_user(username='u2')
+        response = self.client.post(self.url, {'votes': [
+            {'user': self.user.pk, 'restaurant': self.restaurant.pk},
+            {'user': user.pk, 'restaurant': self.restaurant.pk},
+            {'user': self.user.pk, 'restaurant': self.restaurant.pk},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([result.get('vote_weight') for result in response.data.get('results')], [
+            Restaurant.FIRST_VOTE_WEIGHT, Restaurant.FIRST_VOTE_WEIGHT, Restaurant.SECOND_VOTE_WEIGHT
+        ])
+        self.assertEqual(RestaurantUserVote.objects.count(), 3)
+
+    def test_continue_vote_weights_when_user_already_voted_today(self):
+        RestaurantUserVote.objects.create(user=self.user, restaurant=self.restaurant, vote_weight=1)
+        response = self.client.post(self.url, {'votes': [
+            {'user': self.user.pk, 'restaurant': self.restaurant.pk},
+        ]}, format='json')
+
+        self.assertEqual(response.data.get('results')[0].get('vote_weight'), Restaurant.SECOND_VOTE_WEIGHT)
+
+    def test_return_failed_results_when_user_voted_maximum_times_or_user_or_restaurant_does_not_exist(self):
+        response = self.client.post(self.url, {'votes': [
+            {'user': self.user.pk, 'restaurant': self.restaurant.pk},
+            {'user': 123123, 'restaurant': self.restaurant.pk},
+            {'user': self.user.pk, 'restaurant': 123123},
+            {'user': self.user.pk, 'restaurant': self.restaurant.pk},
+            {'user': self.user.pk, 'restaurant': self.restaurant.pk},
+        ]}, format='json')
+
+        self.assertListEqual([result.get('voted') for result in response.data.get('results')], [
+            True, False, False, True, False
+        ])
+        self.assertListEqual([result.get('error') for result in response.data.get('results')], [
+            None, 'User not found', 'Restaurant not found', None,
+            'You already voted maximum times allowed for this restaurant today',
+        ])
+        self.assertEqual(RestaurantUserVote.objects.count(), 2)
+
+    def test_update_restaurant_daily_tally_when_votes_created(self):
+        user = User.objects.create_user(username='u2')
+        self.client.post(self.url, {'votes': [
+            {'user': self.user.pk, 'restaurant': self.restaurant.pk},
+            {'user': self.user.pk, 'restaurant': self.restaurant.pk},
+            {'user': user.pk, 'restaurant': self.restaurant.pk},
+        ]}, format='json')
+        tally = RestaurantDailyTally.objects.get()
+
+        self.assertEqual(tally.rating, 2.5)
+        self.assertEqual(tally.distinct_voted_users, 2)
+        self.assertEqual(tally.votes_count, 3)
+
+    def test_not_allow_single_votes_exceeding_user_daily_vote_count_after_bulk_votes(self):
+        self.client.post(self.url, {'votes': [
+            {'user': self.user.pk, 'restaurant': self.restaurant.pk},
+            {'user': self.user.pk, 'restaurant': self.restaurant.pk},
+        ]}, format='json')
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('restaurant_vote', kwargs={'pk': self.restaurant.pk}), {})
+
+        self.assertContains(response, status_code=400, text='')
+
+    def test_execute_the_same_number_of_queries_when_votes_count_grows(self):
+        queries_counts = []
+        for users_count in (1, 10):
+            users = [User.objects.create_user(username=f'u{users_count}-{i}') for i in range(users_count)]
+            restaurant = Restaurant.objects.create(title=f'TestTitle{users_count}', address='TestAddress')
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(self.url, {'votes': [
+                    {'user': user.pk, 'restaurant': restaurant.pk} for user in users for _ in range(2)
+                ]}, format='json')
+            queries_counts.append(len(queries))
+
+        self.assertEqual(queries_counts[0], queries_counts[1])
+
+
+class VoteRestaurantConcurrentRequestsShould(TransactionTestCase):
+    threads_count = 8
+    requests_per_thread = 3
+    client_attempts_count = 5
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='u', daily_vote_count=4)
+        self.restaurant = Restaurant.objects.create(title='TestTitle', address='TestAddress')
+        self.url = reverse('restaurant_vote', kwargs={'pk': self.restaurant.pk})
+
+    def vote(self, barrier, status_codes):
+        # Test client receives exceptions of requests of every thread, so errors are returned as responses instead
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(self.user)
+        barrier.wait()
+        try:
+            for _ in range(self.requests_per_thread):
+                status_codes.append(self.post_vote(client))
+        finally:
+            connection.close()
+
+    def post_vote(self, client):
+        """
+        Requests failed on database lock after view retried them are rolled back and retried, like client would.
+        Status of last attempt is returned, so persistent server error fails the test.
+        """
+        for attempt in range(1, self.client_attempts_count + 1):
+            status_code = client.post(self.url, {}).status_code
+            if status_code != 500:
+                break
+            time.sleep(0.01 * attempt)
+
+        return status_code
+
+    def vote_in_parallel(self):
+        barrier = Barrier(self.threads_count)
+        status_codes = []
+        threads = [Thread(target=self.vote, args=(barrier, status_codes)) for _ in range(self.threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return status_codes
+
+    def test_not_exceed_user_daily_vote_count(self):
+        status_codes = self.vote_in_parallel()
+        self.assertEqual(RestaurantUserVote.objects.count(), self.user.daily_vote_count)
+        self.assertEqual(status_codes.count(201), self.user.daily_vote_count)
+        self.assertSetEqual(set(status_codes), {201, 400})
+
+    def test_give_each_vote_weight_in_sequence(self):
+        self.vote_in_parallel()
+
+        self.assertListEqual(
+            list(RestaurantUserVote.objects.order_by('vote_weight').values_list('vote_weight', flat=True)),
+            [Restaurant.DEFAULT_VOTE_WEIGHT, Restaurant.DEFAULT_VOTE_WEIGHT, Restaurant.SECOND_VOTE_WEIGHT,
+             Restaurant.FIRST_VOTE_WEIGHT]
+        )
+        self.assertEqual(RestaurantDailyTally.objects.get().rating, 2)
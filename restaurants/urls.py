@@ -1,15 +1,21 @@
+from django.conf import settings
 from django.urls import path, include
 
 from . import views
 
+ListRestaurants = views.AsyncListRestaurants if settings.RESTAURANTS_ASYNC_VIEWS else views.ListRestaurants
+VoteRestaurant = views.AsyncVoteRestaurant if settings.RESTAURANTS_ASYNC_VIEWS else views.VoteRestaurant
+
 urlpatterns = [
     path('create/', views.CreateRestaurant.as_view(), name='restaurant_create'),
-    path('list/', views.ListRestaurants.as_view(), name='restaurant_list'),
+    path('list/', ListRestaurants.as_view(), name='restaurant_list'),
+    path('live/', views.LiveRestaurants.as_view(), name='restaurant_live'),
     path('history/', views.ListRestaurantsHistory.as_view(), name='restaurant_history'),
     path('winners_history/', views.ListRestaurantWinnersHistory.as_view(), name='restaurant_winners_history'),
+    path('votes/bulk/', views.BulkVoteRestaurants.as_view(), name='restaurant_bulk_vote'),
     path('<int:pk>/', include([
         path('update/', views.UpdateRestaurant.as_view(), name='restaurant_update'),
         path('delete/', views.DeleteRestaurant.as_view(), name='restaurant_delete'),
-        path('vote/', views.VoteRestaurant.as_view(), name='restaurant_vote'),
+        path('vote/', VoteRestaurant.as_view(), name='restaurant_vote'),
     ])),
 ]
@@ -1,43 +1,151 @@
-from itertools import groupby
-
-from django.db.models import Count, Sum, Q, Case, When
-from django.db.models.functions import Coalesce
-from django.utils import timezone
-
-from rest_framework.generics import CreateAPIView, UpdateAPIView, DestroyAPIView, ListAPIView, get_object_or_404
-from rest_framework.permissions import IsAuthenticated
+import hashlib
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from operator import attrgetter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.db import OperationalError, connections, router, transaction
+from django.db.models import Count, Max, Min, Sum, Q, Case, When, OuterRef, F, FilteredRelation, Subquery, Window, \
+    QuerySet
+from django.db.models.functions import Coalesce, FirstValue
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from django.utils.translation import gettext_lazy as _
+from django.views.decorators.http import condition
+
+from rest_framework import status
+from rest_framework.generics import CreateAPIView, UpdateAPIView, DestroyAPIView, ListAPIView, GenericAPIView, \
+    get_object_or_404
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from common.pagination import KeysetPagination
+from common.views import AsyncAPIViewMixin, ReadReplicaMixin, StickToPrimaryMixin
+from common.utils import get_voting_date, is_database_lock_error
+from .analytics import get_vote_columns
+from .caches import ClosedDayVotesCache
 from .filters import RestaurantHistoryFilter, RestaurantWinnersHistoryFilter
-from .models import Restaurant, RestaurantUserVote
+from .leaderboards import get_leaderboard
+from .models import Restaurant, RestaurantDailyTally, RestaurantUserDailyVoteCount, RestaurantUserDailyVoteRollup, \
+    RestaurantUserVote
+from .live import get_live_broadcaster
+from .renderers import ExportRenderer, CSVRenderer, NDJSONRenderer, EventStreamRenderer
+from .sketches import HyperLogLog, RestaurantVoterSketches
 from .serializers import RestaurantSerializer, RestaurantsListSerializer, RestaurantUserVoteSerializer, \
-    RestaurantListBaseSerializer, RestaurantWinnersHistory
+    RestaurantListBaseSerializer, RestaurantWinnersHistory, RestaurantBulkVoteSerializer
 
 
-class CreateRestaurant(CreateAPIView):
+class CreateRestaurant(StickToPrimaryMixin, CreateAPIView):
     """View for creating restaurant"""
     permission_classes = [IsAuthenticated]
     serializer_class = RestaurantSerializer
 
 
-class UpdateRestaurant(UpdateAPIView):
+class UpdateRestaurant(StickToPrimaryMixin, UpdateAPIView):
     """View for updating restaurant"""
     permission_classes = [IsAuthenticated]
     serializer_class = RestaurantSerializer
     queryset = Restaurant.objects.all()
 
 
-class DeleteRestaurant(DestroyAPIView):
+class DeleteRestaurant(StickToPrimaryMixin, DestroyAPIView):
     """View for deleting restaurant"""
     permission_classes = [IsAuthenticated]
     serializer_class = RestaurantSerializer
     queryset = Restaurant.objects.all()
 
 
-class ListRestaurantsBase(ListAPIView):
-    """Base view for restaurant list"""
+class ExportListMixin:
+    """
+    Whole filtered list is streamed without pagination, when export format (?format=csv or ?format=ndjson) is
+    requested. Objects are read with queryset iterator in chunks, so memory use doesn't depend on list size.
+    Django 3.2 ASGI handler iterates streamed content in event loop, where ORM can't be used, so export of ASGI
+    request is serialized in view (run in thread) and only its rendering is streamed.
+    """
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CSVRenderer, NDJSONRenderer]
+    export_chunk_size = 2000
+    export_filename = 'export'
+
+    def list(self, request, *args, **kwargs):
+        if not isinstance(request.accepted_renderer, ExportRenderer):
+            return super(ExportListMixin, self).list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        if isinstance(queryset, QuerySet):
+            # Rows are read after view returns, so database is chosen while request is routed
+            queryset = queryset.using(queryset.db).iterator(chunk_size=self.export_chunk_size)
+        rows = (serializer.to_representation(obj) for obj in queryset)
+        if isinstance(request._request, ASGIRequest):
+            rows = list(rows)
+        response = StreamingHttpResponse(
+            request.accepted_renderer.render_rows(rows, list(serializer.fields)),
+            content_type=f'{request.accepted_media_type}; charset={request.accepted_renderer.charset}',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.export_filename}.{request.accepted_renderer.format}"'
+        )
+
+        return response
+
+
+class PeriodFilterMixin:
+    """History view filtered by period of filterset date range filter (date_after and date_before query params)"""
+
+    def get_period_dates(self):
+        """Returns date_after and date_before validated by filterset, None when not given or blank"""
+        period = self.filterset.form.cleaned_data.get('date')
+        if not period:
+            return None, None
+
+        return period.start and period.start.date(), period.stop and period.stop.date()
+
+
+class ConditionalListMixin:
+    """
+    List is answered with 304 Not Modified before it's queried, when client already has list of current version.
+    Version is read with cheap aggregate queries over indexes, which are overridden by list views.
+    ETag is the only validator, as Last-Modified precision of one second can't tell apart changes of the same second.
+    """
+    vary_headers = ['Accept', 'Authorization', 'Cookie']
+
+    def get_list_version(self):
+        """
+        Returns tuple of values changing whenever listed data changes. Restaurants totals are updated when their
+        votes are deleted, so restaurants version changes with deleted votes too.
+        """
+        return Restaurant.objects.aggregate(count=Count('pk'), updated_datetime=Max('updated_datetime')).values()
+
+    def get_conditional_version(self):
+        if not hasattr(self, '_conditional_version'):
+            self._conditional_version = tuple(self.get_list_version())
+
+        return self._conditional_version
+
+    def get_etag(self, request, *args, **kwargs):
+        version = (request.get_full_path(), request.accepted_media_type, *self.get_conditional_version())
+
+        return hashlib.md5(repr(version).encode()).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        response = condition(etag_func=self.get_etag)(super(ConditionalListMixin, self).get)(request, *args, **kwargs)
+        patch_vary_headers(response, self.vary_headers)
+
+        return response
+
+
+class ListRestaurantsBase(ReadReplicaMixin, ListAPIView):
+    """Base view for restaurant list, read from read replica"""
     permission_classes = [IsAuthenticated]
     queryset = Restaurant.objects.all()
+    ordering = ['-rating', '-distinct_voted_users', 'title']
 
     def get_restaurant_user_vote_filter(self):
         return Q()
@@ -48,55 +156,370 @@ class ListRestaurantsBase(ListAPIView):
         return queryset.annotate(
             distinct_voted_users=Count('restaurantuservote__user', distinct=True, filter=votes_filter),
             rating=Coalesce(Sum('restaurantuservote__vote_weight', filter=votes_filter), 0.0),
-        ).order_by('-rating', '-distinct_voted_users', 'title')
+        ).order_by(*self.ordering)
 
 
-class ListRestaurants(ListRestaurantsBase):
+class LeaderboardRestaurants:
+    """
+    Restaurants ranked by leaderboard, lazily sliced by paginator. Restaurants without votes during leaderboard day
+    follow ranked restaurants ordered by title
+    """
+
+    def __init__(self, leaderboard, date, queryset):
+        self.leaderboard = leaderboard
+        self.date = date
+        self.queryset = queryset
+
+    def count(self):
+        return Restaurant.objects.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        ranked_count = self.leaderboard.count(self.date)
+        restaurants = []
+        if index.start < ranked_count:
+            first_rank, entries = self.leaderboard.get_range(self.date, index.start, index.stop)
+            ranked_restaurants = self.queryset.in_bulk([restaurant_id for restaurant_id, _, _ in entries])
+            for restaurant_id, rating, distinct_voted_users in entries:
+                restaurant = ranked_restaurants.get(restaurant_id)
+                if restaurant is not None:
+                    restaurant.rating = rating
+                    restaurant.distinct_voted_users = distinct_voted_users
+                    restaurants.append(restaurant)
+            restaurants.sort(key=lambda restaurant: (
+                -restaurant.rating, -restaurant.distinct_voted_users, restaurant.title
+            ))
+            restaurants = restaurants[index.start - first_rank:index.stop - first_rank]
+
+        if index.stop > ranked_count:
+            unranked_restaurants = self.queryset.exclude(restaurantdailytally__date=self.date).order_by('title')
+            for restaurant in unranked_restaurants[max(index.start - ranked_count, 0):index.stop - ranked_count]:
+                restaurant.rating = 0.0
+                restaurant.distinct_voted_users = 0
+                restaurants.append(restaurant)
+
+        return restaurants
+
+
+class ListRestaurants(ConditionalListMixin, ListRestaurantsBase):
     """View for restaurant list. Winner restaurant is first restaurant in result list"""
     serializer_class = RestaurantsListSerializer
 
+    def get_list_version(self):
+        """Current day list changes with restaurants, current day tallies and current user daily vote count"""
+        date = get_voting_date()
+        tallies_version = RestaurantDailyTally.objects.filter(date=date).aggregate(
+            max_pk=Max('pk'), updated_datetime=Max('updated_datetime')
+        )
+
+        return (
+            date, self.request.user.pk, self.request.user.daily_vote_count,
+            *super(ListRestaurants, self).get_list_version(), *tallies_version.values(),
+        )
+
     def get_queryset(self):
-        queryset = super(ListRestaurants, self).get_queryset().annotate(
-            user_vote_count_today=Count('restaurantuservote', filter=(
-                Q(restaurantuservote__created_datetime__date=timezone.now().date())
-                & Q(restaurantuservote__user=self.request.user)
+        queryset = self.annotate_user_votes(super(ListRestaurants, self).get_queryset())
+
+        return self.annotate_unique_voted_users_and_ratings(queryset)
+
+    def annotate_user_votes(self, queryset):
+        return queryset.annotate(
+            current_day_user_votes=FilteredRelation('restaurantuservote', condition=(
+                Q(restaurantuservote__user=self.request.user) & Q(restaurantuservote__vote_date=get_voting_date())
             )),
+        ).annotate(
+            user_vote_count_today=Count('current_day_user_votes'),
             can_user_vote_today=Case(
                 When(user_vote_count_today__lt=self.request.user.daily_vote_count, then=True),
                 default=False
             ),
         )
 
-        return self.annotate_unique_voted_users_and_ratings(queryset)
+    def annotate_unique_voted_users_and_ratings(self, queryset):
+        """Current day rating and unique voted users are read from restaurant daily tally"""
+        return queryset.annotate(
+            current_day_tally=FilteredRelation(
+                'restaurantdailytally', condition=Q(restaurantdailytally__date=get_voting_date())
+            ),
+        ).annotate(
+            distinct_voted_users=Coalesce(F('current_day_tally__distinct_voted_users'), 0),
+            rating=Coalesce(F('current_day_tally__rating'), 0.0),
+        ).order_by(*self.ordering)
+
+    def get_restaurants(self):
+        """Restaurants are ranked by leaderboard when it's enabled, so only requested page is queried"""
+        leaderboard = get_leaderboard()
+        if leaderboard is None:
+            return self.filter_queryset(self.get_queryset())
+
+        date = get_voting_date()
+        if not leaderboard.is_built(date):
+            # Leaderboard is kept updated afterwards, so it's built from primary database without replication lag
+            tallies = RestaurantDailyTally.objects.using(router.db_for_write(RestaurantDailyTally))
+            leaderboard.build(date, tallies.filter(date=date))
+
+        return LeaderboardRestaurants(
+            leaderboard, date, self.annotate_user_votes(super(ListRestaurants, self).get_queryset())
+        )
+
+    def get_page(self):
+        """Returns paginated restaurants or all restaurants when pagination is disabled"""
+        restaurants = self.get_restaurants()
+        page = self.paginate_queryset(restaurants)
+
+        return list(restaurants[:len(restaurants)]) if page is None else page
+
+    def get_list_response(self, page):
+        data = self.get_serializer(page, many=True).data
+        if self.paginator is None:
+            return Response(data)
+
+        return self.get_paginated_response(data)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_list_response(self.get_page())
+
 
+class AsyncListRestaurants(AsyncAPIViewMixin, ListRestaurants):
+    """
+    Async variant of restaurant list for ASGI deployment. List version and page are queried with sync_to_async,
+    conditional response and serialization are done in event loop.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        await sync_to_async(self.get_conditional_version)()
+        etag = quote_etag(self.get_etag(request, *args, **kwargs))
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = self.get_list_response(await sync_to_async(self.get_page)())
+            response['ETag'] = etag
+        patch_vary_headers(response, self.vary_headers)
 
-class ListRestaurantsHistory(ListRestaurantsBase):
+        return response
+
+
+class LiveRestaurants(APIView):
+    """
+    Server-Sent Events stream of current day restaurant rating and distinct voted users changes, so clients don't
+    poll restaurant list. Changes are read and serialized once per interval for all clients of process.
+    Stream holds worker while client is connected, so it should be served by asynchronous WSGI workers (e.g. gevent).
+    Django 3.2 ASGI handler iterates streamed content in event loop, which waiting stream would block for all
+    requests, so stream isn't served to ASGI requests.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [EventStreamRenderer, *api_settings.DEFAULT_RENDERER_CLASSES]
+    asgi_request_message = _('Live restaurant ratings are served by WSGI server only')
+
+    def get(self, request, *args, **kwargs):
+        if isinstance(request._request, ASGIRequest):
+            return Response({'detail': self.asgi_request_message}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID', '')
+        response = StreamingHttpResponse(
+            get_live_broadcaster().stream(int(last_event_id) if last_event_id.isdigit() else None),
+            content_type=f'{EventStreamRenderer.media_type}; charset={EventStreamRenderer.charset}',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
+
+
+class ListRestaurantsHistory(ConditionalListMixin, ExportListMixin, PeriodFilterMixin, ListRestaurantsBase):
     """
     View for restaurant history.
     Each restaurant rating and distinct voted users counted for selected period.
+    With ?approx=1 distinct voted users are estimated from daily voter sketches.
     """
+    export_filename = 'restaurant_history'
+    approximate_query_param = 'approx'
+    pagination_class = KeysetPagination
+    ordering = [*ListRestaurantsBase.ordering, 'pk']
     serializer_class = RestaurantListBaseSerializer
     filterset_class = RestaurantHistoryFilter
 
+    def get_list_version(self):
+        votes_version = RestaurantUserVote.objects.aggregate(
+            max_pk=Max('pk'), updated_datetime=Max('updated_datetime')
+        )
+
+        return (*super(ListRestaurantsHistory, self).get_list_version(), *votes_version.values())
+
     def get_restaurant_user_vote_filter(self):
         votes_filter = super(ListRestaurantsHistory, self).get_restaurant_user_vote_filter()
+
+        return votes_filter & self.get_period_votes_filter(prefix='restaurantuservote__')
+
+    def get_period_votes_filter(self, prefix='', date_field='vote_date'):
+        """Period starts at the beginning of date_after voting day and ends at the beginning of date_before one"""
+        votes_filter = Q()
         date_after = self.request.query_params.get('date_after')
         date_before = self.request.query_params.get('date_before')
         if date_after:
-            votes_filter = votes_filter & Q(restaurantuservote__created_datetime__gt=date_after)
+            votes_filter = votes_filter & Q(**{f'{prefix}{date_field}__gte': date_after})
         if date_before:
-            votes_filter = votes_filter & Q(restaurantuservote__created_datetime__lte=date_before)
+            votes_filter = votes_filter & Q(**{f'{prefix}{date_field}__lt': date_before})
 
         return votes_filter
 
+    def is_approximate(self):
+        return self.request.query_params.get(self.approximate_query_param) in ('1', 'true')
+
     def filter_queryset(self, queryset):
         """Annotating rating and unique voted users on filtered queryset"""
-        return self.annotate_unique_voted_users_and_ratings(
-            super(ListRestaurantsHistory, self).filter_queryset(queryset)
+        queryset = super(ListRestaurantsHistory, self).filter_queryset(queryset)
+        date_after, date_before = self.get_period_dates()
+        if not date_after and not date_before:
+            return self.annotate_restaurant_totals(queryset)
+
+        vote_columns = get_vote_columns()
+        if vote_columns is not None:
+            return self.get_restaurants_from_vote_columns(vote_columns, queryset, date_after, date_before)
+        if self.is_approximate():
+            return self.get_restaurants_with_approximate_voted_users(queryset, date_after, date_before)
+
+        if not settings.RESTAURANTS_HISTORY_CLOSED_DAY_CACHE:
+            # Database annotation doesn't count compacted votes (rollups)
+            if RestaurantUserDailyVoteRollup.objects.filter(self.get_period_votes_filter(date_field='date')).exists():
+                return self.get_restaurants_with_period_totals(queryset, date_after, date_before)
+            return self.annotate_unique_voted_users_and_ratings(queryset)
+
+        closed_days = self.get_closed_days()
+        if closed_days is None:
+            return self.annotate_unique_voted_users_and_ratings(queryset)
+
+        return self.get_restaurants_with_closed_day_votes(queryset, *closed_days)
+
+    def get_closed_days(self):
+        """
+        Returns first and last date of closed days inside history period, which votes are read from cache.
+        Returns None when there are no such days.
+        """
+        date_after, date_before = self.get_period_dates()
+        if date_after:
+            first_date = date_after
+        else:
+            first_date = min(filter(None, [
+                RestaurantUserVote.objects.aggregate(Min('vote_date'))['vote_date__min'],
+                RestaurantUserDailyVoteRollup.objects.aggregate(Min('date'))['date__min'],
+            ]), default=None)
+            if first_date is None:
+                return None
+        last_date = get_voting_date() - timedelta(days=1)
+        if date_before:
+            last_date = min(last_date, date_before - timedelta(days=1))
+
+        return (first_date, last_date) if first_date <= last_date else None
+
+    def get_restaurants_with_period_totals(self, queryset, date_after, date_before):
+        """Returns restaurants with rating and unique voted users of votes and rollups aggregated by database"""
+        totals = Restaurant.objects.get_totals(queryset.values('pk'), date_after, date_before)
+
+        restaurants = list(queryset)
+        for restaurant in restaurants:
+            restaurant.rating, _, restaurant.distinct_voted_users = totals.get(restaurant.pk, (0.0, 0, 0))
+
+        return self.sort_restaurants(restaurants)
+
+    def get_restaurants_with_closed_day_votes(self, queryset, first_date, last_date):
+        """
+        Returns restaurants with rating summed and unique voted users merged from cached votes and rollups of closed
+        days and votes of other days in history period (today)
+        """
+        ratings = defaultdict(float)
+        voters = defaultdict(set)
+        closed_days = ClosedDayVotesCache(
+            RestaurantUserVote.objects, RestaurantUserDailyVoteRollup.objects,
+        ).get_days(first_date, last_date)
+        for day in closed_days.values():
+            for restaurant_id, (rating, voter_ids) in day.items():
+                ratings[restaurant_id] += rating
+                voters[restaurant_id].update(voter_ids)
+
+        live_votes = RestaurantUserVote.objects.filter(
+            self.get_period_votes_filter(), restaurant_id__in=queryset.values('pk')
+        ).exclude(vote_date__gte=first_date, vote_date__lte=last_date)
+        for restaurant_id, user_id, rating in live_votes.values_list(
+            'restaurant_id', 'user_id',
+        ).annotate(Sum('vote_weight')).order_by():
+            ratings[restaurant_id] += rating
+            voters[restaurant_id].add(user_id)
+
+        restaurants = list(queryset)
+        for restaurant in restaurants:
+            restaurant.rating = ratings.get(restaurant.pk, 0.0)
+            restaurant.distinct_voted_users = len(voters.get(restaurant.pk, ()))
+
+        return self.sort_restaurants(restaurants)
+
+    def get_restaurants_with_approximate_voted_users(self, queryset, date_after, date_before):
+        """
+        Returns restaurants with rating read from cumulative ratings of daily tallies and distinct voted users
+        estimated by merging voter sketches of closed days with users voted during other days in history period
+        (today), so query time depends on days count instead of votes count. Estimate error is bound by HyperLogLog
+        standard error.
+        """
+        last_date = get_voting_date() - timedelta(days=1)
+        if date_before:
+            last_date = min(last_date, date_before - timedelta(days=1))
+        first_date = date_after or date.min
+        sketches = {}
+        if first_date <= last_date:
+            sketches = RestaurantVoterSketches(queryset).get_sketches(first_date, last_date)
+
+        live_votes = RestaurantUserVote.objects.filter(
+            self.get_period_votes_filter(), restaurant_id__in=queryset.values('pk'), vote_date__gt=last_date,
         )
+        for restaurant_id, user_id in live_votes.values_list('restaurant_id', 'user_id').distinct().order_by():
+            sketches.setdefault(restaurant_id, HyperLogLog()).add(user_id)
+
+        restaurants = list(self.annotate_period_ratings(queryset, date_after, date_before))
+        for restaurant in restaurants:
+            restaurant.distinct_voted_users = sketches[restaurant.pk].count() if restaurant.pk in sketches else 0
+
+        return self.sort_restaurants(restaurants)
+
+    def annotate_restaurant_totals(self, queryset):
+        """History of all time is read from restaurant totals in order of their index, without aggregating votes"""
+        return queryset.annotate(
+            rating=F('total_rating'), distinct_voted_users=F('distinct_voters'),
+        ).order_by(*self.ordering)
+
+    @staticmethod
+    def annotate_period_ratings(queryset, date_after, date_before):
+        """
+        Rating of period is cumulative rating before date_before minus cumulative rating before date_after,
+        read with two index lookups per restaurant regardless of period length
+        """
+        rating = RestaurantDailyTally.objects.get_cumulative_rating(OuterRef('pk'), date_before)
+        if date_after:
+            rating = rating - RestaurantDailyTally.objects.get_cumulative_rating(OuterRef('pk'), date_after)
+
+        return queryset.annotate(rating=rating)
+
+    def get_restaurants_from_vote_columns(self, vote_columns, queryset, date_after, date_before):
+        """Returns restaurants with rating and unique voted users aggregated by in-memory vote columns"""
+        ratings, distinct_voted_users = vote_columns.get_restaurant_totals(date_after, date_before)
+        restaurants = list(queryset)
+        for restaurant in restaurants:
+            is_voted = restaurant.pk < len(ratings)
+            restaurant.rating = float(ratings[restaurant.pk]) if is_voted else 0.0
+            restaurant.distinct_voted_users = int(distinct_voted_users[restaurant.pk]) if is_voted else 0
+
+        return self.sort_restaurants(restaurants)
+
+    def sort_restaurants(self, restaurants):
+        for field in reversed(self.ordering):
+            restaurants.sort(key=attrgetter(field.lstrip('-')), reverse=field.startswith('-'))
+
+        return restaurants
 
 
-class ListRestaurantWinnersHistory(ListAPIView):
+class ListRestaurantWinnersHistory(ReadReplicaMixin, ConditionalListMixin, ExportListMixin, PeriodFilterMixin,
+                                   ListAPIView):
     """
     View for winner restaurants.
     Returns restaurant winner for each day in given time period.
@@ -105,39 +528,95 @@ class ListRestaurantWinnersHistory(ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = RestaurantWinnersHistory
     filterset_class = RestaurantWinnersHistoryFilter
-    queryset = RestaurantUserVote.objects.all()
-
-    def get_queryset(self):
-        """Returns queryset with restaurant votes and distinct voted users grouped by day and restaurant"""
-        return super(ListRestaurantWinnersHistory, self).get_queryset().values(
-            'created_datetime__date', 'restaurant_id', 'restaurant__title', 'restaurant__address'
-        ).annotate(
-            rating=Sum('vote_weight'),
-            total_distinct_users_voted=Count('user', distinct=True)
-        ).select_related('restaurant').order_by('created_datetime__date', '-rating', '-total_distinct_users_voted')
+    queryset = RestaurantDailyTally.objects.select_related('restaurant')
+    export_filename = 'restaurant_winners_history'
+    pagination_class = KeysetPagination
+    ordering = ['date']
+    winner_ordering = ['-rating', '-distinct_voted_users', 'restaurant__title']
+
+    def get_list_version(self):
+        tallies_version = RestaurantDailyTally.objects.aggregate(
+            max_pk=Max('pk'), updated_datetime=Max('updated_datetime')
+        )
 
-    def list(self, request, *args, **kwargs):
-        """Returns list with single winner restaurant for each day"""
-        queryset = self.filter_queryset(self.get_queryset())
-        # There should be a way to find winner restaurant for each day using database query, but I couldn't
-        first_restaurant_of_each_day = [
-            next(restaurant) for day, restaurant in groupby(queryset, key=lambda x: x['created_datetime__date'])
-        ]
+        return (*super(ListRestaurantWinnersHistory, self).get_list_version(), *tallies_version.values())
 
-        page = self.paginate_queryset(first_restaurant_of_each_day)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+    def filter_queryset(self, queryset):
+        """Leaves single winner restaurant tally for each day, so winners are paginated by database"""
+        queryset = super(ListRestaurantWinnersHistory, self).filter_queryset(queryset)
+        vote_columns = get_vote_columns()
+        if vote_columns is not None:
+            return self.get_winners_from_vote_columns(vote_columns)
+
+        features = connections[queryset.db].features
+        if features.can_distinct_on_fields:
+            return queryset.order_by('date', *self.winner_ordering).distinct('date')
+        if features.supports_over_clause:
+            day_winners = queryset.annotate(
+                winner_id=Window(FirstValue('pk'), partition_by=[F('date')], order_by=self.get_winner_order_by()),
+            ).values('winner_id')
+            return queryset.filter(pk__in=day_winners).order_by('date')
+
+        day_winner = queryset.filter(date=OuterRef('date')).order_by(*self.winner_ordering).values('pk')[:1]
+        return queryset.filter(pk=Subquery(day_winner)).order_by('date')
+
+    def get_winners_from_vote_columns(self, vote_columns):
+        """
+        Returns unsaved daily tallies of winner restaurants aggregated by in-memory vote columns.
+        Period and restaurants are read from filterset.
+        """
+        winners = vote_columns.get_day_winners(
+            Restaurant.objects.order_by('title', 'pk').values_list('pk', flat=True),
+            *self.get_period_dates(),
+            {int(restaurant_id) for restaurant_id in self.filterset.form.cleaned_data.get('restaurants') or ()},
+        )
+        restaurants = Restaurant.objects.in_bulk({restaurant_id for _, restaurant_id, _, _ in winners})
 
-        serializer = self.get_serializer(first_restaurant_of_each_day, many=True)
+        return [
+            RestaurantDailyTally(
+                date=date, restaurant=restaurants[restaurant_id], rating=rating, distinct_voted_users=voted_users,
+            ) for date, restaurant_id, rating, voted_users in winners if restaurant_id in restaurants
+        ]
 
-        return Response(serializer.data)
+    def get_winner_order_by(self):
+        return [
+            F(field[1:]).desc() if field.startswith('-') else F(field).asc() for field in self.winner_ordering
+        ]
 
 
-class VoteRestaurant(CreateAPIView):
+class VoteRestaurant(StickToPrimaryMixin, CreateAPIView):
     """View for voting for restaurant"""
     permission_classes = [IsAuthenticated]
     serializer_class = RestaurantUserVoteSerializer
+    lock_retries_count = 5
+    lock_retry_delay = 0.01
+
+    def create_vote(self, request):
+        """
+        Validates and saves vote. Vote failed on database lock conflict is rolled back, so it's validated and saved
+        again, and client isn't answered with error after vote transaction was committed or instead of retrying.
+        Vote inside outer transaction isn't retried, as lock conflict breaks outer transaction.
+        """
+        attempt = 1
+        while True:
+            serializer = self.get_serializer(data=request.data)
+            try:
+                serializer.is_valid(raise_exception=True)
+                self.perform_create(serializer)
+                return serializer
+            except OperationalError as error:
+                using = router.db_for_write(RestaurantUserVote)
+                if (attempt >= self.lock_retries_count or not is_database_lock_error(error)
+                        or transaction.get_connection(using).in_atomic_block):
+                    raise
+            time.sleep(self.lock_retry_delay * attempt)
+            attempt += 1
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.create_vote(request)
+        headers = self.get_success_headers(serializer.data)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     def get_serializer_context(self):
         context = super(VoteRestaurant, self).get_serializer_context()
@@ -145,9 +624,69 @@ class VoteRestaurant(CreateAPIView):
 
         return context
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        restaurant = serializer.context.get('restaurant')
+        """
+        Vote is admitted by atomically taking next slot of user restaurant day read by serializer validation, so
+        parallel requests can't exceed user daily vote count or get the same vote weight. Vote gets weight
+        precomputed in the slot. Vote and restaurant daily tally are saved in the same transaction.
+        """
+        vote_slot = RestaurantUserDailyVoteCount.objects.admit_vote(serializer.vote_slot, self.request.user)
+        if vote_slot is None:
+            serializer.fail('daily_vote_count_exceeded')
+
         serializer.save(
-            restaurant=restaurant,
-            vote_weight=restaurant.get_user_next_vote_weight(self.request.user),
+            restaurant=serializer.context.get('restaurant'), vote_weight=vote_slot.next_vote_weight,
+            vote_date=vote_slot.date,
         )
+
+
+class AsyncVoteRestaurant(AsyncAPIViewMixin, VoteRestaurant):
+    """Async variant of restaurant vote for ASGI deployment. Vote is validated and admitted with sync_to_async"""
+
+    async def post(self, request, *args, **kwargs):
+        serializer = await sync_to_async(self.create_vote)(request)
+        headers = self.get_success_headers(serializer.data)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+
+class BulkVoteRestaurants(StickToPrimaryMixin, GenericAPIView):
+    """
+    View for voting for restaurants on behalf of many users at once, used by integrations.
+    Returns result of each vote in given order.
+    """
+    permission_classes = [IsAdminUser]
+    serializer_class = RestaurantBulkVoteSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        votes = serializer.validated_data.get('votes')
+
+        users = get_user_model().objects.in_bulk({vote.get('user') for vote in votes})
+        restaurants = Restaurant.objects.in_bulk({vote.get('restaurant') for vote in votes})
+        results = []
+        valid_votes = []
+        for vote in votes:
+            result = {'user': vote.get('user'), 'restaurant': vote.get('restaurant'), 'voted': False}
+            if vote.get('user') not in users:
+                result['error'] = serializer.error_messages['user_not_found']
+            elif vote.get('restaurant') not in restaurants:
+                result['error'] = serializer.error_messages['restaurant_not_found']
+            else:
+                valid_votes.append((restaurants[vote.get('restaurant')], users[vote.get('user')]))
+            results.append(result)
+
+        saved_votes = iter(RestaurantUserVote.bulk_vote(valid_votes) if valid_votes else [])
+        for result in results:
+            if 'error' in result:
+                continue
+            saved_vote = next(saved_votes)
+            if saved_vote is None:
+                result['error'] = serializer.error_messages['daily_vote_count_exceeded']
+            else:
+                result['voted'] = True
+                result['vote_weight'] = saved_vote.vote_weight
+
+        return Response({'results': results})